@@ -1,3 +1,7 @@
 """
 YellowBear Quiz API
 """
+from dotenv import load_dotenv
+
+# Once for the whole package, before any module reads its settings
+load_dotenv()
@@ -0,0 +1,182 @@
+"""
+Per-answer attempt storage and the ``quiz_stats`` table derived from it.
+
+Every graded attempt stores one ``attempt_answers`` row per question (what
+was given and whether it was correct), written in bulk by the ingestor. Each
+batch is also tallied per answer and folded into ``quiz_stats`` with a single
+upsert that adds to the existing counters. ``rebuild_answer_stats`` recomputes
+the table from ``attempt_answers`` as one set-based aggregation, and
+``migrate_attempt_answers`` fills ``attempt_answers`` for attempts recorded
+when only the JSON ``answers`` column existed. ``rebuild_attempt_totals``
+resets the running totals kept on ``quizzes``.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import case, delete, exists, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .database import dialect_insert
+from .models import AttemptAnswer, Quiz, QuizAnswer, QuizAttempt, QuizStats
+
+logger = logging.getLogger(__name__)
+
+REBUILD_CHUNK_SIZE = 5000
+GIVEN_TEXT_LENGTH = 255
+
+
+@dataclass
+class AnswerTally:
+    quiz_id: int
+    correct_count: int = 0
+    attempt_count: int = 0
+
+
+def tally_answer_results(attempts: Iterable) -> Dict[int, AnswerTally]:
+    """Sum per-answer correctness over attempts carrying ``answer_results`` pairs."""
+    tallies: Dict[int, AnswerTally] = {}
+    for attempt in attempts:
+        for answer_id, is_correct in attempt.answer_results:
+            tally = tallies.get(answer_id)
+            if tally is None:
+                tally = tallies[answer_id] = AnswerTally(quiz_id=attempt.quiz_id)
+            tally.attempt_count += 1
+            if is_correct:
+                tally.correct_count += 1
+    return tallies
+
+
+async def apply_answer_stats(session: AsyncSession, tallies: Dict[int, AnswerTally]) -> None:
+    """Add tallies to ``quiz_stats``, creating rows for answers seen for the first time."""
+    if not tallies:
+        return
+    table = QuizStats.__table__
+    stmt = dialect_insert(session)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.answer_id],
+        set_={
+            "correct_count": table.c.correct_count + stmt.excluded.correct_count,
+            "attempt_count": table.c.attempt_count + stmt.excluded.attempt_count,
+            "updated_at": func.now(),
+        },
+    )
+    await session.execute(stmt, [
+        {
+            "quiz_id": tally.quiz_id,
+            "answer_id": answer_id,
+            "correct_count": tally.correct_count,
+            "attempt_count": tally.attempt_count,
+        }
+        for answer_id, tally in tallies.items()
+    ])
+
+
+def given_text(given) -> Optional[str]:
+    """Stored form of one submitted answer: the text, or a JSON array of selected options."""
+    if given is None:
+        return None
+    text = given if isinstance(given, str) else json.dumps(given, ensure_ascii=False)
+    return text[:GIVEN_TEXT_LENGTH]
+
+
+def attempt_answer_rows(attempt_id: int, submitted: Sequence, answer_results: Sequence) -> List[dict]:
+    """``attempt_answers`` rows for one graded attempt."""
+    return [
+        {
+            "attempt_id": attempt_id,
+            "position": position,
+            "answer_id": answer_id,
+            "given_text": given_text(given),
+            "is_correct": bool(is_correct),
+        }
+        for position, ((answer_id, is_correct), given) in enumerate(zip(answer_results, submitted))
+    ]
+
+
+async def migrate_attempt_answers(
+    session: AsyncSession,
+    quiz_id: Optional[int] = None,
+    chunk_size: int = REBUILD_CHUNK_SIZE,
+) -> int:
+    """Fill ``attempt_answers`` for attempts stored before it existed; returns the attempts migrated.
+
+    Attempts are read in keyset-paged chunks, graded against the quiz's current
+    answer key and written one transaction per chunk, so the migration can be
+    interrupted and rerun. Attempts that already have rows are not touched;
+    attempts whose answer count no longer matches the key are skipped.
+    """
+    from .grading import AnswerKeyCache
+
+    keys = AnswerKeyCache()
+    last_id = 0
+    migrated = 0
+    while True:
+        query = (
+            select(QuizAttempt.id, QuizAttempt.quiz_id, QuizAttempt.answers)
+            .filter(QuizAttempt.id > last_id)
+            .filter(~exists().where(AttemptAnswer.attempt_id == QuizAttempt.id))
+            .order_by(QuizAttempt.id)
+            .limit(chunk_size)
+        )
+        if quiz_id is not None:
+            query = query.filter(QuizAttempt.quiz_id == quiz_id)
+        rows = (await session.execute(query)).all()
+        if not rows:
+            break
+        answer_rows = []
+        for attempt_id, attempt_quiz_id, raw_answers in rows:
+            key = await keys.load(session, attempt_quiz_id)
+            try:
+                submitted = json.loads(raw_answers or "[]")
+            except ValueError:
+                continue
+            if key is None or not isinstance(submitted, list) or not key.accepts_count(len(submitted)):
+                continue
+            graded = key.grade(submitted)
+            results = [(answer.answer_id, ok) for answer, ok in zip(key.answers, graded.results)]
+            answer_rows += attempt_answer_rows(attempt_id, graded.given, results)
+            migrated += 1
+        if answer_rows:
+            await session.execute(insert(AttemptAnswer), answer_rows)
+        await session.commit()
+        last_id = rows[-1][0]
+        logger.info("Migrated answers of %d attempts", migrated)
+    return migrated
+
+
+async def rebuild_answer_stats(session: AsyncSession, quiz_id: Optional[int] = None) -> None:
+    """Recompute ``quiz_stats`` from ``attempt_answers`` with one aggregate INSERT ... SELECT."""
+    correct = func.sum(case((AttemptAnswer.is_correct, 1), else_=0))
+    totals = (
+        select(QuizAnswer.quiz_id, AttemptAnswer.answer_id, correct, func.count())
+        .join(QuizAnswer, QuizAnswer.id == AttemptAnswer.answer_id)
+        .group_by(QuizAnswer.quiz_id, AttemptAnswer.answer_id)
+    )
+    wipe = delete(QuizStats)
+    if quiz_id is not None:
+        totals = totals.filter(QuizAnswer.quiz_id == quiz_id)
+        wipe = wipe.where(QuizStats.quiz_id == quiz_id)
+    await session.execute(wipe)
+    await session.execute(
+        insert(QuizStats).from_select(["quiz_id", "answer_id", "correct_count", "attempt_count"], totals)
+    )
+    await session.commit()
+
+
+async def rebuild_attempt_totals(session: AsyncSession, quiz_id: Optional[int] = None) -> None:
+    """Reset the running ``attempt_count`` / ``score_total`` counters on quizzes from stored attempts."""
+    stmt = update(Quiz).values(
+        attempt_count=select(func.count(QuizAttempt.id))
+        .where(QuizAttempt.quiz_id == Quiz.id)
+        .scalar_subquery(),
+        score_total=select(func.coalesce(func.sum(QuizAttempt.score), 0))
+        .where(QuizAttempt.quiz_id == Quiz.id)
+        .scalar_subquery(),
+    )
+    if quiz_id is not None:
+        stmt = stmt.where(Quiz.id == quiz_id)
+    await session.execute(stmt)
+    await session.commit()
@@ -1,5 +1,10 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Set, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -9,16 +14,21 @@ from sqlalchemy.future import select
 from .database import get_db
 from .models import User
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 # Constants
 SECRET_KEY = os.getenv("JWT_SECRET", "dev_secret_key_replace_in_production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# Build the current user from token claims alone, skipping the users lookup
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
+# Hashes made with a different cost are upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/login")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -30,13 +40,136 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a new hash when the stored one uses outdated settings."""
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception:
+        return False, None
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism.
+    Calls beyond ``max_pending`` in flight are refused with a 503 instead of
+    queueing without limit behind a login storm.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, please retry",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+password_hasher = PasswordHasher()
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Lightweight projection of the authenticated user.
+
+    ``points`` is None when the user was built from token claims only.
+    """
+    id: int
+    username: str
+    email: Optional[str] = None
+    points: Optional[int] = None
+
+class AuthCache:
+    """Token -> CurrentUser cache bounded by size and by the shorter of the TTL and token expiry."""
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, maxsize: int = AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            self._remove(token)
+            return None
+        self._entries.move_to_end(token)
+        return user
+
+    def put(self, token: str, user: CurrentUser, token_exp: Optional[float] = None) -> None:
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        self._entries[token] = (user, expires_at)
+        self._entries.move_to_end(token)
+        self._tokens_by_user.setdefault(user.id, set()).add(token)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def add_points(self, user_id: int, delta: int) -> None:
+        """Keep cached snapshots in step with an awarded-points increment."""
+        for token in self._tokens_by_user.get(user_id, ()):
+            user, expires_at = self._entries[token]
+            if user.points is not None:
+                self._entries[token] = (replace(user, points=user.points + delta), expires_at)
+
+    def invalidate_user(self, user_id: int) -> None:
+        for token in self._tokens_by_user.pop(user_id, set()):
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        user, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user.id]
+
+auth_cache = AuthCache()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+def create_user_token(user: User, expires_delta: Optional[timedelta] = None) -> str:
+    """Access token carrying the immutable claims handlers need (id and username)."""
+    return create_access_token(data={"sub": str(user.id), "username": user.username}, expires_delta=expires_delta)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> CurrentUser:
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return cached
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -44,16 +177,21 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-        
-    async with db as session:
-        result = await session.execute(select(User).filter(User.id == int(user_id)))
-        user = result.scalar_one_or_none()
-        
-    if user is None:
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
         raise credentials_exception
+
+    username = payload.get("username")
+    if AUTH_TRUST_TOKEN_CLAIMS and username:
+        user = CurrentUser(id=user_id, username=username)
+    else:
+        result = await db.execute(
+            select(User.id, User.username, User.email, User.points).filter(User.id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            raise credentials_exception
+        user = CurrentUser(id=row.id, username=row.username, email=row.email, points=row.points)
+
+    auth_cache.put(token, user, token_exp=payload.get("exp"))
     return user
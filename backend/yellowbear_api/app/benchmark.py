@@ -0,0 +1,485 @@
+"""
+Benchmark harness for the API hot paths.
+
+Usage: python -m app.benchmark --output bench.json [--baseline previous.json]
+
+Seeds a fresh database (a temporary SQLite file unless ``--database-url`` is
+given) with users, quizzes, answers, attempts and comments, then drives each
+scenario through the app in-process over an ASGI client at a fixed
+concurrency. For every scenario the report records p50/p95/p99 latency,
+throughput, error count and SQL statements per request (counted on the
+engine, so background writes such as ingestor flushes are included). Reports
+are plain JSON so runs from different commits can be compared with
+``--baseline``.
+
+Before the scenarios run, the list, comment and statistics routes are also
+fetched through both the fast JSON path and the ``response_model`` path (see
+``app/fast_json.py``). The report records whether the bodies are identical
+and what each path costs, and the run fails if any body differs.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import event, insert
+
+SCENARIOS = (
+    "list_quizzes",
+    "get_quiz",
+    "get_quiz_statistics",
+    "get_quiz_comments",
+    "submit_attempt",
+    "login",
+    "register",
+)
+BENCH_PASSWORD = "bench-password"
+
+
+@dataclass
+class BenchConfig:
+    users: int = 1000
+    quizzes: int = 200
+    answers_per_quiz: int = 20
+    attempts: int = 20000
+    comments: int = 5000
+    requests: int = 200
+    concurrency: int = 16
+    warmup: int = 10
+    seed: int = 0
+    scenarios: List[str] = field(default_factory=lambda: list(SCENARIOS))
+
+
+@dataclass
+class SeededData:
+    user_ids: List[int]
+    usernames: List[str]
+    emails: List[str]
+    quiz_ids: List[int]
+    answers_per_quiz: int
+
+
+class QueryCounter:
+    """Counts statements executed on an engine while attached."""
+
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+async def seed_database(engine, config: BenchConfig) -> SeededData:
+    """Insert the synthetic catalog; the schema must already exist."""
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+
+    from .answer_stats import migrate_attempt_answers, rebuild_answer_stats, rebuild_attempt_totals
+    from .auth import password_hasher
+    from .models import Comment, Quiz, QuizAnswer, QuizAttempt, User
+
+    rng = random.Random(config.seed)
+    password_hash = await password_hasher.hash(BENCH_PASSWORD)
+    run = f"{int(time.time())}{rng.randrange(1000):03d}"
+    usernames = [f"bench{run}_{i}" for i in range(config.users)]
+    emails = [f"{name}@example.com" for name in usernames]
+    started = datetime.utcnow() - timedelta(days=90)
+
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {"username": name, "email": email, "password_hash": password_hash, "points": rng.randrange(500)}
+                for name, email in zip(usernames, emails)
+            ],
+        )
+        user_ids = list(result.scalars())
+
+        result = await conn.execute(
+            insert(Quiz).returning(Quiz.id, sort_by_parameter_order=True),
+            [
+                {
+                    "creator_id": rng.choice(user_ids),
+                    "title": f"Bench quiz {i} {rng.choice(['capitals', 'rivers', 'elements', 'films'])}",
+                    "description": "Synthetic benchmark quiz",
+                    "quiz_type": "list",
+                    "time_limit": rng.choice([None, 300, 600]),
+                    "attempt_count": 0,
+                    "score_total": 0,
+                    "created_at": started + timedelta(minutes=i),
+                }
+                for i in range(config.quizzes)
+            ],
+        )
+        quiz_ids = list(result.scalars())
+
+        await conn.execute(
+            insert(QuizAnswer),
+            [
+                {"quiz_id": quiz_id, "correct_answer": f"answer {j}", "position": j}
+                for quiz_id in quiz_ids
+                for j in range(config.answers_per_quiz)
+            ],
+        )
+
+        attempts = []
+        for i in range(config.attempts):
+            given = [f"answer {j}" if rng.random() < 0.6 else "wrong" for j in range(config.answers_per_quiz)]
+            attempts.append({
+                "quiz_id": rng.choice(quiz_ids),
+                "user_id": rng.choice(user_ids),
+                "score": 0,
+                "points_earned": 0,
+                "completion_time": rng.randrange(30, 600),
+                "answers": json.dumps(given),
+                "created_at": started + timedelta(seconds=i * 30),
+            })
+        if attempts:
+            await conn.execute(insert(QuizAttempt), attempts)
+
+        top_level = config.comments * 7 // 10
+        comment_rows = [
+            {"content": f"comment {i}", "quiz_id": rng.choice(quiz_ids), "author_id": rng.choice(user_ids)}
+            for i in range(top_level)
+        ]
+        if comment_rows:
+            result = await conn.execute(
+                insert(Comment).returning(Comment.id, sort_by_parameter_order=True), comment_rows
+            )
+            parents = list(zip(result.scalars(), (row["quiz_id"] for row in comment_rows)))
+            replies = []
+            for i in range(config.comments - top_level):
+                parent_id, quiz_id = rng.choice(parents)
+                replies.append({
+                    "content": f"reply {i}",
+                    "quiz_id": quiz_id,
+                    "author_id": rng.choice(user_ids),
+                    "parent_id": parent_id,
+                    "thread_id": parent_id,
+                })
+            if replies:
+                await conn.execute(insert(Comment), replies)
+
+    # Grade the seeded attempts and derive counters the same way backfill-stats does
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        await migrate_attempt_answers(session)
+        await rebuild_answer_stats(session)
+        await rebuild_attempt_totals(session)
+
+    return SeededData(user_ids, usernames, emails, quiz_ids, config.answers_per_quiz)
+
+
+def build_scenarios(data: SeededData, rng: random.Random) -> Dict[str, Callable]:
+    """Request factories by scenario name; each takes the client and returns the response."""
+    from .auth import create_user_token
+
+    tokens = {
+        user_id: create_user_token(SimpleNamespace(id=user_id, username=name))
+        for user_id, name in zip(data.user_ids[:100], data.usernames[:100])
+    }
+    registrations = itertools.count()
+    run = f"{int(time.time())}{rng.randrange(1000):03d}"
+
+    async def list_quizzes(client):
+        return await client.get("/api/quizzes", params={"sort": rng.choice(["newest", "popular"]), "limit": 20})
+
+    async def get_quiz(client):
+        return await client.get(f"/api/quizzes/{rng.choice(data.quiz_ids)}")
+
+    async def get_quiz_statistics(client):
+        return await client.get(f"/api/stats/quizzes/{rng.choice(data.quiz_ids)}")
+
+    async def get_quiz_comments(client):
+        return await client.get(f"/api/quizzes/{rng.choice(data.quiz_ids)}/comments")
+
+    async def submit_attempt(client):
+        user_id = rng.choice(list(tokens))
+        given = [f"answer {j}" if rng.random() < 0.6 else "wrong" for j in range(data.answers_per_quiz)]
+        return await client.post(
+            f"/api/quizzes/{rng.choice(data.quiz_ids)}/attempts",
+            json={"answers": given, "completion_time": rng.randrange(30, 600)},
+            headers={"Authorization": f"Bearer {tokens[user_id]}"},
+        )
+
+    async def login(client):
+        return await client.post("/api/login", json={"email": rng.choice(data.emails), "password": BENCH_PASSWORD})
+
+    async def register(client):
+        name = f"new{run}_{next(registrations)}"
+        return await client.post(
+            "/api/register", json={"username": name, "email": f"{name}@example.com", "password": BENCH_PASSWORD}
+        )
+
+    return {
+        "list_quizzes": list_quizzes,
+        "get_quiz": get_quiz,
+        "get_quiz_statistics": get_quiz_statistics,
+        "get_quiz_comments": get_quiz_comments,
+        "submit_attempt": submit_attempt,
+        "login": login,
+        "register": register,
+    }
+
+
+async def _settle() -> None:
+    """Wait for queued attempts to be written so their statements count toward the scenario."""
+    from .ingest import attempt_ingestor
+
+    if attempt_ingestor.running:
+        await attempt_ingestor.stop()
+        await attempt_ingestor.start()
+
+
+async def run_scenario(
+    client, engine, name: str, make_request: Callable[..., Awaitable], config: BenchConfig
+) -> dict:
+    for _ in range(config.warmup):
+        await make_request(client)
+    await _settle()
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(config.requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await make_request(client)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    with QueryCounter(engine) as queries:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(config.concurrency)))
+        await _settle()
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": config.concurrency,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "queries_per_request": round(queries.count / len(latencies), 2) if latencies else 0.0,
+    }
+
+
+async def run_benchmark(app, engine, data: SeededData, config: BenchConfig) -> Dict[str, dict]:
+    """Run the configured scenarios in order against ``app``; the caller owns startup/shutdown."""
+    from httpx import ASGITransport, AsyncClient
+
+    scenarios = build_scenarios(data, random.Random(config.seed))
+    results = {}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for name in config.scenarios:
+            results[name] = await run_scenario(client, engine, name, scenarios[name], config)
+    return results
+
+
+def parity_paths(data: SeededData) -> List[str]:
+    paths = ["/api/quizzes?limit=50&sort=newest", "/api/quizzes?limit=50&sort=popular"]
+    for quiz_id in data.quiz_ids[:3]:
+        paths.append(f"/api/quizzes/{quiz_id}/comments?limit=50")
+        paths.append(f"/api/stats/quizzes/{quiz_id}")
+    return paths
+
+
+async def check_serialization_parity(app, data: SeededData, repeats: int = 20) -> Dict[str, dict]:
+    """Fetch each fast-path route both ways; bodies must match byte for byte."""
+    from fastapi.responses import JSONResponse
+    from httpx import ASGITransport, AsyncClient
+
+    from . import fast_json
+
+    enabled = fast_json.FAST_JSON_RESPONSES
+    results = {}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            for path in parity_paths(data):
+                separator = "&" if "?" in path else "?"
+                bodies, timings = {}, {}
+                for fast in (True, False):
+                    fast_json.FAST_JSON_RESPONSES = fast
+                    await client.get(f"{path}{separator}parity=warmup-{fast}")
+                    started = time.perf_counter()
+                    for i in range(repeats):
+                        # A distinct query string per request keeps the response cache out of the comparison
+                        response = await client.get(f"{path}{separator}parity={'fast' if fast else 'model'}-{i}")
+                    timings[fast] = (time.perf_counter() - started) * 1000 / repeats
+                    bodies[fast] = response.content
+                # The stdlib encoder must agree with orjson on the same data
+                stdlib = JSONResponse(json.loads(bodies[False])).body
+                results[path] = {
+                    "identical": bodies[True] == bodies[False] == stdlib,
+                    "bytes": len(bodies[True]),
+                    "fast_ms": round(timings[True], 3),
+                    "model_ms": round(timings[False], 3),
+                }
+    finally:
+        fast_json.FAST_JSON_RESPONSES = enabled
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict) -> List[str]:
+    lines = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        changes = []
+        for metric in ("p95_ms", "throughput_rps", "queries_per_request"):
+            if before[metric]:
+                changes.append(f"{metric} {before[metric]} -> {result[metric]} ({result[metric] / before[metric] - 1:+.0%})")
+        lines.append(f"{name}: " + ", ".join(changes))
+    return lines
+
+
+async def _main(args: argparse.Namespace, config: BenchConfig) -> dict:
+    # Imported only now so DATABASE_URL / RESPONSE_CACHE_ENABLED set by main() take effect
+    from .database import DATABASE_URL, engine
+    from .main import app
+    from .models import Base, User
+    from .search import ensure_search_index
+
+    async with engine.begin() as conn:
+        if args.reset:
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_search_index)
+        existing = (await conn.execute(User.__table__.select().limit(1))).first()
+    if existing is not None:
+        raise SystemExit("The benchmark database is not empty; pass --reset to drop and recreate its tables")
+
+    started = time.perf_counter()
+    data = await seed_database(engine, config)
+    seed_seconds = time.perf_counter() - started
+
+    async with app.router.lifespan_context(app):
+        serialization = await check_serialization_parity(app, data)
+        scenarios = await run_benchmark(app, engine, data, config)
+    await engine.dispose()
+
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "database_url": DATABASE_URL.split("@")[-1],
+            "response_cache": os.environ.get("RESPONSE_CACHE_ENABLED", "true"),
+            "fast_json": os.environ.get("FAST_JSON_RESPONSES", "true"),
+            "seed_seconds": round(seed_seconds, 2),
+            "config": asdict(config),
+        },
+        "serialization": serialization,
+        "scenarios": scenarios,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    defaults = BenchConfig()
+    parser = argparse.ArgumentParser(prog="python -m app.benchmark")
+    parser.add_argument("--output", default="bench.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument(
+        "--database-url",
+        help="Benchmark database (default: a fresh SQLite file in a temporary directory); never point this at real data",
+    )
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables before seeding")
+    parser.add_argument("--no-response-cache", action="store_true", help="Serve every read from the database")
+    parser.add_argument(
+        "--no-fast-json", action="store_true", help="Send list bodies through their response_model (for a baseline)"
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run, in order")
+    for name in ("users", "quizzes", "answers_per_quiz", "attempts", "comments", "requests", "concurrency", "warmup", "seed"):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=getattr(defaults, name))
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    config = BenchConfig(
+        users=args.users, quizzes=args.quizzes, answers_per_quiz=args.answers_per_quiz, attempts=args.attempts,
+        comments=args.comments, requests=args.requests, concurrency=args.concurrency, warmup=args.warmup,
+        seed=args.seed, scenarios=scenarios,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="yellowbear-bench-") as workdir:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        # Keep the ingestor's failure spool out of the working directory
+        os.environ["ATTEMPT_SPOOL_PATH"] = os.path.join(workdir, "attempt_spool.ndjson")
+        if args.no_response_cache:
+            os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+        if args.no_fast_json:
+            os.environ["FAST_JSON_RESPONSES"] = "false"
+        report = asyncio.run(_main(args, config))
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    for name, result in report["scenarios"].items():
+        print(
+            f"{name:>20}: p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms"
+            f"  {result['throughput_rps']:8.1f} req/s  {result['queries_per_request']:5.2f} queries/req"
+            f"  {result['errors']} errors"
+        )
+    if args.baseline:
+        with open(args.baseline) as source:
+            for line in compare(report, json.load(source)):
+                print(line)
+    mismatched = [path for path, result in report["serialization"].items() if not result["identical"]]
+    for path, result in report["serialization"].items():
+        print(f"{path}: fast {result['fast_ms']:.2f} ms, model {result['model_ms']:.2f} ms, {result['bytes']} bytes")
+    if mismatched:
+        raise SystemExit(f"Fast JSON output differs from the response_model output for: {', '.join(mismatched)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,162 @@
+"""
+Maintenance commands for the YellowBear API.
+
+Usage: python -m app.cli <command> [options]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+
+from .database import async_session, engine
+
+
+async def migrate(args: argparse.Namespace) -> None:
+    from .database import init_db
+
+    if await init_db(create=True, force=args.force):
+        print("Created missing tables, columns and indexes")
+    else:
+        print("Database schema is up to date")
+
+
+async def migrate_attempt_answers(args: argparse.Namespace) -> None:
+    from .answer_stats import migrate_attempt_answers as migrate
+
+    async with async_session() as session:
+        migrated = await migrate(session, quiz_id=args.quiz_id, chunk_size=args.chunk_size)
+    print(f"Migrated answers of {migrated} attempts into attempt_answers")
+
+
+async def backfill_stats(args: argparse.Namespace) -> None:
+    from .answer_stats import rebuild_answer_stats, rebuild_attempt_totals
+
+    await migrate_attempt_answers(args)
+    async with async_session() as session:
+        await rebuild_answer_stats(session, quiz_id=args.quiz_id)
+        await rebuild_attempt_totals(session, quiz_id=args.quiz_id)
+    print("Rebuilt quiz_stats and quiz attempt totals")
+
+
+async def import_quizzes(args: argparse.Namespace) -> None:
+    from .quiz_import import import_quiz_stream
+    from .routers.quiz import QuizCreate
+
+    async def read_lines():
+        with open(args.path, encoding="utf-8") as source:
+            for line in source:
+                yield line
+
+    async with async_session() as session:
+        report = await import_quiz_stream(
+            session, args.creator_id, read_lines(), QuizCreate.model_validate_json, chunk_size=args.chunk_size
+        )
+    for line, error in report.errors:
+        print(f"line {line}: {error}")
+    print(f"Imported {report.imported} quizzes, skipped {report.failed} invalid lines")
+
+
+async def export_attempts(args: argparse.Namespace) -> None:
+    from .export import export_attempts as export_stream
+
+    stream = export_stream(
+        args.format, quiz_id=args.quiz_id, user_id=args.user_id, since=args.since, until=args.until,
+        after_id=args.after_id,
+    )
+    with open(args.output, "wb") as output:
+        async for chunk in stream:
+            output.write(chunk)
+
+
+async def bench_grading(args: argparse.Namespace) -> None:
+    from .grading import benchmark_grading
+
+    report = benchmark_grading(answers=args.answers, submissions=args.submissions)
+    print(
+        f"{report['answers']} answers: compile {report['compile_ms']:.1f} ms, grading p50 {report['p50_ms']:.2f} ms, "
+        f"max {report['max_ms']:.2f} ms (budget {report['budget_ms']:.0f} ms)"
+    )
+    if report["max_ms"] > report["budget_ms"]:
+        raise SystemExit("Grading exceeded its CPU budget")
+
+
+async def startup_report(args: argparse.Namespace) -> None:
+    from .startup import append_history, measure_startup
+
+    report = measure_startup(top=args.top)
+    print(f"{report.module}: {report.import_ms:.0f} ms to import {report.modules} modules (revision {report.revision})")
+    for timing in report.slowest:
+        print(f"  {timing.self_ms:8.1f} ms self {timing.cumulative_ms:8.1f} ms total  {timing.module}")
+    if args.history:
+        append_history(args.history, report)
+    if args.budget_ms is not None and report.import_ms > args.budget_ms:
+        raise SystemExit(f"Import took {report.import_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    schema = commands.add_parser("migrate", help="Create missing tables, columns and indexes; run once before starting workers")
+    schema.add_argument("--force", action="store_true", help="Run create_all even if the schema fingerprint matches")
+    schema.set_defaults(handler=migrate)
+
+    migrate_answers = commands.add_parser(
+        "migrate-attempt-answers", help="Fill attempt_answers from the JSON answers of older quiz_attempts"
+    )
+    migrate_answers.add_argument("--quiz-id", type=int, help="Only migrate attempts of this quiz")
+    migrate_answers.add_argument("--chunk-size", type=int, default=5000, help="Attempts read and written per transaction")
+    migrate_answers.set_defaults(handler=migrate_attempt_answers)
+
+    backfill = commands.add_parser(
+        "backfill-stats", help="Migrate missing attempt_answers, then rebuild quiz_stats and quiz attempt totals"
+    )
+    backfill.add_argument("--quiz-id", type=int, help="Only rebuild this quiz")
+    backfill.add_argument("--chunk-size", type=int, default=5000, help="Attempts migrated per transaction")
+    backfill.set_defaults(handler=backfill_stats)
+
+    importer = commands.add_parser("import-quizzes", help="Import quizzes from a JSON Lines file")
+    importer.add_argument("path", help="File with one quiz object (title, quiz_type, answers, ...) per line")
+    importer.add_argument("--creator-id", type=int, required=True, help="User that will own the imported quizzes")
+    importer.add_argument("--chunk-size", type=int, default=500, help="Quizzes written per transaction")
+    importer.set_defaults(handler=import_quizzes)
+
+    exporter = commands.add_parser("export-attempts", help="Write quiz attempts as gzip-compressed NDJSON or CSV")
+    exporter.add_argument("output", help="Destination file, e.g. attempts.ndjson.gz")
+    exporter.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    exporter.add_argument("--quiz-id", type=int, help="Only attempts of this quiz")
+    exporter.add_argument("--user-id", type=int, help="Only attempts by this user")
+    exporter.add_argument("--since", type=datetime.fromisoformat, help="Created at or after (ISO 8601, UTC)")
+    exporter.add_argument("--until", type=datetime.fromisoformat, help="Created before (ISO 8601, UTC)")
+    exporter.add_argument("--after-id", type=int, default=0, help="Resume after this attempt id")
+    exporter.set_defaults(handler=export_attempts)
+
+    bench = commands.add_parser("bench-grading", help="Measure grading CPU time against GRADING_CPU_BUDGET_MS")
+    bench.add_argument("--answers", type=int, default=500, help="Answers in the synthetic any-order quiz")
+    bench.add_argument("--submissions", type=int, default=20, help="Submissions to grade")
+    bench.set_defaults(handler=bench_grading)
+
+    startup = commands.add_parser("startup-report", help="Time importing the app and list the slowest imports")
+    startup.add_argument("--top", type=int, default=15, help="Imports to list, by their own time")
+    startup.add_argument("--history", help="Append the report as a JSON line to this file")
+    startup.add_argument("--budget-ms", type=float, help="Fail when importing the app takes longer than this")
+    startup.set_defaults(handler=startup_report)
+
+    return parser
+
+
+def main(argv=None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    args = build_parser().parse_args(argv)
+
+    async def run():
+        try:
+            await args.handler(args)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
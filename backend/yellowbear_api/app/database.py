@@ -1,21 +1,197 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import hashlib
+import logging
+from sqlalchemy import MetaData, event, inspect, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from typing import List, Optional
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./yellowbear.db")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+# Create missing tables on startup. Multi-worker deployments run ``python -m app.cli migrate``
+# once before starting the workers and turn this off.
+DB_AUTO_MIGRATE = _env_bool("DB_AUTO_MIGRATE", True)
+
+
+def normalize_database_url(url: str) -> str:
+    """Pick the async driver for plain ``postgresql://`` / ``sqlite://`` URLs."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+psycopg://" + url[len("postgresql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return ":memory:" in url or url.rstrip("/").endswith("sqlite+aiosqlite:")
+
+
+def _apply_sqlite_pragmas(engine: AsyncEngine, url: str) -> None:
+    pragmas = [
+        f"PRAGMA busy_timeout = {_env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)}",
+        f"PRAGMA cache_size = -{_env_int('SQLITE_CACHE_SIZE_KB', 32768)}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if not _is_memory_sqlite(url):
+        pragmas += [
+            "PRAGMA journal_mode = WAL",
+            # Safe with WAL: only the last transactions can be lost on power failure, never corruption
+            "PRAGMA synchronous = NORMAL",
+            f"PRAGMA mmap_size = {_env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)}",
+        ]
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def create_engine_from_env(url: Optional[str] = None) -> AsyncEngine:
+    """Build the async engine from ``DATABASE_URL`` and the ``DB_*`` / ``SQLITE_*`` settings."""
+    url = normalize_database_url(url or DATABASE_URL)
+    options = {
+        "echo": _env_bool("DB_ECHO"),
+        # Compiled SQL cache shared by all connections
+        "query_cache_size": _env_int("DB_QUERY_CACHE_SIZE", 1200),
+    }
+    if url.startswith("sqlite"):
+        # Per-connection cache of prepared sqlite3 statements
+        options["connect_args"] = {"cached_statements": _env_int("SQLITE_STATEMENT_CACHE", 512)}
+        engine = create_async_engine(url, **options)
+        _apply_sqlite_pragmas(engine, url)
+        return engine
+
+    options.update(
+        pool_size=_env_int("DB_POOL_SIZE", 10),
+        max_overflow=_env_int("DB_MAX_OVERFLOW", 20),
+        pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+        pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+        pool_pre_ping=True,
+    )
+    if url.startswith("postgresql+psycopg"):
+        # Server-side prepared statements once a query has run this many times
+        options["connect_args"] = {"prepare_threshold": _env_int("DB_PREPARE_THRESHOLD", 5)}
+    return create_async_engine(url, **options)
+
+
+engine = create_engine_from_env()
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 async def get_db():
     async with async_session() as session:
         yield session
 
-async def init_db():
-    from app.models.base import Base
-    async with engine.begin() as conn:
+def dialect_insert(session: AsyncSession):
+    """The dialect's ``insert``, which supports ``on_conflict_do_update`` on Postgres and SQLite."""
+    if session.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+def schema_fingerprint(metadata: MetaData) -> str:
+    """Hash of every table, column and index the models declare."""
+    parts = []
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(f"{column.name} {column.type!r} {column.nullable}" for column in table.columns)
+        parts.extend(sorted(str(index.name) for index in table.indexes))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+def _stored_fingerprint(sync_conn) -> Optional[str]:
+    from app.models import SchemaVersion
+    if not inspect(sync_conn).has_table(SchemaVersion.__tablename__):
+        return None
+    return sync_conn.execute(
+        SchemaVersion.__table__.select().with_only_columns(SchemaVersion.fingerprint)
+    ).scalar()
+
+class SchemaDriftError(RuntimeError):
+    """The database lacks columns the models declare that cannot be added in place."""
+
+def schema_drift(sync_conn, metadata: MetaData, apply: bool = False) -> List[str]:
+    """Tables, columns and indexes the models declare but the live database lacks.
+
+    ``create_all`` only creates whole tables, so with ``apply`` the missing
+    indexes and the columns that can be added in place (nullable or with a
+    server default) are created here; what is left is returned.
+    """
+    inspector = inspect(sync_conn)
+    live_tables = set(inspector.get_table_names())
+    preparer = sync_conn.dialect.identifier_preparer
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in live_tables:
+            missing.append(f"table {table.name}")
+            continue
+        live_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in live_columns:
+                continue
+            if apply and (column.nullable or column.server_default is not None):
+                ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+                sync_conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+            else:
+                missing.append(f"column {table.name}.{column.name}")
+        live_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in live_indexes:
+                continue
+            if apply and all(column.name in live_columns or column.nullable or column.server_default is not None
+                             for column in index.columns):
+                index.create(sync_conn)
+            else:
+                missing.append(f"index {index.name}")
+    return missing
+
+async def ensure_schema(bind: AsyncEngine, create: bool = True, force: bool = False) -> bool:
+    """Bring the schema up to the models unless the stored fingerprint matches; returns whether it ran.
+
+    ``create=False`` never touches the schema (workers started after
+    ``python -m app.cli migrate``) and only logs what is missing; either way
+    the search backend is selected. The fingerprint is stored only once the
+    live schema has every declared column and index, otherwise
+    ``SchemaDriftError`` lists what needs a manual migration.
+    """
+    from app.models import Base, SchemaVersion
+    from app.search import ensure_search_index
+
+    fingerprint = schema_fingerprint(Base.metadata)
+    async with bind.begin() as conn:
+        current = not force and await conn.run_sync(_stored_fingerprint) == fingerprint
+        if current or not create:
+            if not current:
+                missing = await conn.run_sync(schema_drift, Base.metadata)
+                if missing:
+                    logger.error("Database schema is behind the models, run python -m app.cli migrate: %s",
+                                 ", ".join(missing))
+            await conn.run_sync(ensure_search_index, False)
+            return False
         await conn.run_sync(Base.metadata.create_all)
+        missing = await conn.run_sync(schema_drift, Base.metadata, True)
+        if missing:
+            raise SchemaDriftError("Cannot bring the database schema up to date in place: " + ", ".join(missing))
+        await conn.run_sync(ensure_search_index)
+        await conn.execute(SchemaVersion.__table__.delete())
+        await conn.execute(SchemaVersion.__table__.insert().values(id=1, fingerprint=fingerprint))
+    return True
+
+async def init_db(create: bool = DB_AUTO_MIGRATE, force: bool = False) -> bool:
+    return await ensure_schema(engine, create=create, force=force)
@@ -0,0 +1,53 @@
+"""
+Fast JSON responses for the browse endpoints.
+
+``FastJSONResponse`` is the app's default response class and encodes with
+``orjson`` when it is installed, falling back to the stdlib encoder with the
+same compact output. Endpoints that serve large lists (quiz pages, comment
+pages, quiz statistics) select plain columns, build the response body as
+dicts and hand it to ``fast_response``, which returns it already encoded and
+skips re-validating every item through the ``response_model``. The model
+still documents the route. Set ``FAST_JSON_RESPONSES=false`` to send those
+bodies through the model as before; ``python -m app.benchmark`` checks that
+both paths produce identical bytes.
+"""
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "true").lower() in ("1", "true", "yes")
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, byte-for-byte what ``JSONResponse`` sends for the same data."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_response(content: Any) -> Union[FastJSONResponse, Any]:
+    """Send ``content`` as is when the fast path is on; otherwise let the route's response_model validate it."""
+    if FAST_JSON_RESPONSES:
+        return FastJSONResponse(content)
+    return content
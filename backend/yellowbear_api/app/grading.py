@@ -0,0 +1,286 @@
+"""
+Compiled answer keys used to grade quiz attempts.
+
+Grading used to re-query the quiz and its answers on every submission and
+re-normalize every accepted answer inside the loop. An ``AnswerKey`` does that
+work once per quiz; keys live in a bounded LRU cache keyed by quiz id and are
+dropped whenever the quiz's answers change. List answers are compared by a
+matcher from ``app.matching`` (fuzzy by default, see ``ANSWER_MATCHER``).
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .matching import ExactMatcher, get_matcher_class
+from .models import Quiz, QuizAnswer
+
+ANSWER_KEY_CACHE_SIZE = int(os.getenv("ANSWER_KEY_CACHE_SIZE", "1024"))
+# CPU allowed for grading one submission of the ``benchmark_grading`` workload
+GRADING_CPU_BUDGET_MS = float(os.getenv("GRADING_CPU_BUDGET_MS", "50"))
+
+SubmittedAnswer = Union[str, List[str]]
+
+
+def normalize_answer(text: str) -> str:
+    return text.lower().strip()
+
+
+def parse_aliases(raw) -> List[str]:
+    """Aliases are stored as a JSON array string; older rows are comma separated."""
+    if not raw:
+        return []
+    if isinstance(raw, (list, tuple)):
+        return [str(a) for a in raw]
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        return raw.split(",")
+    if isinstance(value, list):
+        return [str(a) for a in value]
+    return [str(value)]
+
+
+@dataclass(frozen=True)
+class CompiledAnswer:
+    answer_id: int
+    position: int
+    correct_answer: str
+    accepted: frozenset  # correct answer plus aliases, normalized by the key's matcher
+
+
+@dataclass(frozen=True)
+class GradeResult:
+    results: Tuple[bool, ...]  # per-question correctness, in position order
+    given: Tuple = ()  # submitted answer credited to each question, None if it was not named
+
+    @property
+    def correct_answers(self) -> int:
+        return sum(self.results)
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.results)
+
+    @property
+    def score(self) -> int:
+        return int((self.correct_answers / self.total_questions) * 100)
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    quiz_id: int
+    is_multiple_choice: bool
+    allow_multiple_answers: bool
+    answers: Tuple[CompiledAnswer, ...]
+    correct_options: frozenset  # normalized text of every is_correct option
+    match_any_order: bool = False  # list quizzes: answers may be named in any order
+    time_limit: Optional[int] = None  # seconds
+    matcher: Optional[ExactMatcher] = field(default=None, compare=False, repr=False)
+
+    @classmethod
+    def compile(cls, quiz: Quiz, quiz_answers: Sequence[QuizAnswer], matcher: Optional[str] = None) -> "AnswerKey":
+        ordered = sorted(quiz_answers, key=lambda a: a.position)
+        matcher_class = get_matcher_class(matcher)
+        match_any_order = bool(getattr(quiz, "match_any_order", False))
+        compiled = []
+        for answer in ordered:
+            accepted = {matcher_class.normalize(answer.correct_answer)}
+            accepted.update(matcher_class.normalize(a) for a in parse_aliases(answer.aliases))
+            compiled.append(CompiledAnswer(
+                answer_id=answer.id,
+                position=answer.position,
+                correct_answer=answer.correct_answer,
+                accepted=frozenset(accepted),
+            ))
+        return cls(
+            quiz_id=quiz.id,
+            is_multiple_choice=bool(quiz.is_multiple_choice),
+            allow_multiple_answers=bool(quiz.allow_multiple_answers),
+            answers=tuple(compiled),
+            correct_options=frozenset(
+                normalize_answer(a.correct_answer) for a in ordered if a.is_correct
+            ),
+            match_any_order=match_any_order,
+            time_limit=getattr(quiz, "time_limit", None),
+            matcher=matcher_class([a.accepted for a in compiled], any_order=match_any_order),
+        )
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def accepts_count(self, count: int) -> bool:
+        """Whether a submission with ``count`` entries can be graded against this key."""
+        if self.match_any_order and not self.is_multiple_choice:
+            return count <= len(self.answers)
+        return count == len(self.answers)
+
+    def grade(self, submitted: Sequence[SubmittedAnswer]) -> GradeResult:
+        """Grade one submission; ``submitted`` must have one entry per answer.
+
+        For any-order list quizzes each entry may name any answer not named
+        before, and there may be fewer entries than answers.
+        """
+        if self.match_any_order and not self.is_multiple_choice:
+            return self._grade_any_order(submitted)
+        results = []
+        for answer, given in zip(self.answers, submitted):
+            if self.is_multiple_choice:
+                user_answers = given if isinstance(given, list) else [given]
+                normalized = {normalize_answer(a) for a in user_answers}
+                if self.allow_multiple_answers:
+                    # All selected answers must be correct and all correct answers must be selected
+                    results.append(normalized == self.correct_options)
+                else:
+                    results.append(
+                        len(user_answers) == 1 and normalize_answer(user_answers[0]) in self.correct_options
+                    )
+            else:
+                results.append(isinstance(given, str) and self.matcher.match_at(len(results), given))
+        return GradeResult(results=tuple(results), given=tuple(submitted))
+
+    def _grade_any_order(self, submitted: Sequence[SubmittedAnswer]) -> GradeResult:
+        given: List[Optional[str]] = [None] * len(self.answers)
+        named = set()
+        for entry in submitted:
+            if not isinstance(entry, str):
+                continue
+            index = self.matcher.find(entry, named)
+            if index is not None:
+                named.add(index)
+                given[index] = entry
+        return GradeResult(results=tuple(i in named for i in range(len(self.answers))), given=tuple(given))
+
+
+class AnswerKeyCache:
+    """Bounded LRU of compiled answer keys with single-flight loading."""
+
+    def __init__(self, maxsize: int = ANSWER_KEY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._keys: "OrderedDict[int, AnswerKey]" = OrderedDict()
+        self._loading: Dict[int, asyncio.Future] = {}
+
+    def get(self, quiz_id: int) -> Optional[AnswerKey]:
+        key = self._keys.get(quiz_id)
+        if key is not None:
+            self._keys.move_to_end(quiz_id)
+        return key
+
+    def put(self, key: AnswerKey) -> None:
+        self._keys[key.quiz_id] = key
+        self._keys.move_to_end(key.quiz_id)
+        while len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+
+    def invalidate(self, quiz_id: int) -> None:
+        self._keys.pop(quiz_id, None)
+
+    def clear(self) -> None:
+        self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    async def load(self, db: AsyncSession, quiz_id: int) -> Optional[AnswerKey]:
+        """Return the cached key or compile it from the database.
+
+        Concurrent misses for the same quiz share a single load. Returns None if
+        the quiz does not exist; missing quizzes are not cached.
+        """
+        key = self.get(quiz_id)
+        if key is not None:
+            return key
+        pending = self._loading.get(quiz_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[quiz_id] = future
+        try:
+            key = await _fetch_answer_key(db, quiz_id)
+            if key is not None:
+                self.put(key)
+            future.set_result(key)
+            return key
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark as retrieved so a failure with no waiters isn't logged by asyncio
+            future.exception()
+            raise
+        finally:
+            del self._loading[quiz_id]
+
+
+async def _fetch_answer_key(db: AsyncSession, quiz_id: int) -> Optional[AnswerKey]:
+    quiz_result = await db.execute(select(Quiz).filter(Quiz.id == quiz_id))
+    quiz = quiz_result.scalar_one_or_none()
+    if quiz is None:
+        return None
+    answers_result = await db.execute(
+        select(QuizAnswer)
+        .filter(QuizAnswer.quiz_id == quiz_id)
+        .order_by(QuizAnswer.position)
+    )
+    return AnswerKey.compile(quiz, answers_result.scalars().all())
+
+
+answer_key_cache = AnswerKeyCache()
+
+
+def benchmark_grading(answers: int = 500, submissions: int = 20, seed: int = 0) -> Dict[str, float]:
+    """CPU milliseconds per submission for a synthetic any-order quiz with ``answers`` answers.
+
+    Every submission names all answers in random order, about a third of them
+    with a typo and a fifth replaced by a wrong guess. Each submission is graded
+    three times and the fastest run counts, to filter out scheduling noise.
+    """
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(alphabet) for _ in range(rng.randint(4, 14))) for _ in range(answers)]
+    quiz = SimpleNamespace(id=0, is_multiple_choice=False, allow_multiple_answers=False, match_any_order=True)
+    rows = [
+        SimpleNamespace(id=i, position=i, correct_answer=word, aliases=None, is_correct=False)
+        for i, word in enumerate(words)
+    ]
+    started = time.process_time()
+    key = AnswerKey.compile(quiz, rows)
+    compile_ms = (time.process_time() - started) * 1000
+
+    def typed(word):
+        roll = rng.random()
+        if roll < 0.3:
+            cut = rng.randrange(len(word))
+            return word[:cut] + word[cut + 1:]
+        if roll < 0.5:
+            return "".join(rng.choice(alphabet) for _ in range(len(word)))
+        return word
+
+    timings = []
+    for _ in range(submissions):
+        submitted = [typed(word) for word in rng.sample(words, len(words))]
+        best = None
+        for _ in range(3):
+            started = time.process_time()
+            key.grade(submitted)
+            elapsed = (time.process_time() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+    timings.sort()
+    return {
+        "answers": answers,
+        "compile_ms": compile_ms,
+        "p50_ms": timings[len(timings) // 2],
+        "max_ms": timings[-1],
+        "budget_ms": GRADING_CPU_BUDGET_MS,
+    }
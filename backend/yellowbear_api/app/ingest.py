@@ -0,0 +1,318 @@
+"""
+Write-coalescing ingestion of graded quiz attempts.
+
+``submit_attempt`` hands graded attempts to the ingestor and returns the score
+right away. A background task collects attempts for up to
+``ATTEMPT_FLUSH_INTERVAL_MS`` or ``ATTEMPT_FLUSH_MAX_ITEMS`` items and writes
+them in one transaction: bulk INSERTs into ``quiz_attempts`` and
+``attempt_answers``, aggregated ``attempt_count = attempt_count + n``
+increments, ``points_ledger`` entries for the awarded points (folded into
+``users.points`` by ``app.points``) and the per-answer ``quiz_stats`` upsert,
+so concurrent submissions no longer lose counter updates.
+
+A batch that fails to commit is retried ``ATTEMPT_WRITE_RETRIES`` times with
+exponential backoff and jitter. If it still fails, its attempts are written
+one by one so a single bad row cannot hold back the rest. When some of them
+succeed, the database is reachable and the rows that failed are moved to the
+dead-letter file (``ATTEMPT_DEAD_LETTER_PATH``) for inspection. When none of
+them succeed, the batch is appended to an NDJSON spool file. The spool is
+replayed on start and every ``ATTEMPT_SPOOL_REPLAY_SECONDS`` while running;
+spool lines that cannot be parsed are moved to the dead-letter file too.
+Failures after the commit (cache, leaderboard and invalidation updates) are
+only logged, so a stored batch is never spooled and written again.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert
+
+from .answer_stats import apply_answer_stats, attempt_answer_rows, tally_answer_results
+from .auth import auth_cache
+from .database import async_session
+from .invalidation import invalidation_bus
+from .leaderboard import leaderboard
+from .models import AttemptAnswer, Quiz, QuizAttempt
+from .points import ledger_entry, record_points
+from .response_cache import response_cache
+from .stats_cache import stats_snapshot_cache
+
+logger = logging.getLogger(__name__)
+
+ATTEMPT_FLUSH_INTERVAL_MS = int(os.getenv("ATTEMPT_FLUSH_INTERVAL_MS", "50"))
+ATTEMPT_FLUSH_MAX_ITEMS = int(os.getenv("ATTEMPT_FLUSH_MAX_ITEMS", "500"))
+ATTEMPT_QUEUE_SIZE = int(os.getenv("ATTEMPT_QUEUE_SIZE", "10000"))
+ATTEMPT_SPOOL_PATH = os.getenv("ATTEMPT_SPOOL_PATH", "attempt_spool.ndjson")
+ATTEMPT_DEAD_LETTER_PATH = os.getenv("ATTEMPT_DEAD_LETTER_PATH")  # defaults to the spool path + ".dead"
+ATTEMPT_SPOOL_REPLAY_SECONDS = float(os.getenv("ATTEMPT_SPOOL_REPLAY_SECONDS", "30"))
+ATTEMPT_WRITE_RETRIES = int(os.getenv("ATTEMPT_WRITE_RETRIES", "3"))
+ATTEMPT_RETRY_BACKOFF_MS = int(os.getenv("ATTEMPT_RETRY_BACKOFF_MS", "100"))
+
+_STOP = object()
+
+
+@dataclass
+class PendingAttempt:
+    quiz_id: int
+    user_id: int
+    score: int
+    completion_time: Optional[int]
+    answers: str  # JSON array of the submitted answers
+    points: int
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    answer_results: List[Tuple[int, bool]] = field(default_factory=list)  # (answer_id, is_correct) per question
+    given: Optional[list] = None  # submitted answer credited to each question; defaults to ``answers`` in order
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, line: str) -> "PendingAttempt":
+        data = json.loads(line)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+_quizzes = Quiz.__table__
+
+_increment_attempt_count = (
+    _quizzes.update()
+    .where(_quizzes.c.id == bindparam("b_id"))
+    .values(
+        attempt_count=_quizzes.c.attempt_count + bindparam("b_n"),
+        score_total=_quizzes.c.score_total + bindparam("b_score"),
+    )
+)
+
+
+async def write_attempts(batch: List[PendingAttempt]) -> None:
+    """Persist a batch of attempts and their counter increments in one transaction."""
+    attempt_counts = Counter(a.quiz_id for a in batch)
+    score_sums = Counter()
+    for a in batch:
+        score_sums[a.quiz_id] += a.score
+
+    async with async_session() as session:
+        async with session.begin():
+            result = await session.execute(
+                insert(QuizAttempt).returning(QuizAttempt.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "quiz_id": a.quiz_id,
+                        "user_id": a.user_id,
+                        "score": a.score,
+                        "points_earned": a.points,
+                        "completion_time": a.completion_time,
+                        "answers": a.answers,
+                        "created_at": a.created_at,
+                    }
+                    for a in batch
+                ],
+            )
+            attempt_ids = result.scalars().all()
+            answer_rows = [
+                row
+                for attempt_id, a in zip(attempt_ids, batch)
+                for row in attempt_answer_rows(
+                    attempt_id, a.given if a.given is not None else json.loads(a.answers), a.answer_results
+                )
+            ]
+            if answer_rows:
+                await session.execute(insert(AttemptAnswer), answer_rows)
+            await session.execute(
+                _increment_attempt_count,
+                [
+                    {"b_id": quiz_id, "b_n": n, "b_score": score_sums[quiz_id]}
+                    for quiz_id, n in attempt_counts.items()
+                ],
+            )
+            await record_points(session, (
+                ledger_entry(a.user_id, "attempt", a.points, source_id=attempt_id, created_at=a.created_at)
+                for attempt_id, a in zip(attempt_ids, batch)
+            ))
+            await apply_answer_stats(session, tally_answer_results(batch))
+
+    try:
+        await _publish_attempts(batch, attempt_counts, score_sums)
+    except Exception:
+        # The batch is committed; letting this reach flush() would spool it and store it twice
+        logger.exception("Stored %d attempts but failed to update caches", len(batch))
+
+
+async def _publish_attempts(batch: List[PendingAttempt], attempt_counts: Counter, score_sums: Counter) -> None:
+    """Update in-memory snapshots, other workers and cached responses after a batch commits."""
+    for quiz_id, n in attempt_counts.items():
+        stats_snapshot_cache.record_attempts(quiz_id, n, score_sums[quiz_id])
+    for a in batch:
+        leaderboard.record_points(a.user_id, a.points, attempt_at=a.created_at)
+        auth_cache.add_points(a.user_id, a.points)
+    await invalidation_bus.publish("attempts", {
+        "quizzes": [[quiz_id, n, score_sums[quiz_id]] for quiz_id, n in attempt_counts.items()],
+        "points": [[a.user_id, a.points, a.created_at.isoformat()] for a in batch if a.points],
+    })
+    # Detail pages show attempt_count; the list is left to expire on its short TTL
+    await response_cache.invalidate(*(f"quiz:{quiz_id}" for quiz_id in attempt_counts))
+
+
+class AttemptIngestor:
+    def __init__(
+        self,
+        flush_interval_ms: int = ATTEMPT_FLUSH_INTERVAL_MS,
+        max_items: int = ATTEMPT_FLUSH_MAX_ITEMS,
+        queue_size: int = ATTEMPT_QUEUE_SIZE,
+        spool_path: str = ATTEMPT_SPOOL_PATH,
+        dead_letter_path: Optional[str] = ATTEMPT_DEAD_LETTER_PATH,
+        replay_seconds: float = ATTEMPT_SPOOL_REPLAY_SECONDS,
+        retries: int = ATTEMPT_WRITE_RETRIES,
+        backoff_ms: int = ATTEMPT_RETRY_BACKOFF_MS,
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_items = max_items
+        self.queue_size = queue_size
+        self.spool_path = spool_path
+        self.dead_letter_path = dead_letter_path or f"{spool_path}.dead"
+        self.replay_interval = replay_seconds
+        self.retries = retries
+        self.backoff = backoff_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        await self.replay_spool()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued and stop the background task."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def submit(self, attempt: PendingAttempt) -> None:
+        # Without a running worker (CLI, tests) write straight through
+        if not self.running:
+            await self.flush([attempt])
+            return
+        await self._queue.put(attempt)
+
+    async def flush(self, batch: List[PendingAttempt]) -> bool:
+        """Write a batch; returns False when nothing could be written and the batch was spooled."""
+        if not batch:
+            return True
+        if await self._write(batch, self.retries):
+            return True
+        failed = batch
+        if len(batch) > 1:
+            # Isolate the attempts that keep failing so the rest are stored now
+            failed = [attempt for attempt in batch if not await self._write([attempt], 0)]
+        if len(failed) == len(batch):
+            logger.error("Failed to write %d attempts, spooling to %s", len(batch), self.spool_path)
+            self._spool(batch)
+            return False
+        if failed:
+            logger.error("Moving %d attempts that fail to write to %s", len(failed), self.dead_letter_path)
+            self._append(self.dead_letter_path, [attempt.to_json() for attempt in failed])
+        return True
+
+    async def _write(self, batch: List[PendingAttempt], retries: int) -> bool:
+        for attempt in range(retries + 1):
+            try:
+                await write_attempts(batch)
+                return True
+            except Exception as exc:
+                logger.warning(
+                    "Writing %d attempts failed (try %d of %d): %s", len(batch), attempt + 1, retries + 1, exc,
+                    exc_info=attempt == retries,
+                )
+            if attempt < retries:
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        return False
+
+    async def replay_spool(self) -> None:
+        # Claim the spool by renaming it, so only one of several workers replays it
+        claimed = f"{self.spool_path}.{os.getpid()}"
+        try:
+            os.rename(self.spool_path, claimed)
+        except FileNotFoundError:
+            return
+        batch, unreadable = [], []
+        with open(claimed) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(PendingAttempt.from_json(line))
+                except (ValueError, TypeError, KeyError):
+                    # A crash mid-write can leave a partial line
+                    unreadable.append(line.rstrip("\n"))
+        if unreadable:
+            logger.error("Moving %d unreadable spool lines to %s", len(unreadable), self.dead_letter_path)
+            self._append(self.dead_letter_path, unreadable)
+        for start in range(0, len(batch), self.max_items):
+            if not await self.flush(batch[start:start + self.max_items]):
+                # The database is unreachable; keep the rest for the next replay
+                self._spool(batch[start + self.max_items:])
+                break
+        # Every attempt is now stored, spooled again or dead-lettered
+        os.remove(claimed)
+
+    def _spool(self, batch: List[PendingAttempt]) -> None:
+        self._append(self.spool_path, [attempt.to_json() for attempt in batch])
+
+    @staticmethod
+    def _append(path: str, lines: List[str]) -> None:
+        if not lines:
+            return
+        with open(path, "a") as f:
+            for line in lines:
+                f.write(line + "\n")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_replay = loop.time() + self.replay_interval
+        stopping = False
+        while not stopping:
+            if loop.time() >= next_replay:
+                next_replay = loop.time() + self.replay_interval
+                await self.replay_spool()
+            try:
+                item = await asyncio.wait_for(self._queue.get(), max(next_replay - loop.time(), 0.01))
+            except asyncio.TimeoutError:
+                continue
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_items:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self.flush(batch)
+
+
+attempt_ingestor = AttemptIngestor()
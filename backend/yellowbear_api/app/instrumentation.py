@@ -0,0 +1,190 @@
+"""
+Per-request SQL instrumentation.
+
+``QueryMetricsMiddleware`` samples requests (``METRICS_SAMPLE_RATE``); for a
+sampled request, engine events count every statement it executes, sum their
+time and remember the slowest one. The totals go out as a ``Server-Timing``
+header, feed per-route histograms served in Prometheus text format by
+``GET /metrics``, and are checked against the route's ``@query_budget``.
+Requests that are not sampled only pay for one context variable lookup per
+statement.
+"""
+import logging
+import os
+import random
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
+# Sampled requests slower than this are logged with their slowest statement
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: Optional[str] = None
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "query_started", None)
+    if stats is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    if elapsed >= stats.slowest_seconds:
+        stats.slowest_seconds = elapsed
+        stats.slowest_statement = statement
+
+
+def query_budget(max_queries: int):
+    """Declare the most statements a route may run per request; exceeding it is logged and recorded."""
+    def decorate(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+    return decorate
+
+
+@dataclass(frozen=True)
+class BudgetViolation:
+    route: str
+    queries: int
+    budget: int
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def lines(self, name: str, labels: str):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.total}"
+        yield f"{name}_count{{{labels}}} {cumulative}"
+
+
+class QueryMetrics:
+    SERIES = (
+        ("http_request_duration_seconds", "Time from request to response start, sampled requests", LATENCY_BUCKETS),
+        ("db_queries_per_request", "SQL statements executed per sampled request", QUERY_COUNT_BUCKETS),
+        ("db_time_seconds", "Time spent in SQL statements per sampled request", LATENCY_BUCKETS),
+    )
+
+    def __init__(self, sample_rate: float = METRICS_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._series: Dict[Tuple[str, str], Tuple[Histogram, ...]] = {}
+        self.budget_violations: Deque[BudgetViolation] = deque(maxlen=100)
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def observe(self, method: str, route: str, handler_seconds: float, stats: RequestStats) -> None:
+        series = self._series.get((method, route))
+        if series is None:
+            series = self._series[(method, route)] = tuple(Histogram(buckets) for _, _, buckets in self.SERIES)
+        for histogram, value in zip(series, (handler_seconds, stats.queries, stats.db_seconds)):
+            histogram.observe(value)
+
+    def check_budget(self, route: str, endpoint, stats: RequestStats) -> None:
+        budget = getattr(endpoint, "query_budget", None)
+        if budget is not None and stats.queries > budget:
+            logger.warning("%s ran %d queries, over its budget of %d", route, stats.queries, budget)
+            self.budget_violations.append(BudgetViolation(route, stats.queries, budget))
+
+    def render(self) -> str:
+        """Prometheus text exposition of every series."""
+        lines = []
+        for index, (name, description, _) in enumerate(self.SERIES):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), series in sorted(self._series.items()):
+                lines.extend(series[index].lines(name, f'method="{method}",route="{route}"'))
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        self._series.clear()
+        self.budget_violations.clear()
+
+
+class QueryMetricsMiddleware:
+    """ASGI middleware that samples requests and reports their SQL cost."""
+
+    def __init__(self, app, metrics: "QueryMetrics" = None):
+        self.app = app
+        self.metrics = metrics if metrics is not None else query_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.sampled():
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        handler_seconds = None
+
+        async def send_with_timing(message):
+            nonlocal handler_seconds
+            if message["type"] == "http.response.start":
+                handler_seconds = time.perf_counter() - started
+                timing = (
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                    f"app;dur={handler_seconds * 1000:.1f}"
+                )
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"server-timing", timing.encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            route_path = route.path if route is not None else scope.get("cached_route", "unmatched")
+            if handler_seconds is None:
+                handler_seconds = time.perf_counter() - started
+            self.metrics.observe(scope["method"], route_path, handler_seconds, stats)
+            self.metrics.check_budget(route_path, scope.get("endpoint"), stats)
+            if handler_seconds * 1000 > SLOW_REQUEST_MS:
+                logger.warning(
+                    "Slow request %s %s: %.0f ms, %d queries, %.0f ms in SQL, slowest %.0f ms: %s",
+                    scope["method"], route_path, handler_seconds * 1000, stats.queries, stats.db_seconds * 1000,
+                    stats.slowest_seconds * 1000, (stats.slowest_statement or "")[:200],
+                )
+
+
+query_metrics = QueryMetrics()
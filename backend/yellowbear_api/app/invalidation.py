@@ -0,0 +1,156 @@
+"""
+Cross-worker invalidation for the in-process caches.
+
+Each worker process keeps its own response cache versions, stats snapshots,
+leaderboard and auth snapshots, and updates them in place when it performs a
+write. With several workers (``WEB_CONCURRENCY`` > 1, or
+``INVALIDATION_BUS=database``) the writer also publishes the change as a row
+in ``cache_invalidations``; every worker polls that table every
+``INVALIDATION_POLL_MS`` and applies the messages other processes published,
+so caches converge within one poll interval without a separate broker. Rows
+older than ``INVALIDATION_RETENTION_SECONDS`` are pruned. With a single
+worker publishing is a no-op.
+
+On Postgres ids come from a sequence and publishers can commit out of id
+order, so a row may appear below an id a worker has already read. Each poll
+therefore re-reads the last ``INVALIDATION_REPLAY_IDS`` ids and skips the
+ones it has already applied; only a publish that commits after that many
+later rows is missed.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.future import select
+
+from .database import async_session
+from .models import CacheInvalidation
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_BUS = os.getenv(
+    "INVALIDATION_BUS", "database" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "local"
+)
+INVALIDATION_POLL_MS = int(os.getenv("INVALIDATION_POLL_MS", "500"))
+INVALIDATION_RETENTION_SECONDS = int(os.getenv("INVALIDATION_RETENTION_SECONDS", "600"))
+INVALIDATION_REPLAY_IDS = int(os.getenv("INVALIDATION_REPLAY_IDS", "200"))
+INVALIDATION_BATCH = 1000
+
+Handler = Callable[[object], Union[None, Awaitable[None]]]
+
+
+class InvalidationBus:
+    def __init__(
+        self,
+        mode: str = INVALIDATION_BUS,
+        poll_interval_ms: int = INVALIDATION_POLL_MS,
+        retention_seconds: int = INVALIDATION_RETENTION_SECONDS,
+        replay_ids: int = INVALIDATION_REPLAY_IDS,
+    ):
+        if mode not in ("local", "database"):
+            raise ValueError(f"INVALIDATION_BUS must be 'local' or 'database', not {mode!r}")
+        self.mode = mode
+        self.poll_interval = poll_interval_ms / 1000
+        self.retention = timedelta(seconds=retention_seconds)
+        self.origin = uuid.uuid4().hex
+        self.replay_ids = replay_ids
+        self.last_id: Optional[int] = None
+        self._seen: Set[int] = set()  # ids read within the replay window
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def shared(self) -> bool:
+        return self.mode == "database"
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        """Run ``handler(payload)`` for messages other processes publish on ``channel``."""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def publish(self, channel: str, payload) -> None:
+        """Tell the other workers; the caller has already applied the change locally."""
+        if not self.shared:
+            return
+        try:
+            async with async_session() as session:
+                await session.execute(
+                    insert(CacheInvalidation).values(origin=self.origin, channel=channel, payload=json.dumps(payload))
+                )
+                await session.commit()
+        except Exception:
+            # Other workers catch up on their caches' TTLs and periodic rebuilds
+            logger.exception("Failed to publish %s invalidation", channel)
+
+    async def poll(self) -> int:
+        """Apply messages published since the last poll; returns how many were applied."""
+        async with async_session() as session:
+            if self.last_id is None:
+                # Start from now: history was already reflected in what this worker loads
+                self.last_id = (await session.execute(select(func.max(CacheInvalidation.id)))).scalar() or 0
+                self._seen = set((await session.execute(
+                    select(CacheInvalidation.id).where(CacheInvalidation.id > self.last_id - self.replay_ids)
+                )).scalars())
+                return 0
+            rows = (await session.execute(
+                select(CacheInvalidation.id, CacheInvalidation.origin, CacheInvalidation.channel, CacheInvalidation.payload)
+                .where(CacheInvalidation.id > self.last_id - self.replay_ids)
+                .order_by(CacheInvalidation.id)
+                .limit(INVALIDATION_BATCH + self.replay_ids)
+            )).all()
+        applied = 0
+        for row_id, origin, channel, payload in rows:
+            if row_id in self._seen:
+                continue
+            self._seen.add(row_id)
+            self.last_id = max(self.last_id, row_id)
+            if origin == self.origin:
+                continue
+            for handler in self._handlers.get(channel, ()):
+                try:
+                    result = handler(json.loads(payload))
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception:
+                    logger.exception("Applying %s invalidation failed", channel)
+            applied += 1
+        floor = self.last_id - self.replay_ids
+        self._seen = {row_id for row_id in self._seen if row_id > floor}
+        return applied
+
+    async def prune(self) -> None:
+        async with async_session() as session:
+            await session.execute(
+                delete(CacheInvalidation).where(CacheInvalidation.created_at < datetime.utcnow() - self.retention)
+            )
+            await session.commit()
+
+    async def start(self) -> None:
+        if self.shared and self._task is None:
+            await self.poll()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_prune = loop.time() + self.retention.total_seconds() / 10
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+                if loop.time() >= next_prune:
+                    next_prune = loop.time() + self.retention.total_seconds() / 10
+                    await self.prune()
+            except Exception:
+                logger.exception("Invalidation poll failed")
+
+
+invalidation_bus = InvalidationBus()
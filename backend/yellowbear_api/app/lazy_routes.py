@@ -0,0 +1,64 @@
+"""
+Routers that are imported on their first request.
+
+The OAuth callbacks and the attempt export are rarely hit but pull in
+``httpx`` and the export pipeline, so instead of importing them at startup
+``include_lazy_router`` registers a placeholder route that claims their path
+prefixes and imports the module the first time one of them is requested.
+Their routes run behind the app's middleware and dependency overrides like
+any other, but they are not listed in the OpenAPI schema.
+"""
+import asyncio
+import importlib
+from typing import Optional, Sequence
+
+from fastapi import APIRouter, FastAPI
+from starlette._utils import get_route_path
+from starlette.routing import BaseRoute, Match, NoMatchFound
+
+
+class LazyRoutes(BaseRoute):
+    def __init__(self, app: FastAPI, module: str, prefixes: Sequence[str], attribute: str = "router"):
+        self.app = app
+        self.module = module
+        self.attribute = attribute
+        self.prefixes = tuple(prefix.rstrip("/") for prefix in prefixes)
+        self._router: Optional[APIRouter] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._router is not None
+
+    def matches(self, scope):
+        if scope["type"] == "http":
+            path = get_route_path(scope)
+            for prefix in self.prefixes:
+                if path == prefix or path.startswith(prefix + "/"):
+                    return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params):
+        raise NoMatchFound(name, path_params)
+
+    async def load(self) -> APIRouter:
+        if self._router is None:
+            async with self._lock:
+                if self._router is None:
+                    source = getattr(importlib.import_module(self.module), self.attribute)
+                    # Re-included so the routes see app.dependency_overrides
+                    router = APIRouter(dependency_overrides_provider=self.app)
+                    router.include_router(source)
+                    self._router = router
+        return self._router
+
+    async def handle(self, scope, receive, send):
+        router = await self.load()
+        await router(scope, receive, send)
+
+
+def include_lazy_router(app: FastAPI, module: str, *prefixes: str) -> LazyRoutes:
+    """Serve ``module.router`` under ``prefixes``, importing it on the first matching request."""
+    route = LazyRoutes(app, module, prefixes)
+    app.router.routes.append(route)
+    return route
@@ -0,0 +1,185 @@
+"""
+In-process leaderboard.
+
+Rankings live in memory as sorted indexes that are updated whenever points are
+awarded, so top-N pages and "my rank" lookups never touch the database. The
+all-time board mirrors ``users.points`` plus the points ledger entries not
+folded into it yet. Daily and weekly boards are built from per-day buckets of
+attempt points (``quiz_attempts.points_earned``), covering the current UTC day
+and the trailing seven days. Everything is rebuilt from the database every
+``LEADERBOARD_REBUILD_SECONDS`` to correct any drift; the first build runs in
+the background so startup does not wait on it.
+"""
+import asyncio
+import logging
+import os
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from .database import async_session
+from .models import QuizAttempt, User
+from .points import unfolded_points
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_REBUILD_SECONDS = int(os.getenv("LEADERBOARD_REBUILD_SECONDS", "300"))
+WEEK_DAYS = 7
+
+TIMEFRAMES = ("all", "weekly", "daily")
+
+
+class RankIndex:
+    """Users ordered by points (desc), then user id; ranks are 1-based.
+
+    Keys are kept in a sorted list, so rank and slice lookups are a binary
+    search and updates are a binary search plus a list shift.
+    """
+
+    def __init__(self, scores: Optional[Dict[int, int]] = None):
+        self.scores: Dict[int, int] = {}
+        self._keys: List[Tuple[int, int]] = []
+        if scores:
+            self.replace(scores)
+
+    def replace(self, scores: Dict[int, int]) -> None:
+        self.scores = {user_id: points for user_id, points in scores.items() if points}
+        self._keys = sorted((-points, user_id) for user_id, points in self.scores.items())
+
+    def add(self, user_id: int, delta: int) -> None:
+        self.set(user_id, self.scores.get(user_id, 0) + delta)
+
+    def set(self, user_id: int, points: int) -> None:
+        old = self.scores.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+        if points:
+            self.scores[user_id] = points
+            insort(self._keys, (-points, user_id))
+
+    def rank(self, user_id: int) -> Optional[int]:
+        points = self.scores.get(user_id)
+        if points is None:
+            return None
+        return bisect_left(self._keys, (-points, user_id)) + 1
+
+    def slice(self, offset: int, limit: int) -> List[Tuple[int, int, int]]:
+        """(rank, user_id, points) for ranks offset+1 .. offset+limit."""
+        return [
+            (offset + i + 1, user_id, -neg_points)
+            for i, (neg_points, user_id) in enumerate(self._keys[offset:offset + limit])
+        ]
+
+    def around(self, user_id: int, radius: int) -> List[Tuple[int, int, int]]:
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        offset = max(rank - 1 - radius, 0)
+        return self.slice(offset, rank - offset + radius)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class Leaderboard:
+    def __init__(self):
+        self.boards: Dict[str, RankIndex] = {timeframe: RankIndex() for timeframe in TIMEFRAMES}
+        self.usernames: Dict[int, str] = {}
+        self._days: Dict[date, Counter] = {}
+        self._window_day: date = datetime.utcnow().date()
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+
+    async def wait_ready(self) -> None:
+        """Wait for the first build once the background task is running."""
+        if self._task is not None:
+            await self._ready.wait()
+
+    def board(self, timeframe: str) -> RankIndex:
+        self._roll_windows()
+        return self.boards[timeframe]
+
+    def add_user(self, user_id: int, username: str) -> None:
+        self.usernames[user_id] = username
+
+    def record_points(self, user_id: int, points: int, attempt_at: Optional[datetime] = None) -> None:
+        """Apply awarded points; ``attempt_at`` also counts them in the daily/weekly windows."""
+        if not points:
+            return
+        self.boards["all"].add(user_id, points)
+        if attempt_at is None:
+            return
+        self._roll_windows()
+        day = attempt_at.date()
+        if day <= self._window_day - timedelta(days=WEEK_DAYS):
+            return
+        self._days.setdefault(day, Counter())[user_id] += points
+        self.boards["weekly"].add(user_id, points)
+        if day == self._window_day:
+            self.boards["daily"].add(user_id, points)
+
+    def _roll_windows(self) -> None:
+        today = datetime.utcnow().date()
+        if today == self._window_day:
+            return
+        self._window_day = today
+        self._recompute_windows()
+
+    def _recompute_windows(self) -> None:
+        oldest = self._window_day - timedelta(days=WEEK_DAYS - 1)
+        self._days = {day: bucket for day, bucket in self._days.items() if day >= oldest}
+        weekly = Counter()
+        for bucket in self._days.values():
+            weekly.update(bucket)
+        self.boards["weekly"].replace(weekly)
+        self.boards["daily"].replace(self._days.get(self._window_day, Counter()))
+
+    async def rebuild(self) -> None:
+        """Reload every board from the database."""
+        self._window_day = datetime.utcnow().date()
+        since = datetime.combine(self._window_day - timedelta(days=WEEK_DAYS - 1), datetime.min.time())
+        async with async_session() as session:
+            users = (await session.execute(select(User.id, User.username, User.points))).all()
+            pending = await unfolded_points(session)
+            day = func.date(QuizAttempt.created_at)
+            buckets = (await session.execute(
+                select(QuizAttempt.user_id, day, func.sum(QuizAttempt.points_earned))
+                .filter(QuizAttempt.created_at >= since)
+                .group_by(QuizAttempt.user_id, day)
+            )).all()
+
+        self.usernames = {user_id: username for user_id, username, _ in users}
+        self.boards["all"].replace({user_id: (points or 0) + pending.get(user_id, 0) for user_id, _, points in users})
+        days: Dict[date, Counter] = {}
+        for user_id, bucket_day, points in buckets:
+            # SQLite returns the day as text, Postgres as a date
+            bucket_day = date.fromisoformat(str(bucket_day)[:10])
+            days.setdefault(bucket_day, Counter())[user_id] += points or 0
+        self._days = days
+        self._recompute_windows()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._rebuild_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _rebuild_periodically(self) -> None:
+        while True:
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Leaderboard rebuild failed")
+            # Readers are released even after a failed build rather than hanging
+            self._ready.set()
+            await asyncio.sleep(LEADERBOARD_REBUILD_SECONDS)
+
+
+leaderboard = Leaderboard()
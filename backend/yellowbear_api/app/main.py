@@ -1,14 +1,26 @@
+from datetime import datetime
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-import os
-from dotenv import load_dotenv
+from .auth import auth_cache, password_hasher
+from .fast_json import FastJSONResponse
 from .database import init_db
-from .routers import auth, quiz, comments, stats
-from .models import Base, User, Quiz, QuizAnswer, QuizAttempt, Comment, QuizStats
+from .ingest import attempt_ingestor
+from .instrumentation import QueryMetricsMiddleware, query_metrics
+from .invalidation import invalidation_bus
+from .lazy_routes import include_lazy_router
+from .leaderboard import leaderboard
+from .oauth_client import oauth_client
+from .points import points_aggregator
+from .rankings import quiz_rankings
+from .response_cache import ResponseCacheMiddleware, response_cache
+from .stats_cache import stats_snapshot_cache
+from .routers import auth, quiz, play, comments, stats, rankings, leaderboard as leaderboard_router
 
-load_dotenv()
+app = FastAPI(title="YellowBear Quiz API", default_response_class=FastJSONResponse)
 
-app = FastAPI(title="YellowBear Quiz API")
+# Added before CORS so cached responses still pass through the CORS middleware
+app.add_middleware(ResponseCacheMiddleware)
 
 # Disable CORS. Do not remove this for full-stack development.
 app.add_middleware(
@@ -19,16 +31,64 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Outermost, so its timings cover everything below it
+app.add_middleware(QueryMetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
+# Before quiz.router, whose /api/quizzes/{quiz_id} would otherwise claim /trending and /popular
+app.include_router(rankings.router)
 app.include_router(quiz.router)
+app.include_router(play.router)
 app.include_router(comments.router)
 app.include_router(stats.router)
+app.include_router(leaderboard_router.router)
+# Rarely used; imported on their first request (see app/lazy_routes.py)
+include_lazy_router(app, "app.routers.oauth", "/api/auth/wechat", "/api/auth/weibo")
+include_lazy_router(app, "app.routers.export", "/api/attempts/export")
 
 @app.get("/healthz")
 async def healthz():
     return {"status": "ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(query_metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Changes made by other worker processes (see app/invalidation.py)
+def _apply_points(entries):
+    for user_id, points, attempt_at in entries:
+        leaderboard.record_points(user_id, points, attempt_at=datetime.fromisoformat(attempt_at) if attempt_at else None)
+        auth_cache.add_points(user_id, points)
+
+def _apply_attempts(payload):
+    for quiz_id, count, score_sum in payload["quizzes"]:
+        stats_snapshot_cache.record_attempts(quiz_id, count, score_sum)
+    _apply_points(payload["points"])
+
+invalidation_bus.subscribe("response_cache", response_cache.apply_remote)
+invalidation_bus.subscribe("attempts", _apply_attempts)
+invalidation_bus.subscribe("points", _apply_points)
+
 @app.on_event("startup")
 async def startup_event():
+    # Skips create_all when the stored schema fingerprint matches; with
+    # DB_AUTO_MIGRATE=false only the search backend is detected
     await init_db()
+    await attempt_ingestor.start()
+    # Folds what earlier runs left in the points ledger before the leaderboard reads users.points
+    await points_aggregator.start()
+    await invalidation_bus.start()
+    # Both build in the background; their routes wait for the first build
+    await leaderboard.start()
+    await quiz_rankings.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await attempt_ingestor.stop()
+    await points_aggregator.stop()
+    await invalidation_bus.stop()
+    await leaderboard.stop()
+    await quiz_rankings.stop()
+    await oauth_client.aclose()
+    password_hasher.shutdown()
@@ -0,0 +1,207 @@
+"""
+Answer matching for list quizzes.
+
+A matcher is built once per compiled answer key from every answer's accepted
+spellings (the correct answer plus its aliases) and answers two questions:
+does a typed answer match the answer at a given position, and which
+not-yet-named answer does it match anywhere in the quiz ("name all X").
+
+``ExactMatcher`` compares lowercased, stripped text. ``FuzzyMatcher`` folds
+Unicode (NFKC, case, accents, punctuation, leading articles) and then accepts
+small typos: at most one edit for answers of 4-7 characters and two from 8.
+Short answers and anything containing digits must still match exactly.
+Lookups are a dict hit for exact spellings; typos are found with a bounded
+Levenshtein check against the position's few spellings, or, for any-order
+quizzes, a symmetric-delete index over all spellings built with the key, so
+the work per typed answer depends on its length and edit budget rather than
+on the number of answers.
+"""
+import os
+import string
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+ANSWER_MATCHER = os.getenv("ANSWER_MATCHER", "fuzzy")
+ARTICLES = frozenset(os.getenv("ANSWER_ARTICLES", "the,a,an").split(","))
+# Longer input is only ever matched exactly, which caps the cost of a submission
+MAX_FUZZY_LENGTH = 64
+
+_ASCII_SEPARATORS = str.maketrans({char: " " for char in string.punctuation})
+
+
+def normalize_text(text: str) -> str:
+    """Fold case, compatibility forms, accents and punctuation; drop a leading article."""
+    if text.isascii():
+        # NFKC and accent folding are no-ops on ASCII
+        words = text.lower().translate(_ASCII_SEPARATORS).split()
+    else:
+        text = unicodedata.normalize("NFKD", unicodedata.normalize("NFKC", text).casefold())
+        folded = []
+        for char in text:
+            category = unicodedata.category(char)
+            if category == "Mn":
+                continue
+            folded.append(" " if category[0] in "PSZ" else char)
+        words = unicodedata.normalize("NFC", "".join(folded)).split()
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return " ".join(words)
+
+
+def max_edits(length: int) -> int:
+    if length < 4:
+        return 0
+    if length < 8:
+        return 1
+    return 2
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """Edit distance between ``a`` and ``b``, or ``limit + 1`` once it is known to exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for j, char_b in enumerate(b, 1):
+        current = [j]
+        best = j
+        for i, char_a in enumerate(a, 1):
+            cost = min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (char_a != char_b))
+            current.append(cost)
+            best = min(best, cost)
+        if best > limit:
+            return limit + 1
+        previous = current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def deletion_variants(word: str, depth: int) -> Set[str]:
+    """``word`` plus every string obtained by deleting up to ``depth`` characters from it."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class DeletionIndex:
+    """Symmetric-delete index for "every word within distance r" queries.
+
+    Two strings within edit distance k share a string reachable from both by
+    at most k deletions, so each stored word is indexed under its deletion
+    variants and a query only looks up its own variants and verifies the few
+    candidates. Lookups cost a number of dict hits that depends on the query
+    length and radius, not on how many words are stored.
+    """
+
+    def __init__(self, words: Iterable[Tuple[str, int]] = ()):
+        self._variants: Dict[str, Set[str]] = {}
+        for word, depth in words:
+            self.add(word, depth)
+
+    def add(self, word: str, depth: int) -> None:
+        """Index ``word`` so it can be found by queries within ``depth`` edits of it."""
+        for variant in deletion_variants(word, depth):
+            self._variants.setdefault(variant, set()).add(word)
+
+    def search(self, word: str, radius: int) -> List[Tuple[int, str]]:
+        """(distance, word) for every stored word within ``radius`` of ``word``."""
+        candidates = set()
+        for variant in deletion_variants(word, radius):
+            candidates |= self._variants.get(variant, set())
+        found = []
+        for candidate in candidates:
+            distance = bounded_levenshtein(word, candidate, radius)
+            if distance <= radius:
+                found.append((distance, candidate))
+        return found
+
+
+class ExactMatcher:
+    """Case-insensitive exact matching, the original grading behaviour."""
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return text.lower().strip()
+
+    def __init__(self, accepted: Sequence[frozenset], any_order: bool = False):
+        self.accepted = accepted  # normalized spellings per answer, in key order
+        self._owners: Dict[str, Tuple[int, ...]] = {}
+        for index, spellings in enumerate(accepted):
+            for spelling in spellings:
+                self._owners[spelling] = self._owners.get(spelling, ()) + (index,)
+
+    def match_at(self, index: int, given: str) -> bool:
+        return self.normalize(given) in self.accepted[index]
+
+    def find(self, given: str, taken: Set[int]) -> Optional[int]:
+        """Index of an answer not in ``taken`` that ``given`` matches, if any."""
+        return self._find_exact(self.normalize(given), taken)
+
+    def _find_exact(self, normalized: str, taken: Set[int]) -> Optional[int]:
+        for index in self._owners.get(normalized, ()):
+            if index not in taken:
+                return index
+        return None
+
+
+class FuzzyMatcher(ExactMatcher):
+    normalize = staticmethod(normalize_text)
+
+    def __init__(self, accepted: Sequence[frozenset], any_order: bool = False):
+        super().__init__(accepted, any_order)
+        self._index = DeletionIndex(
+            (spelling, self._limit(spelling, spelling)) for spelling in self._owners
+        ) if any_order else None
+
+    @staticmethod
+    def _limit(given: str, spelling: str) -> int:
+        if any(char.isdigit() for char in given + spelling):
+            return 0
+        return max_edits(min(len(given), len(spelling)))
+
+    def match_at(self, index: int, given: str) -> bool:
+        normalized = self.normalize(given)
+        if normalized in self.accepted[index]:
+            return True
+        # An exact spelling of another answer is never a typo of this one
+        if normalized in self._owners or len(normalized) > MAX_FUZZY_LENGTH:
+            return False
+        for spelling in self.accepted[index]:
+            limit = self._limit(normalized, spelling)
+            if limit and bounded_levenshtein(normalized, spelling, limit) <= limit:
+                return True
+        return False
+
+    def find(self, given: str, taken: Set[int]) -> Optional[int]:
+        normalized = self.normalize(given)
+        if normalized in self._owners:
+            return self._find_exact(normalized, taken)
+        if self._index is None or len(normalized) > MAX_FUZZY_LENGTH:
+            return None
+        radius = self._limit(normalized, normalized)
+        if not radius:
+            return None
+        best: Dict[int, int] = {}
+        for distance, spelling in self._index.search(normalized, radius):
+            if distance > self._limit(normalized, spelling):
+                continue
+            for index in self._owners[spelling]:
+                if index not in taken and distance < best.get(index, radius + 1):
+                    best[index] = distance
+        if not best:
+            return None
+        closest = min(best.values())
+        candidates = [index for index, distance in best.items() if distance == closest]
+        # Equally close to two different answers: too ambiguous to award either
+        return candidates[0] if len(candidates) == 1 else None
+
+
+MATCHERS = {"exact": ExactMatcher, "fuzzy": FuzzyMatcher}
+
+
+def get_matcher_class(name: Optional[str] = None):
+    return MATCHERS[name or ANSWER_MATCHER]
+
@@ -1,8 +1,14 @@
 from .base import Base
 from .user import User
 from .quiz import Quiz, QuizAnswer, QuizAttempt
+from .attempt_answer import AttemptAnswer
 from .comment import Comment
 from .quiz_stats import QuizStats
+from .cache_invalidation import CacheInvalidation
+from .points import PointsLedgerEntry, PointsPeriodTotal
+from .quiz_ranking import QuizRanking
+from .schema_version import SchemaVersion
+from . import indexes  # registers secondary indexes on the metadata
 
 __all__ = [
     'Base',
@@ -10,6 +16,12 @@ __all__ = [
     'Quiz',
     'QuizAnswer',
     'QuizAttempt',
+    'AttemptAnswer',
     'Comment',
-    'QuizStats'
+    'QuizStats',
+    'CacheInvalidation',
+    'PointsLedgerEntry',
+    'PointsPeriodTotal',
+    'QuizRanking',
+    'SchemaVersion'
 ]
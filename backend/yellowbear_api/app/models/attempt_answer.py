@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from sqlalchemy.orm import relationship
+from app.models.base import Base
+
+class AttemptAnswer(Base):
+    __tablename__ = "attempt_answers"
+
+    attempt_id = Column(Integer, ForeignKey("quiz_attempts.id"), primary_key=True)
+    position = Column(Integer, primary_key=True)  # question index, in answer key order
+    answer_id = Column(Integer, ForeignKey("quiz_answers.id"), nullable=False)
+    given_text = Column(String(255))  # submitted text, truncated; multiple choice selections as a JSON array
+    is_correct = Column(Boolean, nullable=False)
+
+    # Relationships
+    attempt = relationship("QuizAttempt", back_populates="graded_answers")
+    answer = relationship("QuizAnswer")
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, func
+from app.models.base import Base
+
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"
+    
+    id = Column(Integer, primary_key=True)  # workers re-read a window below the last id they saw
+    origin = Column(String(32), nullable=False)  # publishing process, which skips its own messages
+    channel = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)
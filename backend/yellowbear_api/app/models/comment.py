@@ -10,6 +10,7 @@ class Comment(Base):
     quiz_id = Column(Integer, ForeignKey("quizzes.id"))
     author_id = Column(Integer, ForeignKey("users.id"))
     parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
+    thread_id = Column(Integer, ForeignKey("comments.id"), nullable=True)  # top-level ancestor, null for top-level comments
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
     is_deleted = Column(Boolean, default=False)
@@ -18,4 +19,4 @@ class Comment(Base):
     # Relationships
     quiz = relationship("Quiz", back_populates="comments")
     author = relationship("User", back_populates="comments")
-    parent = relationship("Comment", remote_side=[id], backref="replies")
+    parent = relationship("Comment", remote_side=[id], foreign_keys=[parent_id], backref="replies")
@@ -1,12 +1,17 @@
 from sqlalchemy import Index
 from .quiz import Quiz, QuizAnswer, QuizAttempt
+from .attempt_answer import AttemptAnswer
 from .comment import Comment
 from .quiz_stats import QuizStats
+from .points import PointsLedgerEntry, PointsPeriodTotal
+from .quiz_ranking import QuizRanking
 
 # Quiz indexes
 Index('idx_quiz_creator', Quiz.creator_id)
 Index('idx_quiz_type', Quiz.quiz_type)
 Index('idx_quiz_title', Quiz.title)
+Index('idx_quiz_popular', Quiz.attempt_count, Quiz.id)  # keyset pagination for sort=popular
+Index('idx_quiz_type_popular', Quiz.quiz_type, Quiz.attempt_count, Quiz.id)  # top-K popular per quiz type
 
 # Answer indexes
 Index('idx_answer_quiz', QuizAnswer.quiz_id)
@@ -16,14 +21,28 @@ Index('idx_answer_position', QuizAnswer.position)
 Index('idx_attempt_quiz', QuizAttempt.quiz_id)
 Index('idx_attempt_user', QuizAttempt.user_id)
 Index('idx_attempt_score', QuizAttempt.score)
+Index('idx_attempt_created', QuizAttempt.created_at)
+
+# Attempt answer indexes
+# Covers per-answer correctness counts and "most common wrong answer" queries without visiting the table
+Index('idx_attempt_answer_stats', AttemptAnswer.answer_id, AttemptAnswer.is_correct, AttemptAnswer.given_text)
 
 # Comment indexes
 Index('idx_comment_quiz', Comment.quiz_id)
+Index('idx_comment_quiz_page', Comment.quiz_id, Comment.parent_id, Comment.id)  # keyset pages of top-level comments
 Index('idx_comment_author', Comment.author_id)
 Index('idx_comment_parent', Comment.parent_id)
+Index('idx_comment_thread', Comment.thread_id)
 Index('idx_comment_created', Comment.created_at)
 
 # Stats indexes
 Index('idx_stats_quiz', QuizStats.quiz_id)
-Index('idx_stats_answer', QuizStats.answer_id)
 Index('idx_stats_attempts', QuizStats.attempt_count)
+
+# Points ledger indexes
+Index('idx_points_user_created', PointsLedgerEntry.user_id, PointsLedgerEntry.created_at)  # a user's points in a time window
+Index('idx_points_unfolded', PointsLedgerEntry.folded, PointsLedgerEntry.id)  # the aggregator's next batch
+Index('idx_points_period_top', PointsPeriodTotal.period, PointsPeriodTotal.period_start, PointsPeriodTotal.points)
+
+# Ranking indexes
+Index('idx_ranking_trending', QuizRanking.quiz_type, QuizRanking.trending_score)
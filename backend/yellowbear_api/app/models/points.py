@@ -0,0 +1,21 @@
+from sqlalchemy import Boolean, Column, Date, Integer, String, ForeignKey, TIMESTAMP, func, false
+from app.models.base import Base
+
+class PointsLedgerEntry(Base):
+    __tablename__ = "points_ledger"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(16), nullable=False)  # attempt, comment or reply
+    source_id = Column(Integer)  # id of the attempt or comment that earned the points
+    points = Column(Integer, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    folded = Column(Boolean, nullable=False, default=False, server_default=false())  # claimed by the aggregator
+
+class PointsPeriodTotal(Base):
+    __tablename__ = "points_period_totals"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String(8), primary_key=True)  # day or week (starting Monday)
+    period_start = Column(Date, primary_key=True)
+    points = Column(Integer, nullable=False, default=0)
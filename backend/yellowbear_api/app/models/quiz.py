@@ -12,9 +12,11 @@ class Quiz(Base):
     quiz_type = Column(String(50), nullable=False)  # list, multiple_choice
     time_limit = Column(Integer)  # in seconds
     attempt_count = Column(Integer, default=0)
+    score_total = Column(Integer, default=0)  # running sum of attempt scores, for average_score
     created_at = Column(TIMESTAMP, server_default=func.now())
     is_multiple_choice = Column(Boolean, default=False)  # True for multiple choice quizzes
     allow_multiple_answers = Column(Boolean, default=False)  # True if multiple answers can be selected
+    match_any_order = Column(Boolean, default=False)  # List quizzes: answers can be named in any order
 
     # Relationships
     creator = relationship("User", back_populates="quizzes")
@@ -46,6 +48,7 @@ class QuizAttempt(Base):
     quiz_id = Column(Integer, ForeignKey("quizzes.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
     score = Column(Integer, nullable=False)
+    points_earned = Column(Integer, default=0)  # points awarded to the user for this attempt
     completion_time = Column(Integer)  # Time taken in seconds
     answers = Column(String)  # JSON array of user answers stored as string
     created_at = Column(TIMESTAMP, server_default=func.now())
@@ -53,3 +56,4 @@ class QuizAttempt(Base):
     # Relationships
     quiz = relationship("Quiz", back_populates="attempts")
     user = relationship("User", back_populates="quiz_attempts")
+    graded_answers = relationship("AttemptAnswer", back_populates="attempt")
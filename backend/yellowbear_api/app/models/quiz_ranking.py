@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Float, Integer, String, ForeignKey, TIMESTAMP
+from app.models.base import Base
+
+class QuizRanking(Base):
+    __tablename__ = "quiz_rankings"  # rebuilt wholesale by app.rankings on every refresh
+    
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), primary_key=True)
+    quiz_type = Column(String(50), nullable=False)
+    trending_score = Column(Float, nullable=False)  # time-decayed recent attempts and comments
+    recent_attempts = Column(Integer, nullable=False, default=0)
+    recent_comments = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(TIMESTAMP, nullable=False)
@@ -7,7 +7,7 @@ class QuizStats(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"))
-    answer_id = Column(Integer, ForeignKey("quiz_answers.id"))
+    answer_id = Column(Integer, ForeignKey("quiz_answers.id"), unique=True)  # one row per answer, upserted on each attempt batch
     correct_count = Column(Integer, default=0)
     attempt_count = Column(Integer, default=0)
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String, TIMESTAMP, func
+from app.models.base import Base
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    
+    id = Column(Integer, primary_key=True)  # single row
+    fingerprint = Column(String(64), nullable=False)  # hash of the tables, columns and indexes in the metadata
+    applied_at = Column(TIMESTAMP, server_default=func.now())
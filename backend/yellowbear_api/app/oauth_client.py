@@ -0,0 +1,142 @@
+"""
+Shared HTTP client for the WeChat and Weibo OAuth callbacks.
+
+One ``httpx.AsyncClient`` lives for the whole process, so callbacks reuse
+pooled keep-alive connections (HTTP/2 when the ``h2`` package is installed)
+instead of opening a TCP and TLS connection per login. Every request is
+bounded by ``OAUTH_TIMEOUT_SECONDS`` and the pool by
+``OAUTH_MAX_CONNECTIONS``; during a login spike a callback waits at most
+``OAUTH_POOL_TIMEOUT_SECONDS`` for a free connection rather than opening
+sockets without limit. Failed requests are retried
+``OAUTH_RETRIES`` times with exponential backoff and full jitter. A request
+that may already have reached the provider is only retried when it is
+idempotent, because a replayed authorization code is rejected. User info is
+cached for ``OAUTH_USER_INFO_TTL`` seconds per openid/uid.
+
+``httpx`` is imported when the first callback needs the client, so it stays
+out of the API's start-up imports.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+OAUTH_TIMEOUT_SECONDS = float(os.getenv("OAUTH_TIMEOUT_SECONDS", "5"))
+OAUTH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OAUTH_CONNECT_TIMEOUT_SECONDS", "2"))
+OAUTH_POOL_TIMEOUT_SECONDS = float(os.getenv("OAUTH_POOL_TIMEOUT_SECONDS", "2"))
+OAUTH_MAX_CONNECTIONS = int(os.getenv("OAUTH_MAX_CONNECTIONS", "50"))
+OAUTH_RETRIES = int(os.getenv("OAUTH_RETRIES", "2"))
+OAUTH_RETRY_BACKOFF_MS = int(os.getenv("OAUTH_RETRY_BACKOFF_MS", "100"))
+OAUTH_HTTP2 = os.getenv("OAUTH_HTTP2", "true").lower() in ("1", "true", "yes")
+OAUTH_USER_INFO_TTL = int(os.getenv("OAUTH_USER_INFO_TTL", "300"))
+OAUTH_USER_INFO_CACHE_SIZE = int(os.getenv("OAUTH_USER_INFO_CACHE_SIZE", "10000"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class OAuthProviderError(Exception):
+    """The provider could not be reached or answered with something other than JSON."""
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class OAuthClient:
+    def __init__(
+        self,
+        timeout: float = OAUTH_TIMEOUT_SECONDS,
+        connect_timeout: float = OAUTH_CONNECT_TIMEOUT_SECONDS,
+        pool_timeout: float = OAUTH_POOL_TIMEOUT_SECONDS,
+        max_connections: int = OAUTH_MAX_CONNECTIONS,
+        retries: int = OAUTH_RETRIES,
+        backoff_ms: int = OAUTH_RETRY_BACKOFF_MS,
+        http2: bool = OAUTH_HTTP2,
+        user_info_ttl: int = OAUTH_USER_INFO_TTL,
+        user_info_cache_size: int = OAUTH_USER_INFO_CACHE_SIZE,
+        transport=None,
+    ):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_timeout = pool_timeout
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff_ms / 1000
+        self.http2 = http2
+        self.user_info_ttl = user_info_ttl
+        self.user_info_cache_size = user_info_cache_size
+        self.transport = transport  # tests route requests to a stand-in provider
+        self._client = None
+        self._user_info: "OrderedDict[Tuple[str, str], Tuple[dict, float]]" = OrderedDict()
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout, pool=self.pool_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                http2=self.http2 and self.transport is None and _http2_available(),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def request_json(self, method: str, url: str, idempotent: bool = True, **kwargs) -> dict:
+        """Send a request with retries and return its JSON body."""
+        import httpx
+
+        for attempt in range(self.retries + 1):
+            retryable = attempt < self.retries
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as exc:
+                # Never reached the provider, so even a one-time code can be resent
+                error = exc
+            except httpx.TransportError as exc:
+                error = exc
+                retryable = retryable and idempotent
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    try:
+                        return response.json()
+                    except ValueError as exc:
+                        raise OAuthProviderError(f"{url} answered {response.status_code} without JSON") from exc
+                error = OAuthProviderError(f"{url} answered {response.status_code}")
+                retryable = retryable and idempotent
+            if not retryable:
+                raise OAuthProviderError(f"{method} {url} failed: {error}") from error
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            logger.warning("Retrying %s %s in %.0f ms after: %s", method, url, delay * 1000, error)
+            await asyncio.sleep(delay)
+
+    async def user_info(self, provider: str, user_key: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        """Provider user info for ``user_key`` (openid/uid), fetched at most once per TTL."""
+        key = (provider, user_key)
+        cached = self._user_info.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            self._user_info.move_to_end(key)
+            return cached[0]
+        info = await fetch()
+        self._user_info[key] = (info, time.monotonic() + self.user_info_ttl)
+        self._user_info.move_to_end(key)
+        while len(self._user_info) > self.user_info_cache_size:
+            self._user_info.popitem(last=False)
+        return info
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+oauth_client = OAuthClient()
@@ -0,0 +1,36 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor is the url-safe base64 of a JSON list holding the sort key of the last
+row on the previous page; the next page starts strictly after it.
+"""
+import base64
+import json
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """Decode a cursor holding ``size`` values; raises 400 for anything malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
@@ -0,0 +1,98 @@
+"""
+Live play sessions for list quizzes.
+
+A ``PlaySession`` holds the quiz's compiled answer key on the server for the
+length of one play: every guess is matched against it as it is typed and
+only the verdict (plus the canonical answer once it has been named) goes back
+to the client, so the answer list never has to be shipped to the browser.
+The attempt is graded from the session state and persisted once, when the
+session ends.
+"""
+import time
+from typing import Callable, List, Optional
+
+from .grading import AnswerKey, GradeResult
+
+# Guesses are matched against every answer, so bound their size and number
+MAX_GUESS_LENGTH = 200
+GUESSES_PER_ANSWER = 20
+
+
+class PlayError(ValueError):
+    """A guess the session cannot accept; the connection stays open."""
+
+
+class PlaySession:
+    def __init__(self, key: AnswerKey, clock: Callable[[], float] = time.monotonic):
+        if key.is_multiple_choice:
+            raise PlayError("Live play is only available for list quizzes")
+        self.key = key
+        self.clock = clock
+        self.started_at = clock()
+        self.given: List[Optional[str]] = [None] * len(key.answers)
+        self.guesses = 0
+        self.max_guesses = GUESSES_PER_ANSWER * len(key.answers) + 50
+        self._next_position = 0
+
+    @property
+    def found(self) -> int:
+        return sum(given is not None for given in self.given)
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self.started_at
+
+    @property
+    def expired(self) -> bool:
+        return self.key.time_limit is not None and self.elapsed > self.key.time_limit
+
+    @property
+    def complete(self) -> bool:
+        return self.found == len(self.given)
+
+    def guess(self, text: str, position: Optional[int] = None) -> dict:
+        """Check one guess; any-order quizzes ignore ``position``.
+
+        Positional quizzes check ``position`` (0-based, in answer order) and
+        default to the slot after the previous guess, like typing answers in
+        sequence.
+        """
+        if not isinstance(text, str) or not text.strip():
+            raise PlayError("Guess must be non-empty text")
+        if len(text) > MAX_GUESS_LENGTH:
+            raise PlayError(f"Guess must be at most {MAX_GUESS_LENGTH} characters")
+        if self.guesses >= self.max_guesses:
+            raise PlayError("Too many guesses")
+        self.guesses += 1
+
+        if self.key.match_any_order:
+            named = {index for index, given in enumerate(self.given) if given is not None}
+            index = self.key.matcher.find(text, named)
+            if index is None and named:
+                # Report answers that were already named instead of calling them wrong
+                index = self.key.matcher.find(text, set())
+        else:
+            if position is None:
+                position = self._next_position
+            if not isinstance(position, int) or not 0 <= position < len(self.given):
+                raise PlayError(f"Position must be between 0 and {len(self.given) - 1}")
+            self._next_position = position + 1
+            index = position if self.key.matcher.match_at(position, text) else None
+
+        if index is None:
+            return {"type": "result", "text": text, "correct": False, "found": self.found}
+        already_named = self.given[index] is not None
+        if not already_named:
+            self.given[index] = text
+        return {
+            "type": "result",
+            "text": text,
+            "correct": True,
+            "position": index,
+            "answer": self.key.answers[index].correct_answer,
+            "repeat": already_named,
+            "found": self.found,
+        }
+
+    def result(self) -> GradeResult:
+        return GradeResult(results=tuple(given is not None for given in self.given), given=tuple(self.given))
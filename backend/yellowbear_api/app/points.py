@@ -0,0 +1,183 @@
+"""
+Append-only points ledger and its background aggregation.
+
+Every award is a ``points_ledger`` row (attempt, comment or reply) inserted
+in the same transaction as the attempt or comment that earned it, so a write
+never touches ``users`` and no award is lost to a concurrent update. The
+``PointsAggregator`` folds new entries every ``POINTS_AGGREGATE_INTERVAL_MS``
+into ``users.points`` and the per-day and per-week ``points_period_totals``
+with atomic increments. Each fold claims its entries by setting their
+``folded`` flag in the same transaction (skipping rows another worker has
+locked on Postgres), so when several workers run the aggregator every entry
+is folded exactly once. Entries are tracked one by one rather than with an id
+high-water mark because Postgres transactions can commit ids out of order: an
+entry whose transaction commits after a higher id was folded is still picked
+up by the next fold.
+
+``users.points`` therefore trails the ledger by up to one interval; the
+in-memory leaderboard and auth snapshots are updated by the writers
+themselves and do not wait for the fold.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .database import async_session, dialect_insert
+from .models import PointsLedgerEntry, PointsPeriodTotal, User
+
+logger = logging.getLogger(__name__)
+
+POINTS_AGGREGATE_INTERVAL_MS = int(os.getenv("POINTS_AGGREGATE_INTERVAL_MS", "1000"))
+POINTS_AGGREGATE_BATCH = int(os.getenv("POINTS_AGGREGATE_BATCH", "5000"))
+
+EVENT_KINDS = ("attempt", "comment", "reply")
+PERIODS = ("day", "week")
+
+_users = User.__table__
+_ledger = PointsLedgerEntry.__table__
+
+_increment_points = (
+    _users.update()
+    .where(_users.c.id == bindparam("b_id"))
+    .values(points=_users.c.points + bindparam("b_n"))
+)
+
+
+def ledger_entry(
+    user_id: int, kind: str, points: int, source_id: Optional[int] = None, created_at: Optional[datetime] = None
+) -> dict:
+    if kind not in EVENT_KINDS:
+        raise ValueError(f"Unknown points event {kind!r}")
+    return {
+        "user_id": user_id,
+        "kind": kind,
+        "points": points,
+        "source_id": source_id,
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+
+async def record_points(session: AsyncSession, entries: Iterable[dict]) -> None:
+    """Append ledger entries in the caller's transaction; the caller commits."""
+    entries = [entry for entry in entries if entry["points"]]
+    if entries:
+        await session.execute(insert(PointsLedgerEntry), entries)
+
+
+def period_start(period: str, moment: datetime) -> date:
+    day = moment.date()
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+async def period_totals(session: AsyncSession, period: str, start: date, limit: int = 10) -> List[Tuple[int, int]]:
+    """(user_id, points) of the users with the most folded points in one day or week."""
+    rows = await session.execute(
+        select(PointsPeriodTotal.user_id, PointsPeriodTotal.points)
+        .filter(PointsPeriodTotal.period == period, PointsPeriodTotal.period_start == start)
+        .order_by(PointsPeriodTotal.points.desc(), PointsPeriodTotal.user_id)
+        .limit(limit)
+    )
+    return [tuple(row) for row in rows]
+
+
+async def unfolded_points(session: AsyncSession) -> Dict[int, int]:
+    """Per-user points in ledger entries the aggregator has not folded yet."""
+    rows = await session.execute(
+        select(PointsLedgerEntry.user_id, func.sum(PointsLedgerEntry.points))
+        .filter(PointsLedgerEntry.folded == False)
+        .group_by(PointsLedgerEntry.user_id)
+    )
+    return {user_id: points for user_id, points in rows}
+
+
+class PointsAggregator:
+    def __init__(self, interval_ms: int = POINTS_AGGREGATE_INTERVAL_MS, batch_size: int = POINTS_AGGREGATE_BATCH):
+        self.interval = interval_ms / 1000
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def fold(self) -> int:
+        """Fold the next batch of ledger entries; returns how many were folded."""
+        async with async_session() as session:
+            batch = (
+                select(_ledger.c.id)
+                .where(_ledger.c.folded == False)
+                .order_by(_ledger.c.id)
+                .limit(self.batch_size)
+            )
+            if session.bind.dialect.name == "postgresql":
+                # Rows another worker is folding stay locked until it commits
+                batch = batch.with_for_update(skip_locked=True)
+            entries = (await session.execute(
+                update(_ledger)
+                .where(_ledger.c.id.in_(batch), _ledger.c.folded == False)
+                .values(folded=True)
+                .returning(_ledger.c.id, _ledger.c.user_id, _ledger.c.points, _ledger.c.created_at)
+            )).all()
+            if not entries:
+                await session.commit()
+                return 0
+
+            totals = Counter()
+            period_sums = Counter()
+            for _, user_id, points, created_at in entries:
+                totals[user_id] += points
+                for period in PERIODS:
+                    period_sums[(user_id, period, period_start(period, created_at))] += points
+            await session.execute(_increment_points, [{"b_id": user_id, "b_n": n} for user_id, n in totals.items()])
+            table = PointsPeriodTotal.__table__
+            upsert = dialect_insert(session)(table)
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.period, table.c.period_start],
+                set_={"points": table.c.points + upsert.excluded.points},
+            )
+            await session.execute(upsert, [
+                {"user_id": user_id, "period": period, "period_start": start, "points": points}
+                for (user_id, period, start), points in period_sums.items()
+            ])
+            await session.commit()
+        return len(entries)
+
+    async def fold_all(self) -> int:
+        folded = 0
+        while True:
+            count = await self.fold()
+            folded += count
+            if count < self.batch_size:
+                return folded
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.fold_all()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task after folding what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            # Let a fold in progress roll back before the last one starts
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+            await self.fold_all()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.fold_all()
+            except Exception:
+                logger.exception("Folding the points ledger failed")
+
+
+points_aggregator = PointsAggregator()
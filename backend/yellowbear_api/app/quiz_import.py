@@ -0,0 +1,133 @@
+"""
+Bulk quiz creation.
+
+``insert_quizzes`` writes any number of quizzes with two statements: one
+multi-row ``INSERT ... RETURNING id`` for the quizzes and one executemany for
+all of their answers. ``import_quiz_stream`` feeds it from a JSON Lines
+stream, validating line by line and committing every ``chunk_size`` quizzes,
+so arbitrarily large partner packs import with bounded memory. Invalid lines
+are reported and skipped instead of aborting the import.
+"""
+import json
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Callable, List, Sequence, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Quiz, QuizAnswer
+
+IMPORT_CHUNK_SIZE = 500
+MAX_IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+MAX_IMPORT_BYTES = int(os.getenv("MAX_IMPORT_BYTES", str(64 * 1024 * 1024)))  # request body of POST /api/quizzes/import
+
+
+async def insert_quizzes(session: AsyncSession, creator_id: int, quizzes: Sequence) -> List[int]:
+    """Insert quizzes and their answers without committing; returns the new ids in input order."""
+    if not quizzes:
+        return []
+    result = await session.execute(
+        insert(Quiz).returning(Quiz.id, sort_by_parameter_order=True),
+        [
+            {
+                "creator_id": creator_id,
+                "title": quiz.title,
+                "description": quiz.description,
+                "quiz_type": quiz.quiz_type,
+                "time_limit": quiz.time_limit,
+                "is_multiple_choice": quiz.is_multiple_choice,
+                "allow_multiple_answers": quiz.allow_multiple_answers,
+                "match_any_order": quiz.match_any_order,
+            }
+            for quiz in quizzes
+        ],
+    )
+    quiz_ids = list(result.scalars())
+
+    answer_rows = [
+        {
+            "quiz_id": quiz_id,
+            "correct_answer": answer.correct_answer,
+            "aliases": json.dumps(answer.aliases),
+            "position": answer.position,
+            "is_correct": answer.is_correct,
+            "explanation": answer.explanation,
+        }
+        for quiz_id, quiz in zip(quiz_ids, quizzes)
+        for answer in quiz.answers or ()
+    ]
+    if answer_rows:
+        await session.execute(insert(QuizAnswer), answer_rows)
+    return quiz_ids
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    failed: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (line number, message)
+
+    def record_error(self, line_number: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}" for error in exc.errors()
+    )
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without buffering the whole body; decoding is left to the importer."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+async def import_quiz_stream(
+    session: AsyncSession,
+    creator_id: int,
+    lines: AsyncIterable[Union[bytes, str]],
+    parse: Callable[[str], object],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ImportReport:
+    """Import one quiz per non-blank line, committing a transaction per chunk.
+
+    Byte lines are decoded as UTF-8; a line that is not valid UTF-8 is
+    reported like any other invalid line.
+    """
+    report = ImportReport()
+    chunk = []
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            chunk.append(parse(line))
+        except ValidationError as exc:
+            report.record_error(line_number, _describe(exc))
+            continue
+        except ValueError as exc:
+            report.record_error(line_number, str(exc))
+            continue
+        if len(chunk) >= chunk_size:
+            report.imported += len(await insert_quizzes(session, creator_id, chunk))
+            await session.commit()
+            chunk = []
+    if chunk:
+        report.imported += len(await insert_quizzes(session, creator_id, chunk))
+        await session.commit()
+    return report
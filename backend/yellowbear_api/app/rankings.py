@@ -0,0 +1,184 @@
+"""
+Precomputed trending and popular quiz rankings for the homepage.
+
+Every ``RANKING_REFRESH_SECONDS`` one worker recomputes trending scores from
+the attempts and comments of the last ``TRENDING_WINDOW_HOURS``. It counts
+them per quiz and hour, and each hour's count decays with a half-life of
+``TRENDING_HALF_LIFE_HOURS`` (a comment weighs ``TRENDING_COMMENT_WEIGHT``
+attempts). The scores replace the contents of the ``quiz_rankings`` table.
+Other workers that find a fresh table only reload it.
+
+Each worker then keeps the top ``RANKING_TOP_K`` quizzes per quiz type (and
+across all types) in memory, both by trending score and by ``attempt_count``
+(read through ``idx_quiz_type_popular``). ``GET /api/quizzes/trending`` and
+``/popular`` never sort the catalog per request. The first build runs in the
+background, like the leaderboard's.
+"""
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .database import async_session
+from .models import Comment, Quiz, QuizAttempt, QuizRanking
+
+logger = logging.getLogger(__name__)
+
+RANKING_REFRESH_SECONDS = int(os.getenv("RANKING_REFRESH_SECONDS", "60"))
+RANKING_TOP_K = int(os.getenv("RANKING_TOP_K", "100"))
+TRENDING_WINDOW_HOURS = int(os.getenv("TRENDING_WINDOW_HOURS", "72"))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_COMMENT_WEIGHT = float(os.getenv("TRENDING_COMMENT_WEIGHT", "3"))
+
+RANKINGS = ("trending", "popular")
+
+# QuizResponse's fields, in its order
+_quiz_columns = (
+    Quiz.id,
+    Quiz.title,
+    Quiz.description,
+    Quiz.quiz_type,
+    Quiz.time_limit,
+    Quiz.attempt_count,
+    Quiz.creator_id,
+)
+
+
+def _hour(session: AsyncSession, column):
+    if session.bind.dialect.name == "postgresql":
+        return func.date_trunc("hour", column)
+    return func.strftime("%Y-%m-%d %H:00:00", column)
+
+
+def decayed(count: int, bucket: datetime, now: datetime, half_life_hours: float = TRENDING_HALF_LIFE_HOURS) -> float:
+    """``count`` events in the hour starting at ``bucket``, halved every ``half_life_hours``."""
+    age_hours = max((now - bucket).total_seconds() / 3600 - 0.5, 0.0)
+    return count * 0.5 ** (age_hours / half_life_hours)
+
+
+async def compute_trending(session: AsyncSession, now: datetime) -> List[dict]:
+    """``quiz_rankings`` rows for every quiz with attempts or comments in the window."""
+    since = now - timedelta(hours=TRENDING_WINDOW_HOURS)
+    scores: Counter = Counter()
+    counts: Dict[int, List[int]] = {}
+    quiz_types: Dict[int, str] = {}
+    sources = (
+        (QuizAttempt.quiz_id, QuizAttempt.created_at, (), 1.0, 0),
+        (Comment.quiz_id, Comment.created_at, (Comment.is_deleted == False,), TRENDING_COMMENT_WEIGHT, 1),
+    )
+    for quiz_id, created_at, conditions, weight, slot in sources:
+        hour = _hour(session, created_at)
+        rows = await session.execute(
+            select(quiz_id, Quiz.quiz_type, hour, func.count())
+            .join(Quiz, Quiz.id == quiz_id)
+            .filter(created_at >= since, *conditions)
+            .group_by(quiz_id, Quiz.quiz_type, hour)
+        )
+        for row_quiz_id, quiz_type, bucket, count in rows:
+            # SQLite returns the hour as text, Postgres as a timestamp
+            bucket = datetime.fromisoformat(str(bucket)[:19])
+            scores[row_quiz_id] += weight * decayed(count, bucket, now)
+            counts.setdefault(row_quiz_id, [0, 0])[slot] += count
+            quiz_types[row_quiz_id] = quiz_type
+    return [
+        {
+            "quiz_id": quiz_id,
+            "quiz_type": quiz_types[quiz_id],
+            "trending_score": score,
+            "recent_attempts": counts[quiz_id][0],
+            "recent_comments": counts[quiz_id][1],
+            "refreshed_at": now,
+        }
+        for quiz_id, score in scores.items()
+    ]
+
+
+class QuizRankings:
+    def __init__(self, refresh_seconds: int = RANKING_REFRESH_SECONDS, top_k: int = RANKING_TOP_K):
+        self.refresh_seconds = refresh_seconds
+        self.top_k = top_k
+        # (ranking, quiz_type or None for every type) -> ranked quiz dicts
+        self._top: Dict[Tuple[str, Optional[str]], List[dict]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+
+    async def wait_ready(self) -> None:
+        """Wait for the first build once the background task is running."""
+        if self._task is not None:
+            await self._ready.wait()
+
+    def top(self, ranking: str, quiz_type: Optional[str] = None, limit: int = 20) -> List[dict]:
+        return self._top.get((ranking, quiz_type), [])[:limit]
+
+    async def refresh(self, force: bool = False) -> bool:
+        """Recompute ``quiz_rankings`` unless another worker just did, then reload the top lists.
+
+        Returns whether this call recomputed the table.
+        """
+        now = datetime.utcnow()
+        recomputed = False
+        async with async_session() as session:
+            last = (await session.execute(select(func.max(QuizRanking.refreshed_at)))).scalar()
+            if force or last is None or now - last >= timedelta(seconds=self.refresh_seconds / 2):
+                rows = await compute_trending(session, now)
+                await session.execute(delete(QuizRanking))
+                if rows:
+                    await session.execute(insert(QuizRanking), rows)
+                await session.commit()
+                recomputed = True
+            self._top = await self._load_top(session)
+        return recomputed
+
+    async def _load_top(self, session: AsyncSession) -> Dict[Tuple[str, Optional[str]], List[dict]]:
+        top = {}
+        quiz_types = (await session.execute(select(Quiz.quiz_type).distinct())).scalars().all()
+        for quiz_type in (None, *quiz_types):
+            trending = (
+                select(*_quiz_columns, QuizRanking.trending_score.label("score"))
+                .join(QuizRanking, QuizRanking.quiz_id == Quiz.id)
+                .order_by(QuizRanking.trending_score.desc(), Quiz.id.desc())
+                .limit(self.top_k)
+            )
+            popular = (
+                select(*_quiz_columns, Quiz.attempt_count.label("score"))
+                .filter(Quiz.attempt_count > 0)
+                .order_by(Quiz.attempt_count.desc(), Quiz.id.desc())
+                .limit(self.top_k)
+            )
+            if quiz_type is not None:
+                trending = trending.filter(QuizRanking.quiz_type == quiz_type)
+                popular = popular.filter(Quiz.quiz_type == quiz_type)
+            for ranking, query in (("trending", trending), ("popular", popular)):
+                rows = [dict(row._mapping) for row in await session.execute(query)]
+                for row in rows:
+                    row["score"] = float(row["score"])
+                top[(ranking, quiz_type)] = rows
+        return top
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Quiz ranking refresh failed")
+            # Readers are released even after a failed build rather than hanging
+            self._ready.set()
+            await asyncio.sleep(self.refresh_seconds)
+
+
+quiz_rankings = QuizRankings()
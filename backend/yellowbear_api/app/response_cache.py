@@ -0,0 +1,293 @@
+"""
+HTTP response cache for the public, read-heavy GET endpoints.
+
+``ResponseCacheMiddleware`` serves configured routes from a cache keyed by
+path, query string and the current value of each route's version counters
+(``quizzes``, ``quiz:<id>``, ``comments:<id>``). Handlers bump those counters
+after a write, so stale entries are never looked up again and simply expire.
+Cached responses carry a strong ETag computed from the body; requests with a
+matching ``If-None-Match`` get a 304 without touching the database or
+re-serializing anything. ``Cache-Control`` lets the nginx proxy cache list and
+detail pages for a few seconds and makes browsers revalidate.
+
+Entries live in an in-process LRU by default. ``RESPONSE_CACHE_URL`` can point
+at a Redis-compatible server (``redis://...``, needs the ``redis`` package)
+so several processes share entries and versions.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .invalidation import invalidation_bus
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "memory://")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+# Bodies larger than this are passed through uncached
+RESPONSE_CACHE_MAX_BODY = 512 * 1024
+
+
+@dataclass(frozen=True)
+class CacheRule:
+    route: str  # path template, reported as the route of cache hits
+    pattern: "re.Pattern"
+    ttl: int  # seconds an entry is served from this process's cache
+    edge_ttl: int  # s-maxage for the nginx proxy cache; 0 makes every cache revalidate
+    versions: Tuple[str, ...]  # version counters, formatted with the path's named groups
+
+    def match(self, path: str) -> Optional[Tuple[str, ...]]:
+        found = self.pattern.match(path)
+        if found is None:
+            return None
+        return tuple(version.format(**found.groupdict()) for version in self.versions)
+
+    @property
+    def cache_control(self) -> str:
+        if self.edge_ttl:
+            return f"public, max-age=0, s-maxage={self.edge_ttl}, stale-while-revalidate={self.edge_ttl}"
+        return "public, max-age=0, must-revalidate"
+
+
+CACHE_RULES = (
+    CacheRule("/api/quizzes", re.compile(r"^/api/quizzes$"), ttl=30, edge_ttl=10, versions=("quizzes",)),
+    # Rebuilt in the background every RANKING_REFRESH_SECONDS, so a short TTL is all they need
+    CacheRule(
+        "/api/quizzes/{ranking}", re.compile(r"^/api/quizzes/(?P<ranking>trending|popular)$"), ttl=15, edge_ttl=15,
+        versions=(),
+    ),
+    # Detail pages can embed the first comment page (?fields=comments)
+    CacheRule(
+        "/api/quizzes/{quiz_id}",
+        re.compile(r"^/api/quizzes/(?P<quiz_id>\d+)$"),
+        ttl=60,
+        edge_ttl=10,
+        versions=("quiz:{quiz_id}", "comments:{quiz_id}"),
+    ),
+    CacheRule(
+        "/api/quizzes/{quiz_id}/comments",
+        re.compile(r"^/api/quizzes/(?P<quiz_id>\d+)/comments$"),
+        ttl=60,
+        edge_ttl=0,
+        versions=("comments:{quiz_id}",),
+    ),
+)
+
+
+class MemoryBackend:
+    """In-process LRU of entries with per-entry expiry, plus version counters."""
+
+    shared = False
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def versions(self, names: Iterable[str]) -> List[int]:
+        return [self._versions.get(name, 0) for name in names]
+
+    async def bump(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._versions.clear()
+
+
+class RedisBackend:
+    """Entries and versions in a Redis-compatible server, shared by every process."""
+
+    PREFIX = "yb:rc:"
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RESPONSE_CACHE_URL=redis://... requires the 'redis' package") from exc
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(self.PREFIX + key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self._redis.set(self.PREFIX + key, value, ex=ttl)
+
+    async def versions(self, names: Iterable[str]) -> List[int]:
+        values = await self._redis.mget([self.PREFIX + "v:" + name for name in names])
+        return [int(value or 0) for value in values]
+
+    async def bump(self, names: Iterable[str]) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.incr(self.PREFIX + "v:" + name)
+            await pipe.execute()
+
+    async def clear(self) -> None:
+        async for key in self._redis.scan_iter(match=self.PREFIX + "*"):
+            await self._redis.delete(key)
+
+
+def create_backend(url: str = RESPONSE_CACHE_URL):
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported RESPONSE_CACHE_URL: {url}")
+
+
+def _strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    def __init__(self, backend=None, rules: Tuple[CacheRule, ...] = CACHE_RULES, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self._backend = backend
+        self.rules = rules
+        self.enabled = enabled
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    def rule_for(self, path: str) -> Optional[Tuple[CacheRule, Tuple[str, ...]]]:
+        for rule in self.rules:
+            versions = rule.match(path)
+            if versions is not None:
+                return rule, versions
+        return None
+
+    async def invalidate(self, *names: str) -> None:
+        """Bump version counters after a write; entries built on older versions are never served again."""
+        if self.enabled and names:
+            await self.backend.bump(names)
+            if not self.backend.shared:
+                await invalidation_bus.publish("response_cache", list(names))
+
+    async def apply_remote(self, names: List[str]) -> None:
+        """Versions bumped by another worker."""
+        await self.backend.bump(names)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    async def key_for(self, path: str, query: str, versions: Tuple[str, ...]) -> str:
+        numbers = await self.backend.versions(versions)
+        stamp = ",".join(f"{name}={number}" for name, number in zip(versions, numbers))
+        return f"{path}?{query}|{stamp}"
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving ``ResponseCache`` rules; everything else passes straight through."""
+
+    def __init__(self, app, cache: "ResponseCache" = None):
+        self.app = app
+        self.cache = cache if cache is not None else response_cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or not self.cache.enabled:
+            return await self.app(scope, receive, send)
+        matched = self.cache.rule_for(scope["path"])
+        if matched is None:
+            return await self.app(scope, receive, send)
+        rule, versions = matched
+
+        query = scope.get("query_string", b"").decode("latin-1")
+        key = await self.cache.key_for(scope["path"], query, versions)
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+
+        cached = await self.cache.backend.get(key)
+        if cached is not None:
+            scope["cached_route"] = rule.route
+            meta, body = cached.split(b"\n", 1)
+            meta = json.loads(meta)
+            return await self._send(send, scope, rule, meta["etag"], meta["content_type"], body, if_none_match, "HIT")
+
+        captured = {"status": None, "headers": [], "body": []}
+        passthrough = False
+
+        async def capture(message):
+            nonlocal passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                captured["headers"] = message.get("headers", [])
+                if message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                return
+            if message["type"] == "http.response.body":
+                captured["body"].append(message.get("body", b""))
+                if sum(len(part) for part in captured["body"]) > RESPONSE_CACHE_MAX_BODY:
+                    passthrough = True
+                    await send({"type": "http.response.start", "status": captured["status"], "headers": captured["headers"]})
+                    await send({"type": "http.response.body", "body": b"".join(captured["body"]), "more_body": message.get("more_body", False)})
+                    return
+                if not message.get("more_body", False):
+                    await self._store(send, scope, rule, key, captured, if_none_match)
+
+        await self.app(scope, receive, capture)
+
+    async def _store(self, send, scope, rule: CacheRule, key: str, captured: dict, if_none_match: Optional[str]):
+        body = b"".join(captured["body"])
+        content_type = "application/json"
+        for name, value in captured["headers"]:
+            if name == b"content-type":
+                content_type = value.decode("latin-1")
+        etag = _strong_etag(body)
+        meta = json.dumps({"etag": etag, "content_type": content_type}).encode()
+        await self.cache.backend.set(key, meta + b"\n" + body, rule.ttl)
+        await self._send(send, scope, rule, etag, content_type, body, if_none_match, "MISS")
+
+    async def _send(self, send, scope, rule: CacheRule, etag: str, content_type: str, body: bytes,
+                    if_none_match: Optional[str], outcome: str):
+        headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", rule.cache_control.encode()),
+            (b"x-cache", outcome.encode()),
+        ]
+        if _etag_matches(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers += [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+
+response_cache = ResponseCache()
@@ -3,7 +3,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from ..database import get_db
 from ..models import User
-from ..auth import get_password_hash, verify_password, create_access_token
+from ..auth import create_user_token, password_hasher
+from ..leaderboard import leaderboard
 from pydantic import BaseModel, EmailStr
 from datetime import timedelta
 
@@ -44,17 +45,15 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     db_user = User(
         username=user.username,
         email=user.email,
-        password_hash=get_password_hash(user.password)
+        password_hash=await password_hasher.hash(user.password)
     )
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
+    leaderboard.add_user(db_user.id, db_user.username)
     
     # Create access token
-    access_token = create_access_token(
-        data={"sub": str(db_user.id)},
-        expires_delta=timedelta(minutes=30)
-    )
+    access_token = create_user_token(db_user, expires_delta=timedelta(minutes=30))
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=Token)
@@ -63,16 +62,21 @@ async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).filter(User.email == user_data.email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(user_data.password, user.password_hash):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(user_data.password, user.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Stored hash used a different bcrypt cost; upgrade it transparently
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+    
     # Create access token
-    access_token = create_access_token(
-        data={"sub": str(user.id)},
-        expires_delta=timedelta(minutes=30)
-    )
+    access_token = create_user_token(user, expires_delta=timedelta(minutes=30))
     return {"access_token": access_token, "token_type": "bearer"}
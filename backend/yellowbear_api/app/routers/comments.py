@@ -1,10 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import or_, select
 from typing import List, Optional
+from datetime import datetime
 from pydantic import BaseModel
 from .. import models, database
-from ..auth import get_current_user
+from ..auth import CurrentUser, auth_cache, get_current_user
+from ..fast_json import fast_response
+from ..instrumentation import query_budget
+from ..invalidation import invalidation_bus
+from ..leaderboard import leaderboard
+from ..points import ledger_entry, record_points
+from ..response_cache import response_cache
+from ..pagination import clamp_limit, decode_cursor, encode_cursor
 
 router = APIRouter()
 
@@ -17,34 +25,96 @@ class CommentResponse(BaseModel):
     author_id: int
     quiz_id: int
     parent_id: Optional[int]
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: Optional[datetime]
     likes_count: int
     author_username: str
+    replies: List["CommentResponse"] = []
 
     class Config:
         from_attributes = True
 
-@router.get("/api/quizzes/{quiz_id}/comments", response_model=List[CommentResponse])
+class CommentPage(BaseModel):
+    comments: List[CommentResponse]
+    next_cursor: Optional[str]
+
+_comment_columns = (
+    models.Comment.id,
+    models.Comment.content,
+    models.Comment.author_id,
+    models.Comment.quiz_id,
+    models.Comment.parent_id,
+    models.Comment.created_at,
+    models.Comment.updated_at,
+    models.Comment.likes_count,
+    models.User.username.label("author_username"),
+)
+
+def _select_comments():
+    # Columns plus the author's username in one join, no ORM entities or lazy loads
+    return select(*_comment_columns).join(models.User, models.Comment.author_id == models.User.id)
+
+@router.get("/api/quizzes/{quiz_id}/comments", response_model=CommentPage)
+@query_budget(2)
 async def get_quiz_comments(
     quiz_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 20,
     db: AsyncSession = Depends(database.get_db)
 ):
+    """Newest top-level comments first, each with its full reply thread in posting order."""
+    return fast_response(await load_comment_page(db, quiz_id, cursor, limit))
+
+async def load_comment_page(db: AsyncSession, quiz_id: int, cursor: Optional[str] = None, limit: int = 20) -> dict:
+    """One ``CommentPage`` in at most two queries: the top-level page, then every reply under it."""
+    limit = clamp_limit(limit)
+    query = _select_comments().where(
+        models.Comment.quiz_id == quiz_id,
+        models.Comment.parent_id.is_(None),
+        models.Comment.is_deleted == False
+    )
+    after = decode_cursor(cursor, 1)
+    if after is not None:
+        query = query.where(models.Comment.id < after[0])
+    result = await db.execute(query.order_by(models.Comment.id.desc()).limit(limit + 1))
+    top_level = [dict(row._mapping) for row in result]
+    
+    next_cursor = None
+    if len(top_level) > limit:
+        top_level = top_level[:limit]
+        next_cursor = encode_cursor([top_level[-1]["id"]])
+    if not top_level:
+        return {"comments": [], "next_cursor": None}
+    
+    # Every reply under this page in one query; thread_id covers nested replies
+    page_ids = [c["id"] for c in top_level]
     result = await db.execute(
-        select(models.Comment).where(
-            models.Comment.quiz_id == quiz_id,
+        _select_comments().where(
+            or_(models.Comment.thread_id.in_(page_ids), models.Comment.parent_id.in_(page_ids)),
             models.Comment.is_deleted == False
-        )
+        ).order_by(models.Comment.id)
     )
-    comments = result.scalars().all()
-    return comments
+    
+    nodes = {c["id"]: c for c in top_level}
+    for c in top_level:
+        c["replies"] = []
+    for row in result:
+        reply = dict(row._mapping)
+        reply["replies"] = []
+        parent = nodes.get(reply["parent_id"])
+        # Replies under a deleted comment are dropped with it
+        if parent is not None:
+            parent["replies"].append(reply)
+            nodes[reply["id"]] = reply
+    
+    return {"comments": top_level, "next_cursor": next_cursor}
 
 @router.post("/api/quizzes/{quiz_id}/comments", status_code=status.HTTP_201_CREATED)
 async def create_comment(
     quiz_id: int,
     comment: CommentCreate,
     db: AsyncSession = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     db_comment = models.Comment(
         content=comment.content,
@@ -52,12 +122,16 @@ async def create_comment(
         author_id=current_user.id
     )
     db.add(db_comment)
-    await db.commit()
-    await db.refresh(db_comment)
+    await db.flush()
     
-    # Award points for commenting
-    current_user.points += 1
+    # Award points for commenting; folded into users.points by the aggregator
+    await record_points(db, [ledger_entry(current_user.id, "comment", 1, source_id=db_comment.id)])
     await db.commit()
+    await db.refresh(db_comment)
+    await response_cache.invalidate(f"comments:{quiz_id}")
+    leaderboard.record_points(current_user.id, 1)
+    auth_cache.add_points(current_user.id, 1)
+    await invalidation_bus.publish("points", [[current_user.id, 1, None]])
     
     return db_comment
 
@@ -66,7 +140,7 @@ async def create_reply(
     comment_id: int,
     reply: CommentCreate,
     db: AsyncSession = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     result = await db.execute(
         select(models.Comment).where(models.Comment.id == comment_id)
@@ -79,15 +153,20 @@ async def create_reply(
         content=reply.content,
         quiz_id=parent_comment.quiz_id,
         author_id=current_user.id,
-        parent_id=comment_id
+        parent_id=comment_id,
+        thread_id=parent_comment.thread_id or parent_comment.id
     )
     db.add(db_reply)
-    await db.commit()
-    await db.refresh(db_reply)
+    await db.flush()
     
     # Award points for replying
-    current_user.points += 1
+    await record_points(db, [ledger_entry(current_user.id, "reply", 1, source_id=db_reply.id)])
     await db.commit()
+    await db.refresh(db_reply)
+    await response_cache.invalidate(f"comments:{db_reply.quiz_id}")
+    leaderboard.record_points(current_user.id, 1)
+    auth_cache.add_points(current_user.id, 1)
+    await invalidation_bus.publish("points", [[current_user.id, 1, None]])
     
     return db_reply
 
@@ -96,7 +175,7 @@ async def update_comment(
     comment_id: int,
     comment: CommentCreate,
     db: AsyncSession = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     result = await db.execute(
         select(models.Comment).where(models.Comment.id == comment_id)
@@ -111,13 +190,14 @@ async def update_comment(
     db_comment.content = comment.content
     await db.commit()
     await db.refresh(db_comment)
+    await response_cache.invalidate(f"comments:{db_comment.quiz_id}")
     return db_comment
 
 @router.delete("/api/comments/{comment_id}")
 async def delete_comment(
     comment_id: int,
     db: AsyncSession = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     result = await db.execute(
         select(models.Comment).where(models.Comment.id == comment_id)
@@ -131,4 +211,5 @@ async def delete_comment(
     
     db_comment.is_deleted = True
     await db.commit()
+    await response_cache.invalidate(f"comments:{db_comment.quiz_id}")
     return {"message": "Comment deleted successfully"}
@@ -0,0 +1,42 @@
+import hmac
+import os
+from datetime import datetime
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from ..export import EXPORT_FORMATS, export_attempts
+
+router = APIRouter(prefix="/api/attempts", tags=["export"])
+
+# Attempts of every user are exported, so the endpoint is off unless a token is configured
+EXPORT_API_TOKEN = os.getenv("EXPORT_API_TOKEN")
+
+def _check_token(token: Optional[str]) -> None:
+    if not EXPORT_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not hmac.compare_digest(token, EXPORT_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid export token")
+
+@router.get("/export")
+async def export_quiz_attempts(
+    format: str = "ndjson",
+    quiz_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after_id: int = 0,
+    x_export_token: Optional[str] = Header(None)
+):
+    """gzip-compressed NDJSON or CSV of quiz attempts in id order; resume with ``after_id``."""
+    _check_token(x_export_token)
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    
+    body = export_attempts(
+        format, quiz_id=quiz_id, user_id=user_id, since=since, until=until, after_id=after_id
+    )
+    return StreamingResponse(
+        body,
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="quiz_attempts.{format}.gz"'}
+    )
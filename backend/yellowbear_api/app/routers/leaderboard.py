@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import List, Optional
+from pydantic import BaseModel
+from ..database import get_db
+from ..models import User
+from ..auth import CurrentUser, get_current_user
+from ..leaderboard import TIMEFRAMES, leaderboard
+from ..pagination import clamp_limit
+
+router = APIRouter(prefix="/api/leaderboard", tags=["leaderboard"])
+
+class RankingEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: Optional[str]
+    points: int
+
+class LeaderboardPage(BaseModel):
+    rankings: List[RankingEntry]
+    total: int
+    page: int
+
+class MyRank(BaseModel):
+    rank: Optional[int]
+    points: int
+    neighbors: List[RankingEntry]
+
+def _check_timeframe(timeframe: str) -> None:
+    if timeframe not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"timeframe must be one of {', '.join(TIMEFRAMES)}")
+
+async def _entries(rows, db: AsyncSession) -> List[RankingEntry]:
+    missing = [user_id for _, user_id, _ in rows if user_id not in leaderboard.usernames]
+    if missing:
+        # Users registered since the last rebuild
+        result = await db.execute(select(User.id, User.username).filter(User.id.in_(missing)))
+        for user_id, username in result.all():
+            leaderboard.add_user(user_id, username)
+    return [
+        RankingEntry(rank=rank, user_id=user_id, username=leaderboard.usernames.get(user_id), points=points)
+        for rank, user_id, points in rows
+    ]
+
+@router.get("", response_model=LeaderboardPage)
+async def get_leaderboard(
+    timeframe: str = "all",
+    page: int = 1,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_db)
+):
+    _check_timeframe(timeframe)
+    await leaderboard.wait_ready()
+    limit = clamp_limit(limit)
+    page = max(page, 1)
+    board = leaderboard.board(timeframe)
+    rows = board.slice((page - 1) * limit, limit)
+    return LeaderboardPage(rankings=await _entries(rows, db), total=len(board), page=page)
+
+@router.get("/me", response_model=MyRank)
+async def get_my_rank(
+    timeframe: str = "all",
+    radius: int = 5,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    _check_timeframe(timeframe)
+    await leaderboard.wait_ready()
+    board = leaderboard.board(timeframe)
+    rows = board.around(current_user.id, min(max(radius, 0), 50))
+    return MyRank(
+        rank=board.rank(current_user.id),
+        points=board.scores.get(current_user.id, 0),
+        neighbors=await _entries(rows, db)
+    )
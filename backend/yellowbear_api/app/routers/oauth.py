@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from typing import Optional
-import httpx
-import json
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 from os import getenv
 from .. import models, database
-from ..auth import create_access_token
+from ..auth import create_user_token
+from ..leaderboard import leaderboard
+from ..oauth_client import OAuthProviderError, oauth_client
 
 router = APIRouter()
 
@@ -15,6 +16,50 @@ WECHAT_APP_SECRET = getenv("WECHAT_APP_SECRET")
 WEIBO_APP_KEY = getenv("WEIBO_APP_KEY")
 WEIBO_APP_SECRET = getenv("WEIBO_APP_SECRET")
 FRONTEND_URL = getenv("FRONTEND_URL")
+# Overridable so tests and staging can point at a stand-in provider
+WECHAT_API_URL = getenv("WECHAT_API_URL", "https://api.weixin.qq.com")
+WEIBO_API_URL = getenv("WEIBO_API_URL", "https://api.weibo.com")
+
+async def _provider_json(method: str, url: str, idempotent: bool = True, **kwargs) -> dict:
+    try:
+        return await oauth_client.request_json(method, url, idempotent=idempotent, **kwargs)
+    except OAuthProviderError:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Login provider is unavailable")
+
+async def upsert_social_user(db: AsyncSession, email: str, username: str) -> models.User:
+    """The user for a provider account, created on first login."""
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    user = result.scalar_one_or_none()
+    if user:
+        return user
+
+    # Nicknames are not unique across providers; fall back to a suffixed name
+    for candidate in (username, f"{username}_{email.split('@')[0][-6:]}"):
+        user = models.User(
+            username=candidate[:50],
+            email=email,
+            password_hash="social_login",  # Set a placeholder password
+            points=0
+        )
+        db.add(user)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            # A concurrent callback for the same account may have created it
+            result = await db.execute(select(models.User).filter(models.User.email == email))
+            existing = result.scalar_one_or_none()
+            if existing:
+                return existing
+            continue
+        await db.refresh(user)
+        leaderboard.add_user(user.id, user.username)
+        return user
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Could not create an account for this login")
+
+def _login_redirect(user: models.User) -> RedirectResponse:
+    access_token = create_user_token(user)
+    return RedirectResponse(url=f"{FRONTEND_URL}/login?token={access_token}")
 
 @router.get("/api/auth/wechat")
 async def wechat_login():
@@ -24,41 +69,35 @@ async def wechat_login():
     return RedirectResponse(url=auth_url)
 
 @router.get("/api/auth/wechat/callback")
-async def wechat_callback(code: str, db: Session = Depends(database.get_db)):
+async def wechat_callback(code: str, db: AsyncSession = Depends(database.get_db)):
     """Handle WeChat OAuth callback"""
-    async with httpx.AsyncClient() as client:
-        # Exchange code for access token
-        token_url = f"https://api.weixin.qq.com/sns/oauth2/access_token?appid={WECHAT_APP_ID}&secret={WECHAT_APP_SECRET}&code={code}&grant_type=authorization_code"
-        token_response = await client.get(token_url)
-        token_data = token_response.json()
-        
-        if "errcode" in token_data:
-            raise HTTPException(status_code=400, detail="Failed to get WeChat access token")
-        
-        # Get user info
-        user_info_url = f"https://api.weixin.qq.com/sns/userinfo?access_token={token_data['access_token']}&openid={token_data['openid']}"
-        user_info_response = await client.get(user_info_url)
-        user_info = user_info_response.json()
-        
+    # Exchange code for access token; the code is single-use, so only resend it if the request never went out
+    token_data = await _provider_json(
+        "GET",
+        f"{WECHAT_API_URL}/sns/oauth2/access_token",
+        idempotent=False,
+        params={"appid": WECHAT_APP_ID, "secret": WECHAT_APP_SECRET, "code": code, "grant_type": "authorization_code"},
+    )
+
+    if "errcode" in token_data:
+        raise HTTPException(status_code=400, detail="Failed to get WeChat access token")
+
+    # Get user info
+    async def fetch_user_info():
+        user_info = await _provider_json(
+            "GET",
+            f"{WECHAT_API_URL}/sns/userinfo",
+            params={"access_token": token_data["access_token"], "openid": token_data["openid"]},
+        )
         if "errcode" in user_info:
             raise HTTPException(status_code=400, detail="Failed to get WeChat user info")
-        
-        # Find or create user
-        user = db.query(models.User).filter(models.User.email == f"{user_info['openid']}@wechat.com").first()
-        if not user:
-            user = models.User(
-                username=user_info["nickname"],
-                email=f"{user_info['openid']}@wechat.com",
-                password_hash="social_login",  # Set a placeholder password
-                points=0
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        
-        # Create JWT token
-        access_token = create_access_token(data={"sub": user.email})
-        return RedirectResponse(url=f"{FRONTEND_URL}/login?token={access_token}")
+        return user_info
+
+    user_info = await oauth_client.user_info("wechat", token_data["openid"], fetch_user_info)
+
+    # Find or create user
+    user = await upsert_social_user(db, f"{user_info['openid']}@wechat.com", user_info["nickname"])
+    return _login_redirect(user)
 
 @router.get("/api/auth/weibo")
 async def weibo_login():
@@ -68,45 +107,38 @@ async def weibo_login():
     return RedirectResponse(url=auth_url)
 
 @router.get("/api/auth/weibo/callback")
-async def weibo_callback(code: str, db: Session = Depends(database.get_db)):
+async def weibo_callback(code: str, db: AsyncSession = Depends(database.get_db)):
     """Handle Weibo OAuth callback"""
-    async with httpx.AsyncClient() as client:
-        # Exchange code for access token
-        token_url = "https://api.weibo.com/oauth2/access_token"
-        data = {
+    # Exchange code for access token
+    token_data = await _provider_json(
+        "POST",
+        f"{WEIBO_API_URL}/oauth2/access_token",
+        idempotent=False,
+        data={
             "client_id": WEIBO_APP_KEY,
             "client_secret": WEIBO_APP_SECRET,
             "grant_type": "authorization_code",
             "code": code,
             "redirect_uri": f"{FRONTEND_URL}/api/auth/weibo/callback"
-        }
-        token_response = await client.post(token_url, data=data)
-        token_data = token_response.json()
-        
-        if "error" in token_data:
-            raise HTTPException(status_code=400, detail="Failed to get Weibo access token")
-        
-        # Get user info
-        user_info_url = f"https://api.weibo.com/2/users/show.json?access_token={token_data['access_token']}&uid={token_data['uid']}"
-        user_info_response = await client.get(user_info_url)
-        user_info = user_info_response.json()
-        
+        },
+    )
+
+    if "error" in token_data:
+        raise HTTPException(status_code=400, detail="Failed to get Weibo access token")
+
+    # Get user info
+    async def fetch_user_info():
+        user_info = await _provider_json(
+            "GET",
+            f"{WEIBO_API_URL}/2/users/show.json",
+            params={"access_token": token_data["access_token"], "uid": token_data["uid"]},
+        )
         if "error" in user_info:
             raise HTTPException(status_code=400, detail="Failed to get Weibo user info")
-        
-        # Find or create user
-        user = db.query(models.User).filter(models.User.email == f"{user_info['id']}@weibo.com").first()
-        if not user:
-            user = models.User(
-                username=user_info["screen_name"],
-                email=f"{user_info['id']}@weibo.com",
-                password_hash="social_login",  # Set a placeholder password
-                points=0
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        
-        # Create JWT token
-        access_token = create_access_token(data={"sub": user.email})
-        return RedirectResponse(url=f"{FRONTEND_URL}/login?token={access_token}")
+        return user_info
+
+    user_info = await oauth_client.user_info("weibo", str(token_data["uid"]), fetch_user_info)
+
+    # Find or create user
+    user = await upsert_social_user(db, f"{user_info['id']}@weibo.com", user_info["screen_name"])
+    return _login_redirect(user)
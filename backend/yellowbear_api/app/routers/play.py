@@ -0,0 +1,108 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from ..auth import get_current_user
+from ..grading import answer_key_cache
+from ..play import PlayError, PlaySession
+from .quiz import record_attempt
+
+router = APIRouter(prefix="/api/quizzes", tags=["play"])
+
+# Application close codes, mirroring the HTTP status of the equivalent REST error
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND = 4404
+CLOSE_BAD_QUIZ = 4400
+CLOSE_TIMEOUT = 4408
+
+# Idle connections are closed (and their attempt saved) after this many seconds
+IDLE_TIMEOUT = 300
+
+@router.websocket("/{quiz_id}/play")
+async def play_quiz(
+    websocket: WebSocket,
+    quiz_id: int,
+    token: str = "",
+    db: AsyncSession = Depends(get_db)
+):
+    """Live play of a list quiz.
+
+    Connect with ``?token=<access token>``. The server sends ``ready``, then
+    answers each ``{"type": "guess", "text": ..., "position": optional}``
+    message with a ``result``. ``{"type": "finish"}`` (or the time limit, or
+    naming every answer) saves the attempt and returns ``finished`` with the
+    same summary as ``POST /api/quizzes/{quiz_id}/attempts``.
+    """
+    await websocket.accept()
+    try:
+        user = await get_current_user(token, db)
+    except HTTPException:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason="Could not validate credentials")
+        return
+    key = await answer_key_cache.load(db, quiz_id)
+    if key is None:
+        await websocket.close(code=CLOSE_NOT_FOUND, reason="Quiz not found")
+        return
+    try:
+        if not key.answers:
+            raise PlayError("Quiz has no answers")
+        session = PlaySession(key)
+    except PlayError as exc:
+        await websocket.close(code=CLOSE_BAD_QUIZ, reason=str(exc))
+        return
+    # The session needs nothing more from the database until the attempt is queued
+    await db.close()
+
+    await websocket.send_json({
+        "type": "ready",
+        "total_questions": len(key),
+        "any_order": key.match_any_order,
+        "time_limit": key.time_limit
+    })
+
+    close_code = status.WS_1000_NORMAL_CLOSURE
+    try:
+        while not session.complete:
+            timeout = IDLE_TIMEOUT
+            if key.time_limit is not None:
+                timeout = min(timeout, key.time_limit - session.elapsed)
+            try:
+                message = await asyncio.wait_for(websocket.receive_json(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                close_code = CLOSE_TIMEOUT
+                break
+            except (json.JSONDecodeError, KeyError):  # KeyError: binary frame
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            if session.expired:
+                close_code = CLOSE_TIMEOUT
+                break
+            if message.get("type") == "finish":
+                break
+            if message.get("type") != "guess":
+                await websocket.send_json({"type": "error", "detail": "Unknown message type"})
+                continue
+            try:
+                await websocket.send_json(session.guess(message.get("text"), message.get("position")))
+            except PlayError as exc:
+                await websocket.send_json({"type": "error", "detail": str(exc)})
+    except WebSocketDisconnect:
+        # Count the play if the player got as far as guessing
+        if session.guesses:
+            await _save(session, user.id)
+        return
+
+    summary = await _save(session, user.id)
+    await websocket.send_json(dict(summary, type="finished"))
+    await websocket.close(code=close_code)
+
+async def _save(session: PlaySession, user_id: int) -> dict:
+    graded = session.result()
+    completion_time = int(session.elapsed)
+    if session.key.time_limit is not None:
+        completion_time = min(completion_time, session.key.time_limit)
+    return await record_attempt(session.key, user_id, graded, completion_time, list(graded.given))
@@ -1,15 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import hmac
+import json
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from typing import List, Optional, Union
 from pydantic import BaseModel, validator
 from ..database import get_db
 from ..models import Quiz, QuizAnswer, QuizAttempt, User
-from ..auth import get_current_user
+from ..auth import CurrentUser, get_current_user
+from ..fast_json import fast_response
+from ..grading import AnswerKey, GradeResult, answer_key_cache
+from ..ingest import PendingAttempt, attempt_ingestor
+from ..instrumentation import query_budget
+from ..pagination import clamp_limit, decode_cursor, encode_cursor
+from ..response_cache import response_cache
+from ..quiz_import import (
+    IMPORT_CHUNK_SIZE, MAX_IMPORT_BYTES, MAX_IMPORT_CHUNK_SIZE, import_quiz_stream, insert_quizzes, iter_lines
+)
+from ..search import quiz_search_filter
+from .comments import CommentPage, load_comment_page
 
 router = APIRouter(prefix="/api/quizzes", tags=["quizzes"])
 
+# Bulk import is for partner migrations, so it is off unless a token is configured
+IMPORT_API_TOKEN = os.getenv("IMPORT_API_TOKEN")
+
 class AnswerCreate(BaseModel):
     correct_answer: str
     aliases: List[str] = []
@@ -25,6 +44,7 @@ class QuizCreate(BaseModel):
     answers: Optional[List[AnswerCreate]] = []
     is_multiple_choice: bool = False
     allow_multiple_answers: bool = False
+    match_any_order: bool = False  # list quizzes: answers may be named in any order ("name all X")
 
 class QuizResponse(BaseModel):
     id: int
@@ -38,6 +58,43 @@ class QuizResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class QuizCreator(BaseModel):
+    id: int
+    username: str
+
+class AnswerOption(BaseModel):
+    id: int
+    position: int
+    text: str  # multiple choice only; list quiz answers are never sent before play
+
+class QuizAggregates(BaseModel):
+    attempt_count: int
+    average_score: float
+
+class QuizDetail(QuizResponse):
+    created_at: Optional[datetime] = None
+    is_multiple_choice: bool = False
+    allow_multiple_answers: bool = False
+    match_any_order: bool = False
+    creator: Optional[QuizCreator] = None
+    answer_count: Optional[int] = None
+    answers: Optional[List[AnswerOption]] = None
+    stats: Optional[QuizAggregates] = None
+    comments: Optional[CommentPage] = None
+
+# Optional sections of GET /api/quizzes/{quiz_id}; the default keeps the page header cheap
+DETAIL_FIELDS = ("creator", "stats", "answers", "comments")
+DEFAULT_DETAIL_FIELDS = "creator,stats"
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportLineError]
+
 class AttemptSubmit(BaseModel):
     answers: List[Union[str, List[str]]]  # String for list type, List[str] for multiple choice with multiple answers
     completion_time: int
@@ -53,152 +110,229 @@ class AttemptSubmit(BaseModel):
                     raise ValueError("Multiple choice answers must be strings")
         return v
 
-@router.get("", response_model=List[QuizResponse])
+class QuizPage(BaseModel):
+    quizzes: List[QuizResponse]
+    next_cursor: Optional[str]
+
+# Keyset orderings for list_quizzes. "newest" uses the primary key: ids are
+# assigned in creation order and, unlike created_at, are unique.
+QUIZ_SORTS = {
+    "newest": (Quiz.id,),
+    "popular": (Quiz.attempt_count, Quiz.id),
+}
+
+# QuizResponse's fields, in its order, so rows serialize exactly like the model
+_quiz_columns = (
+    Quiz.id,
+    Quiz.title,
+    Quiz.description,
+    Quiz.quiz_type,
+    Quiz.time_limit,
+    Quiz.attempt_count,
+    Quiz.creator_id,
+)
+
+@router.get("", response_model=QuizPage)
+@query_budget(1)
 async def list_quizzes(
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 10,
     search: Optional[str] = None,
+    sort: str = "newest",
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Quiz)
+    if sort not in QUIZ_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(QUIZ_SORTS)}")
+    keys = QUIZ_SORTS[sort]
+    limit = clamp_limit(limit)
+    
+    query = select(*_quiz_columns)
     if search:
-        query = query.filter(Quiz.title.ilike(f"%{search}%"))
-    query = query.offset(skip).limit(limit)
+        query = query.filter(quiz_search_filter(search))
+    after = decode_cursor(cursor, len(keys))
+    if after is not None:
+        query = query.filter(tuple_(*keys) < tuple_(*after))
+    query = query.order_by(*(key.desc() for key in keys)).limit(limit + 1)
     result = await db.execute(query)
-    return result.scalars().all()
+    quizzes = [dict(row._mapping) for row in result]
+    
+    next_cursor = None
+    if len(quizzes) > limit:
+        quizzes = quizzes[:limit]
+        last = quizzes[-1]
+        next_cursor = encode_cursor([last[key.key] for key in keys])
+    return fast_response({"quizzes": quizzes, "next_cursor": next_cursor})
 
 @router.post("", response_model=QuizResponse)
 async def create_quiz(
     quiz: QuizCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    db_quiz = Quiz(
-        creator_id=current_user.id,
+    [quiz_id] = await insert_quizzes(db, current_user.id, [quiz])
+    await db.commit()
+    answer_key_cache.invalidate(quiz_id)
+    await response_cache.invalidate("quizzes")
+    
+    return QuizResponse(
+        id=quiz_id,
         title=quiz.title,
         description=quiz.description,
         quiz_type=quiz.quiz_type,
         time_limit=quiz.time_limit,
-        is_multiple_choice=quiz.is_multiple_choice,
-        allow_multiple_answers=quiz.allow_multiple_answers
+        attempt_count=0,
+        creator_id=current_user.id
     )
-    db.add(db_quiz)
-    await db.commit()
-    await db.refresh(db_quiz)
-    
-    # Create answers if provided
-    if quiz.answers:
-        for answer in quiz.answers:
-            db_answer = QuizAnswer(
-                quiz_id=db_quiz.id,
-                correct_answer=answer.correct_answer,
-                aliases=answer.aliases,
-                position=answer.position,
-                is_correct=answer.is_correct,
-                explanation=answer.explanation
-            )
-            db.add(db_answer)
-        await db.commit()
-    
-    return db_quiz
 
-@router.get("/{quiz_id}", response_model=QuizResponse)
-async def get_quiz(quiz_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Quiz).filter(Quiz.id == quiz_id))
-    quiz = result.scalar_one_or_none()
+def _check_import_request(token: Optional[str], content_length: Optional[str]) -> None:
+    if not IMPORT_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not hmac.compare_digest(token, IMPORT_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid import token")
+    # The server stops reading at Content-Length, so this bounds the whole body
+    if content_length is None or not content_length.isdigit():
+        raise HTTPException(status_code=status.HTTP_411_LENGTH_REQUIRED, detail="Content-Length is required")
+    if int(content_length) > MAX_IMPORT_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Import bodies are limited to {MAX_IMPORT_BYTES} bytes"
+        )
+
+@router.post("/import", response_model=ImportResult)
+async def import_quizzes(
+    request: Request,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    x_import_token: Optional[str] = Header(None),
+    content_length: Optional[str] = Header(None),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Import quizzes from a JSON Lines body, one ``QuizCreate`` object per line."""
+    _check_import_request(x_import_token, content_length)
+    report = await import_quiz_stream(
+        db,
+        current_user.id,
+        iter_lines(request.stream()),
+        QuizCreate.model_validate_json,
+        chunk_size=min(max(chunk_size, 1), MAX_IMPORT_CHUNK_SIZE)
+    )
+    if report.imported:
+        await response_cache.invalidate("quizzes")
+    return ImportResult(
+        imported=report.imported,
+        failed=report.failed,
+        errors=[ImportLineError(line=line, error=error) for line, error in report.errors]
+    )
+
+@router.get("/{quiz_id}", response_model=QuizDetail, response_model_exclude_unset=True)
+@query_budget(4)
+async def get_quiz(quiz_id: int, fields: str = DEFAULT_DETAIL_FIELDS, db: AsyncSession = Depends(get_db)):
+    """Quiz details plus the sections named in ``fields``: creator, stats, answers, comments.
+
+    Everything comes back in at most four queries: the quiz joined to its
+    creator, its answers, and the two queries of the first comment page.
+    """
+    sections = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = sections - set(DETAIL_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}; choose from {', '.join(DETAIL_FIELDS)}"
+        )
+    
+    query = select(Quiz).filter(Quiz.id == quiz_id)
+    if "creator" in sections:
+        query = query.options(joinedload(Quiz.creator).load_only(User.id, User.username))
+    if "answers" in sections:
+        query = query.options(
+            selectinload(Quiz.answers).load_only(QuizAnswer.id, QuizAnswer.position, QuizAnswer.correct_answer)
+        )
+    result = await db.execute(query)
+    quiz = result.unique().scalar_one_or_none()
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
-    return quiz
+    
+    detail = {
+        "id": quiz.id,
+        "title": quiz.title,
+        "description": quiz.description,
+        "quiz_type": quiz.quiz_type,
+        "time_limit": quiz.time_limit,
+        "attempt_count": quiz.attempt_count or 0,
+        "creator_id": quiz.creator_id,
+        "created_at": quiz.created_at,
+        "is_multiple_choice": bool(quiz.is_multiple_choice),
+        "allow_multiple_answers": bool(quiz.allow_multiple_answers),
+        "match_any_order": bool(quiz.match_any_order),
+    }
+    if "creator" in sections:
+        detail["creator"] = QuizCreator(id=quiz.creator.id, username=quiz.creator.username) if quiz.creator else None
+    if "stats" in sections:
+        attempts = quiz.attempt_count or 0
+        detail["stats"] = QuizAggregates(
+            attempt_count=attempts,
+            average_score=(quiz.score_total or 0) / attempts if attempts else 0.0
+        )
+    if "answers" in sections:
+        ordered = sorted(quiz.answers, key=lambda answer: answer.position)
+        detail["answer_count"] = len(ordered)
+        # Correct flags are never sent, and list answers only through live play
+        detail["answers"] = [
+            AnswerOption(id=answer.id, position=answer.position, text=answer.correct_answer)
+            for answer in ordered
+        ] if quiz.is_multiple_choice else []
+    if "comments" in sections:
+        detail["comments"] = await load_comment_page(db, quiz_id)
+    return QuizDetail(**detail)
 
 @router.post("/{quiz_id}/attempts", status_code=status.HTTP_201_CREATED)
 async def submit_attempt(
     quiz_id: int,
     attempt: AttemptSubmit,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    # Get quiz and answers
-    # Get quiz first
-    quiz_result = await db.execute(select(Quiz).filter(Quiz.id == quiz_id))
-    quiz = quiz_result.scalar_one_or_none()
-    if not quiz:
+    key = await answer_key_cache.load(db, quiz_id)
+    if key is None:
         raise HTTPException(status_code=404, detail="Quiz not found")
-    
-    # Get answers
-    answers_result = await db.execute(
-        select(QuizAnswer)
-        .filter(QuizAnswer.quiz_id == quiz_id)
-        .order_by(QuizAnswer.position)
-    )
-    quiz_answers = answers_result.scalars().all()
-    if not quiz_answers:
+    if not key.answers:
         raise HTTPException(status_code=400, detail="Quiz has no answers")
     
-    # Calculate score
-    total_questions = len(quiz_answers)
-    correct_answers = 0
-    
     # Validate attempt answers length
-    if len(attempt.answers) != total_questions:
+    total_questions = len(key)
+    if not key.accepts_count(len(attempt.answers)):
+        expected = f"at most {total_questions}" if key.match_any_order else str(total_questions)
         raise HTTPException(
             status_code=400,
-            detail=f"Expected {total_questions} answers, got {len(attempt.answers)}"
+            detail=f"Expected {expected} answers, got {len(attempt.answers)}"
         )
     
-    for i, answer in enumerate(quiz_answers):
-        if i >= len(attempt.answers):
-            break
-            
-        if quiz.is_multiple_choice:
-            # Handle multiple choice answers
-            user_answers = attempt.answers[i] if isinstance(attempt.answers[i], list) else [attempt.answers[i]]
-            user_answers = [a.lower().strip() for a in user_answers]
-            
-            if quiz.allow_multiple_answers:
-                # All selected answers must be correct and all correct answers must be selected
-                correct_options = [a for a in quiz_answers if a.is_correct]
-                correct_answers_set = {a.correct_answer.lower().strip() for a in correct_options}
-                if set(user_answers) == correct_answers_set:
-                    correct_answers += 1
-            else:
-                # Single answer must match a correct option
-                if len(user_answers) == 1 and any(
-                    user_answers[0] == a.correct_answer.lower().strip() 
-                    for a in quiz_answers if a.is_correct
-                ):
-                    correct_answers += 1
-        else:
-            # Handle list type answers
-            user_answer = attempt.answers[i].lower().strip() if isinstance(attempt.answers[i], str) else ""
-            if (user_answer == answer.correct_answer.lower().strip() or
-                (answer.aliases and user_answer in [a.lower().strip() for a in answer.aliases.split(",")])):
-                correct_answers += 1
-    
-    score = int((correct_answers / total_questions) * 100)
+    graded = key.grade(attempt.answers)
+    return await record_attempt(key, current_user.id, graded, attempt.completion_time, attempt.answers)
+
+async def record_attempt(key: AnswerKey, user_id: int, graded: GradeResult, completion_time: int, answers: list) -> dict:
+    """Queue a graded attempt for persistence and return the attempt summary sent to the player."""
+    correct_answers = graded.correct_answers
+    score = graded.score
     
-    # Record attempt
-    import json
-    db_attempt = QuizAttempt(
-        quiz_id=quiz_id,
-        user_id=current_user.id,
+    # Queue the attempt; counters and points are applied as atomic increments on flush
+    await attempt_ingestor.submit(PendingAttempt(
+        quiz_id=key.quiz_id,
+        user_id=user_id,
         score=score,
-        completion_time=attempt.completion_time,
-        answers=json.dumps(attempt.answers)
-    )
-    db.add(db_attempt)
-    
-    # Update quiz attempt count
-    quiz = quiz_answers[0][0]
-    quiz.attempt_count += 1
-    
-    # Update user points (1 point per correct answer)
-    current_user.points += correct_answers
-    
-    await db.commit()
+        completion_time=completion_time,
+        answers=json.dumps(answers),
+        points=correct_answers,  # 1 point per correct answer
+        answer_results=[
+            (answer.answer_id, is_correct)
+            for answer, is_correct in zip(key.answers, graded.results)
+        ],
+        given=list(graded.given)
+    ))
     
     return {
         "score": score,
         "correct_answers": correct_answers,
-        "total_questions": total_questions,
+        "total_questions": graded.total_questions,
         "points_earned": correct_answers
     }
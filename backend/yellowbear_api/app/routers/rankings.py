@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+from pydantic import BaseModel
+from ..fast_json import fast_response
+from ..instrumentation import query_budget
+from ..rankings import RANKING_TOP_K, quiz_rankings
+from .quiz import QuizResponse
+
+# Included before the quiz router so these paths are not taken for a quiz id
+router = APIRouter(prefix="/api/quizzes", tags=["quizzes"])
+
+class RankedQuiz(QuizResponse):
+    score: float  # decayed recent activity for trending, attempt_count for popular
+
+class QuizRankingPage(BaseModel):
+    quizzes: List[RankedQuiz]
+
+async def _ranking_page(ranking: str, quiz_type: Optional[str], limit: int):
+    if not 1 <= limit <= RANKING_TOP_K:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {RANKING_TOP_K}")
+    await quiz_rankings.wait_ready()
+    return fast_response({"quizzes": quiz_rankings.top(ranking, quiz_type, limit)})
+
+@router.get("/trending", response_model=QuizRankingPage)
+@query_budget(0)
+async def trending_quizzes(quiz_type: Optional[str] = None, limit: int = 20):
+    """Quizzes with the most recent attempts and comments, newest activity weighing most."""
+    return await _ranking_page("trending", quiz_type, limit)
+
+@router.get("/popular", response_model=QuizRankingPage)
+@query_budget(0)
+async def popular_quizzes(quiz_type: Optional[str] = None, limit: int = 20):
+    """Quizzes with the most attempts of all time."""
+    return await _ranking_page("popular", quiz_type, limit)
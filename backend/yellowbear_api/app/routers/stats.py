@@ -1,11 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy import func
-from typing import List, Dict
+from fastapi import APIRouter, HTTPException
+from typing import List
 from pydantic import BaseModel
-from ..database import get_db
-from ..models import Quiz, QuizAnswer, QuizAttempt, QuizStats
+from ..fast_json import fast_response
+from ..instrumentation import query_budget
+from ..stats_cache import stats_snapshot_cache
 
 router = APIRouter(prefix="/api/stats", tags=["stats"])
 
@@ -22,54 +20,26 @@ class QuizStatistics(BaseModel):
     answers_stats: List[AnswerStats]
 
 @router.get("/quizzes/{quiz_id}", response_model=QuizStatistics)
-async def get_quiz_statistics(quiz_id: int, db: AsyncSession = Depends(get_db)):
-    # Get quiz and verify it exists
-    result = await db.execute(select(Quiz).filter(Quiz.id == quiz_id))
-    quiz = result.scalar_one_or_none()
-    if not quiz:
+@query_budget(2)
+async def get_quiz_statistics(quiz_id: int):
+    snapshot = await stats_snapshot_cache.get(quiz_id)
+    if snapshot is None:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
-    # Get total attempts and average score
-    attempts_result = await db.execute(
-        select(
-            func.count(QuizAttempt.id).label("total_attempts"),
-            func.avg(QuizAttempt.score).label("average_score")
-        ).filter(QuizAttempt.quiz_id == quiz_id)
-    )
-    attempts_stats = attempts_result.first()
-    total_attempts = attempts_stats[0] or 0
-    average_score = float(attempts_stats[1] or 0)
-    
-    # Get answer statistics
-    answers_result = await db.execute(
-        select(
-            QuizAnswer.correct_answer,
-            QuizStats.correct_count,
-            QuizStats.attempt_count
-        ).join(
-            QuizStats,
-            QuizAnswer.id == QuizStats.answer_id
-        ).filter(
-            QuizAnswer.quiz_id == quiz_id
-        ).order_by(QuizAnswer.position)
-    )
-    answers = answers_result.all()
-    
+    # Plain dicts in the models' field order and types; see app/fast_json.py
     answers_stats = []
-    for answer in answers:
-        correct_count = answer[1] or 0
-        attempt_count = answer[2] or 0
-        percentage = (correct_count / attempt_count * 100) if attempt_count > 0 else 0
-        answers_stats.append(AnswerStats(
-            answer=answer[0],
-            correct_count=correct_count,
-            attempt_count=attempt_count,
-            percentage=percentage
-        ))
+    for answer in snapshot.answers:
+        percentage = (answer.correct_count / answer.attempt_count * 100) if answer.attempt_count > 0 else 0.0
+        answers_stats.append({
+            "answer": answer.answer,
+            "correct_count": answer.correct_count,
+            "attempt_count": answer.attempt_count,
+            "percentage": float(percentage)
+        })
     
-    return QuizStatistics(
-        quiz_id=quiz_id,
-        total_attempts=total_attempts,
-        average_score=average_score,
-        answers_stats=answers_stats
-    )
+    return fast_response({
+        "quiz_id": quiz_id,
+        "total_attempts": snapshot.total_attempts,
+        "average_score": float(snapshot.average_score),
+        "answers_stats": answers_stats
+    })
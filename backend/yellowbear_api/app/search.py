@@ -0,0 +1,99 @@
+"""
+Quiz title/description search.
+
+On SQLite the catalog is mirrored into an FTS5 table using the trigram
+tokenizer, which answers the same case-insensitive substring queries as
+``ILIKE '%term%'`` (including CJK text, which word tokenizers don't split)
+from an index. Triggers keep it in sync with inserts, updates and deletes on
+``quizzes``. On Postgres, pg_trgm GIN indexes let the planner serve the ILIKE
+filter directly. Anything else falls back to a plain ILIKE scan.
+"""
+import logging
+
+from sqlalchemy import Integer, or_, text
+from sqlalchemy.exc import DBAPIError
+
+from .models import Quiz
+
+logger = logging.getLogger(__name__)
+
+# Trigram matching needs at least three characters
+MIN_INDEXED_TERM_LENGTH = 3
+
+_SQLITE_FTS_SETUP = [
+    """
+    CREATE VIRTUAL TABLE quizzes_fts USING fts5(
+        title, description, content='quizzes', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER quizzes_fts_ai AFTER INSERT ON quizzes BEGIN
+        INSERT INTO quizzes_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER quizzes_fts_ad AFTER DELETE ON quizzes BEGIN
+        INSERT INTO quizzes_fts(quizzes_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER quizzes_fts_au AFTER UPDATE OF title, description ON quizzes BEGIN
+        INSERT INTO quizzes_fts(quizzes_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO quizzes_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO quizzes_fts(quizzes_fts) VALUES ('rebuild')",
+]
+
+_POSTGRES_TRGM_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_quiz_title_trgm ON quizzes USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_quiz_description_trgm ON quizzes USING gin (description gin_trgm_ops)",
+]
+
+_backend = None  # "fts5", "pg_trgm" or None
+
+
+def ensure_search_index(sync_conn, create: bool = True) -> None:
+    """Create the search index for the connected dialect; run via ``conn.run_sync``.
+
+    With ``create=False`` the index is assumed to exist where the schema is
+    current, and only the backend used by ``quiz_search_filter`` is selected.
+    """
+    global _backend
+    dialect = sync_conn.dialect.name
+    try:
+        if dialect == "sqlite":
+            exists = sync_conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = 'quizzes_fts'")
+            ).first()
+            if not exists:
+                if not create:
+                    _backend = None
+                    return
+                for statement in _SQLITE_FTS_SETUP:
+                    sync_conn.execute(text(statement))
+            _backend = "fts5"
+        elif dialect == "postgresql":
+            if create:
+                for statement in _POSTGRES_TRGM_SETUP:
+                    sync_conn.execute(text(statement))
+            _backend = "pg_trgm"
+    except DBAPIError:
+        logger.warning("Search index unavailable on %s, falling back to ILIKE scans", dialect, exc_info=True)
+        _backend = None
+
+
+def quiz_search_filter(search: str):
+    """WHERE clause matching quizzes whose title or description contains ``search``."""
+    pattern = f"%{search}%"
+    if _backend == "fts5" and len(search) >= MIN_INDEXED_TERM_LENGTH:
+        phrase = '"' + search.replace('"', '""') + '"'
+        return Quiz.id.in_(
+            text("SELECT rowid FROM quizzes_fts WHERE quizzes_fts MATCH :phrase")
+            .bindparams(phrase=phrase)
+            .columns(rowid=Integer)
+        )
+    return or_(Quiz.title.ilike(pattern), Quiz.description.ilike(pattern))
@@ -0,0 +1,89 @@
+"""
+Cold-start import report.
+
+Imports the app in a fresh interpreter under ``python -X importtime`` and
+reports the total import time and the modules that cost the most, so a new
+top-level import that slows worker start-up shows up in review. Run it with
+``python -m app.cli startup-report``; ``--history`` appends each report as a
+JSON line tagged with the git revision and ``--budget-ms`` fails the command
+when the import is slower than the budget.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_ms: float
+    cumulative_ms: float
+    depth: int
+
+
+@dataclass
+class StartupReport:
+    module: str
+    import_ms: float
+    modules: int
+    slowest: List[ImportTiming]
+    revision: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """Timings from ``-X importtime`` stderr, in the order the imports finished."""
+    timings = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append(ImportTiming(module, int(self_us) / 1000, int(cumulative_us) / 1000, len(indent) // 2))
+    return timings
+
+
+def git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+
+def measure_startup(module: str = "app.main", top: int = 15) -> StartupReport:
+    """Import ``module`` in a clean interpreter and rank the imports by their own time."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    timings = parse_importtime(result.stderr)
+    root = next((timing for timing in timings if timing.module == module), None)
+    return StartupReport(
+        module=module,
+        import_ms=root.cumulative_ms if root is not None else elapsed_ms,
+        modules=len(timings),
+        slowest=sorted(timings, key=lambda timing: timing.self_ms, reverse=True)[:top],
+        revision=git_revision(),
+    )
+
+
+def append_history(path: str, report: StartupReport) -> None:
+    with open(path, "a", encoding="utf-8") as history:
+        history.write(json.dumps(dict(report.to_dict(), measured_at=time.time())) + "\n")
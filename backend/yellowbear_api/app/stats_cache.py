@@ -0,0 +1,154 @@
+"""
+Cached per-quiz statistics snapshots.
+
+Snapshots are served from memory for ``STATS_CACHE_TTL`` seconds. After that,
+for up to ``STATS_STALE_TTL`` more seconds, the stale snapshot is still returned
+while a single background task per quiz recomputes it. Attempt totals are kept
+current in between: the ingestor adds each flushed batch's count and score sum
+to the cached snapshot, and ``quizzes.attempt_count`` / ``quizzes.score_total``
+hold the same running counters in the database, so computing the average never
+scans ``quiz_attempts``.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy.future import select
+
+from .database import async_session
+from .models import Quiz, QuizAnswer, QuizStats
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "30"))
+STATS_STALE_TTL = float(os.getenv("STATS_STALE_TTL", "300"))
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "4096"))
+
+
+@dataclass
+class AnswerSnapshot:
+    answer: str
+    correct_count: int
+    attempt_count: int
+
+
+@dataclass
+class QuizSnapshot:
+    quiz_id: int
+    total_attempts: int
+    score_total: int
+    answers: List[AnswerSnapshot] = field(default_factory=list)
+
+    @property
+    def average_score(self) -> float:
+        return self.score_total / self.total_attempts if self.total_attempts else 0.0
+
+
+async def load_snapshot(quiz_id: int) -> Optional[QuizSnapshot]:
+    async with async_session() as session:
+        result = await session.execute(
+            select(Quiz.attempt_count, Quiz.score_total).filter(Quiz.id == quiz_id)
+        )
+        totals = result.first()
+        if totals is None:
+            return None
+        answers_result = await session.execute(
+            select(
+                QuizAnswer.correct_answer,
+                QuizStats.correct_count,
+                QuizStats.attempt_count
+            ).outerjoin(
+                QuizStats,
+                QuizAnswer.id == QuizStats.answer_id
+            ).filter(
+                QuizAnswer.quiz_id == quiz_id
+            ).order_by(QuizAnswer.position)
+        )
+        return QuizSnapshot(
+            quiz_id=quiz_id,
+            total_attempts=totals[0] or 0,
+            score_total=totals[1] or 0,
+            answers=[
+                AnswerSnapshot(answer=row[0], correct_count=row[1] or 0, attempt_count=row[2] or 0)
+                for row in answers_result.all()
+            ],
+        )
+
+
+@dataclass
+class _Entry:
+    snapshot: QuizSnapshot
+    fetched_at: float
+
+
+class StatsSnapshotCache:
+    def __init__(
+        self,
+        loader=load_snapshot,
+        ttl: float = STATS_CACHE_TTL,
+        stale_ttl: float = STATS_STALE_TTL,
+        maxsize: int = STATS_CACHE_SIZE,
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._refreshing: Dict[int, asyncio.Task] = {}
+
+    async def get(self, quiz_id: int) -> Optional[QuizSnapshot]:
+        """Return the quiz's snapshot, or None if the quiz does not exist."""
+        entry = self._entries.get(quiz_id)
+        if entry is not None:
+            self._entries.move_to_end(quiz_id)
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                return entry.snapshot
+            if age < self.ttl + self.stale_ttl:
+                self._refresh(quiz_id)
+                return entry.snapshot
+        return await asyncio.shield(self._refresh(quiz_id))
+
+    def record_attempts(self, quiz_id: int, count: int, score_sum: int) -> None:
+        entry = self._entries.get(quiz_id)
+        if entry is not None:
+            entry.snapshot.total_attempts += count
+            entry.snapshot.score_total += score_sum
+
+    def invalidate(self, quiz_id: int) -> None:
+        self._entries.pop(quiz_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _refresh(self, quiz_id: int) -> asyncio.Task:
+        # Single flight: concurrent callers share the in-progress recompute
+        task = self._refreshing.get(quiz_id)
+        if task is None:
+            task = asyncio.create_task(self._load(quiz_id))
+            self._refreshing[quiz_id] = task
+            task.add_done_callback(lambda t: self._refresh_done(quiz_id, t))
+        return task
+
+    def _refresh_done(self, quiz_id: int, task: asyncio.Task) -> None:
+        self._refreshing.pop(quiz_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Refreshing stats for quiz %s failed: %r", quiz_id, task.exception())
+
+    async def _load(self, quiz_id: int) -> Optional[QuizSnapshot]:
+        snapshot = await self.loader(quiz_id)
+        if snapshot is None:
+            self._entries.pop(quiz_id, None)
+            return None
+        self._entries[quiz_id] = _Entry(snapshot=snapshot, fetched_at=time.monotonic())
+        self._entries.move_to_end(quiz_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return snapshot
+
+
+stats_snapshot_cache = StatsSnapshotCache()
@@ -0,0 +1,14 @@
+#!/bin/sh
+# Container entrypoint: create the schema once, then start one worker per core.
+set -e
+
+python -m app.cli migrate
+
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-$(nproc)}"
+# Schema is handled above; workers share cache invalidations through the database
+export DB_AUTO_MIGRATE=false
+if [ "$WEB_CONCURRENCY" -gt 1 ]; then
+    export INVALIDATION_BUS="${INVALIDATION_BUS:-database}"
+fi
+
+exec uvicorn app.main:app --host 0.0.0.0 --port "${PORT:-8000}" --workers "$WEB_CONCURRENCY" --timeout-graceful-shutdown 20
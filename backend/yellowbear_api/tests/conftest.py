@@ -0,0 +1,55 @@
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import get_db
+from app.instrumentation import query_metrics
+from app.main import app
+from app.models import Base, Quiz, QuizAnswer, User
+from app.response_cache import response_cache
+from app.search import ensure_search_index
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets():
+    """Fail any test whose requests ran more statements than their route's ``@query_budget``."""
+    query_metrics.budget_violations.clear()
+    yield
+    violations = list(query_metrics.budget_violations)
+    assert not violations, f"Query budget exceeded: {violations}"
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """Session factory bound to a fresh file-backed SQLite database with one user and one quiz."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_search_index)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(User(id=1, username="a", email="a@example.com", password_hash="x", points=0))
+        session.add(User(id=2, username="b", email="b@example.com", password_hash="x", points=0))
+        session.add(Quiz(id=1, creator_id=1, title="Capitals", quiz_type="list", attempt_count=0))
+        session.add(QuizAnswer(id=1, quiz_id=1, correct_answer="Paris", position=0))
+        session.add(QuizAnswer(id=2, quiz_id=1, correct_answer="London", position=1))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def client(session_factory):
+    """HTTP client for the app with request sessions bound to the test database."""
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    # Every test starts from a fresh database, so nothing cached may carry over
+    await response_cache.clear()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.answer_stats import given_text, migrate_attempt_answers, rebuild_answer_stats, rebuild_attempt_totals
+from app.models import AttemptAnswer, Quiz, QuizAttempt, QuizStats
+
+
+@pytest.mark.asyncio
+async def test_migration_grades_json_attempts_into_attempt_answers(session_factory):
+    async with session_factory() as session:
+        for answers in (["paris", "london"], ["Paris", "rome"], ["berlin", "rome"], ["only one"]):
+            session.add(QuizAttempt(quiz_id=1, user_id=1, score=25, answers=json.dumps(answers)))
+        await session.commit()
+
+        assert await migrate_attempt_answers(session, chunk_size=2) == 3
+        # Already migrated attempts are left alone on a rerun
+        assert await migrate_attempt_answers(session, chunk_size=2) == 0
+
+    async with session_factory() as session:
+        rows = (await session.execute(
+            select(AttemptAnswer.attempt_id, AttemptAnswer.position, AttemptAnswer.answer_id,
+                   AttemptAnswer.given_text, AttemptAnswer.is_correct)
+            .order_by(AttemptAnswer.attempt_id, AttemptAnswer.position)
+        )).all()
+    # The single-answer attempt doesn't match the key and is skipped
+    assert rows == [
+        (1, 0, 1, "paris", True), (1, 1, 2, "london", True),
+        (2, 0, 1, "Paris", True), (2, 1, 2, "rome", False),
+        (3, 0, 1, "berlin", False), (3, 1, 2, "rome", False),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_aggregates_attempt_answers(session_factory):
+    async with session_factory() as session:
+        for attempt_id, results in enumerate([(True, True), (True, False), (False, False)], start=1):
+            session.add(QuizAttempt(id=attempt_id, quiz_id=1, user_id=1, score=0, answers="[]"))
+            for position, is_correct in enumerate(results):
+                session.add(AttemptAnswer(
+                    attempt_id=attempt_id, position=position, answer_id=position + 1, is_correct=is_correct
+                ))
+        session.add(QuizStats(quiz_id=1, answer_id=1, correct_count=99, attempt_count=99))
+        await session.commit()
+
+        await rebuild_answer_stats(session)
+
+    async with session_factory() as session:
+        stats = (await session.execute(select(QuizStats).order_by(QuizStats.answer_id))).scalars().all()
+        assert [(s.answer_id, s.correct_count, s.attempt_count) for s in stats] == [(1, 2, 3), (2, 1, 3)]
+
+
+def test_given_text_stores_selections_as_json_and_truncates():
+    assert given_text(["A", "B"]) == '["A", "B"]'
+    assert len(given_text("x" * 1000)) == 255
+
+
+@pytest.mark.asyncio
+async def test_rebuild_attempt_totals(session_factory):
+    async with session_factory() as session:
+        for score in (100, 50, 0):
+            session.add(QuizAttempt(quiz_id=1, user_id=1, score=score, answers="[]"))
+        await session.commit()
+        await rebuild_attempt_totals(session)
+
+    async with session_factory() as session:
+        quiz = await session.get(Quiz, 1)
+        assert (quiz.attempt_count, quiz.score_total) == (3, 150)
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app import auth
+from app.auth import (
+    AuthCache, CurrentUser, PasswordHasher, create_access_token, create_user_token, get_current_user,
+)
+
+
+def test_cache_entries_expire_with_the_token():
+    cache = AuthCache(ttl=60, maxsize=10)
+    cache.put("t1", CurrentUser(id=1, username="a", points=0), token_exp=time.time() - 1)
+    assert cache.get("t1") is None
+    cache.put("t2", CurrentUser(id=1, username="a", points=0))
+    assert cache.get("t2").username == "a"
+
+
+def test_cache_tracks_points_and_invalidates_per_user():
+    cache = AuthCache(ttl=60, maxsize=2)
+    cache.put("t1", CurrentUser(id=1, username="a", points=3))
+    cache.put("t2", CurrentUser(id=2, username="b", points=0))
+    cache.add_points(1, 2)
+    assert cache.get("t1").points == 5
+    cache.put("t3", CurrentUser(id=3, username="c", points=0))
+    assert cache.get("t2") is None  # evicted as least recently used
+    cache.invalidate_user(1)
+    assert cache.get("t1") is None
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_loaded_once_then_cached(session_factory, monkeypatch):
+    monkeypatch.setattr(auth, "auth_cache", AuthCache())
+    token = create_user_token(SimpleNamespace(id=1, username="a"))
+    async with session_factory() as session:
+        user = await get_current_user(token, session)
+    assert user == CurrentUser(id=1, username="a", email="a@example.com", points=0)
+    # Served from the cache, no session needed
+    assert await get_current_user(token, None) is user
+
+
+@pytest.mark.asyncio
+async def test_trusted_claims_skip_the_database(monkeypatch):
+    monkeypatch.setattr(auth, "auth_cache", AuthCache())
+    monkeypatch.setattr(auth, "AUTH_TRUST_TOKEN_CLAIMS", True)
+    user = await get_current_user(create_user_token(SimpleNamespace(id=7, username="g")), None)
+    assert user == CurrentUser(id=7, username="g")
+
+
+@pytest.mark.asyncio
+async def test_non_numeric_subject_is_rejected(monkeypatch):
+    monkeypatch.setattr(auth, "auth_cache", AuthCache())
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(create_access_token({"sub": "someone@wechat.com"}), None)
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_hasher_rehashes_when_cost_changes(monkeypatch):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5))
+    hasher = PasswordHasher(workers=2, max_pending=4)
+    valid, new_hash = await hasher.verify_and_update("secret", old_hash)
+    assert valid and new_hash.startswith("$2b$05$")
+    assert await hasher.verify_and_update("wrong", new_hash) == (False, None)
+    assert await hasher.verify_and_update("secret", "social_login") == (False, None)
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hasher_sheds_load_beyond_pending_limit(monkeypatch):
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4))
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    results = await asyncio.gather(*(hasher.hash("pw") for _ in range(5)), return_exceptions=True)
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 3
+    assert rejected[0].status_code == 503
+    hasher.shutdown()
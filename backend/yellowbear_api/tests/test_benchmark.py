@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app import ingest, stats_cache
+from app.benchmark import BenchConfig, check_serialization_parity, percentile, run_benchmark, seed_database
+from app.main import app
+from app.models import Comment, QuizAttempt
+
+
+def test_percentile_uses_nearest_rank():
+    ordered = [float(i) for i in range(1, 101)]
+    assert (percentile(ordered, 50), percentile(ordered, 95), percentile(ordered, 99)) == (50.0, 95.0, 99.0)
+    assert percentile([], 50) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_benchmark_seeds_and_reports_every_scenario(client, session_factory, monkeypatch):
+    monkeypatch.setattr(ingest, "async_session", session_factory)
+    monkeypatch.setattr(stats_cache, "async_session", session_factory)
+    stats_cache.stats_snapshot_cache.clear()
+    engine = session_factory.kw["bind"]
+    config = BenchConfig(
+        users=5, quizzes=3, answers_per_quiz=4, attempts=20, comments=10, requests=4, concurrency=2, warmup=1
+    )
+
+    data = await seed_database(engine, config)
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(QuizAttempt)) == 20
+        assert await session.scalar(select(func.count()).where(Comment.parent_id.is_not(None))) == 3
+
+    parity = await check_serialization_parity(app, data, repeats=1)
+    assert parity and all(result["identical"] for result in parity.values())
+
+    report = await run_benchmark(app, engine, data, config)
+    assert list(report) == config.scenarios
+    for name, result in report.items():
+        assert (result["requests"], result["errors"]) == (4, 0), name
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    assert report["submit_attempt"]["queries_per_request"] > 0
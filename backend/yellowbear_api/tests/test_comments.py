@@ -0,0 +1,34 @@
+import pytest
+import pytest_asyncio
+
+from app.models import Comment
+
+
+@pytest_asyncio.fixture
+async def thread(session_factory):
+    async with session_factory() as session:
+        for i in range(1, 4):
+            session.add(Comment(id=i, quiz_id=1, author_id=1, content=f"top {i}"))
+        session.add(Comment(id=4, quiz_id=1, author_id=2, content="reply", parent_id=1, thread_id=1))
+        session.add(Comment(id=5, quiz_id=1, author_id=1, content="nested", parent_id=4, thread_id=1))
+        session.add(Comment(id=6, quiz_id=1, author_id=1, content="gone", parent_id=3, thread_id=3, is_deleted=True))
+        session.add(Comment(id=7, quiz_id=1, author_id=2, content="under gone", parent_id=6, thread_id=3))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_comment_pages_nest_replies(client, thread):
+    response = await client.get("/api/quizzes/1/comments", params={"limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert [c["id"] for c in page["comments"]] == [3, 2]
+    assert page["comments"][0]["replies"] == []
+
+    response = await client.get("/api/quizzes/1/comments", params={"cursor": page["next_cursor"]})
+    page = response.json()
+    assert page["next_cursor"] is None
+    [first] = page["comments"]
+    assert first["author_username"] == "a"
+    [reply] = first["replies"]
+    assert (reply["id"], reply["author_username"]) == (4, "b")
+    assert [r["id"] for r in reply["replies"]] == [5]
@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import text
+
+from app.database import create_engine_from_env, normalize_database_url
+
+
+def test_plain_urls_get_async_drivers():
+    assert normalize_database_url("postgresql://u:p@db/yb") == "postgresql+psycopg://u:p@db/yb"
+    assert normalize_database_url("postgres://u:p@db/yb") == "postgresql+psycopg://u:p@db/yb"
+    assert normalize_database_url("sqlite:///./yb.db") == "sqlite+aiosqlite:///./yb.db"
+    assert normalize_database_url("sqlite+aiosqlite:///:memory:") == "sqlite+aiosqlite:///:memory:"
+
+
+@pytest.mark.asyncio
+async def test_file_sqlite_connections_use_wal(tmp_path):
+    engine = create_engine_from_env(f"sqlite:///{tmp_path / 'yb.db'}")
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+        assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+    assert engine.echo is False
+    await engine.dispose()
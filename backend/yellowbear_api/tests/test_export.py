@@ -0,0 +1,72 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+
+from app import export
+from app.models import QuizAttempt
+from app.routers import export as export_router
+
+
+@pytest.fixture(autouse=True)
+def use_test_database(session_factory, monkeypatch):
+    monkeypatch.setattr(export, "async_session", session_factory)
+    monkeypatch.setattr(export_router, "EXPORT_API_TOKEN", "secret")
+
+
+@pytest_asyncio.fixture
+async def attempts(session_factory):
+    async with session_factory() as session:
+        for i in range(1, 8):
+            session.add(QuizAttempt(
+                id=i, quiz_id=1, user_id=1 if i % 2 else 2, score=i * 10, points_earned=i, completion_time=30,
+                answers=json.dumps(["Paris", ["a", "b"]]), created_at=datetime(2026, 1, i, 12),
+            ))
+        await session.commit()
+
+
+async def export_body(client, **params):
+    response = await client.get("/api/attempts/export", params=params, headers={"X-Export-Token": "secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    return gzip.decompress(response.content).decode()
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export_pages_through_every_attempt(client, attempts, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_PAGE_SIZE", 2)
+    rows = [json.loads(line) for line in (await export_body(client)).splitlines()]
+
+    assert [row["id"] for row in rows] == list(range(1, 8))
+    assert rows[0] == {
+        "id": 1, "quiz_id": 1, "user_id": 1, "score": 10, "points_earned": 1, "completion_time": 30,
+        "created_at": "2026-01-01T12:00:00", "answers": ["Paris", ["a", "b"]],
+    }
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_are_small_and_resumable(attempts):
+    ids = [row[0] async for row in export.iter_attempt_rows(after_id=3, page_size=2)]
+    assert ids == [4, 5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_csv_export_applies_filters(client, attempts):
+    body = await export_body(
+        client, format="csv", user_id=1, since="2026-01-02T00:00:00", until="2026-01-07T00:00:00"
+    )
+    rows = list(csv.DictReader(io.StringIO(body)))
+
+    assert [row["id"] for row in rows] == ["3", "5"]
+    assert json.loads(rows[0]["answers"]) == ["Paris", ["a", "b"]]
+
+
+@pytest.mark.asyncio
+async def test_export_requires_token(client, monkeypatch):
+    assert (await client.get("/api/attempts/export")).status_code == 403
+    monkeypatch.setattr(export_router, "EXPORT_API_TOKEN", None)
+    assert (await client.get("/api/attempts/export", headers={"X-Export-Token": "x"})).status_code == 404
@@ -0,0 +1,39 @@
+import json
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from fastapi.responses import JSONResponse
+
+from app import fast_json, stats_cache
+from app.models import Comment, Quiz
+
+
+@pytest_asyncio.fixture
+async def browse_data(session_factory, monkeypatch):
+    monkeypatch.setattr(stats_cache, "async_session", session_factory)
+    stats_cache.stats_snapshot_cache.clear()
+    async with session_factory() as session:
+        session.add(Quiz(id=2, creator_id=2, title="Café ☕", description=None, quiz_type="list", attempt_count=3))
+        session.add(Comment(id=1, quiz_id=1, author_id=2, content="très bien", created_at=datetime(2026, 1, 2, 3, 4, 5, 678)))
+        session.add(Comment(id=2, quiz_id=1, author_id=1, content="merci", parent_id=1, thread_id=1))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/api/quizzes?sort=popular", "/api/quizzes/1/comments", "/api/stats/quizzes/1"])
+async def test_fast_path_matches_the_response_model(client, browse_data, monkeypatch, path):
+    fast = await client.get(path, params={"parity": "fast"})
+    monkeypatch.setattr(fast_json, "FAST_JSON_RESPONSES", False)
+    model = await client.get(path, params={"parity": "model"})
+    assert fast.status_code == model.status_code == 200
+    assert fast.content == model.content
+    assert fast.headers["content-type"] == model.headers["content-type"]
+
+
+def test_stdlib_fallback_encodes_like_json_response(monkeypatch):
+    content = {"title": "Café", "score": 75.0, "created_at": datetime(2026, 1, 2, 3, 4, 5, 678), "tags": [None, True]}
+    encoded = fast_json.dumps(content)
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert fast_json.dumps(content) == encoded
+    assert JSONResponse(json.loads(encoded)).body == encoded
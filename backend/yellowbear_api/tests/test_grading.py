@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+from app.grading import AnswerKey, AnswerKeyCache, benchmark_grading, parse_aliases
+from app.matching import DeletionIndex, bounded_levenshtein
+
+
+def make_key(quiz_id=1, is_multiple_choice=False, allow_multiple_answers=False, answers=()):
+    quiz = SimpleNamespace(
+        id=quiz_id,
+        is_multiple_choice=is_multiple_choice,
+        allow_multiple_answers=allow_multiple_answers,
+    )
+    rows = [
+        SimpleNamespace(id=i + 1, position=i, correct_answer=text, aliases=aliases, is_correct=is_correct)
+        for i, (text, aliases, is_correct) in enumerate(answers)
+    ]
+    return AnswerKey.compile(quiz, rows)
+
+
+def test_parse_aliases_accepts_json_and_legacy_comma_lists():
+    assert parse_aliases('["paree", "lutetia"]') == ["paree", "lutetia"]
+    assert parse_aliases("paree,lutetia") == ["paree", "lutetia"]
+    assert parse_aliases(None) == []
+
+
+def test_list_quiz_matches_answer_and_aliases():
+    key = make_key(answers=[("Paris", '["Paree"]', False), ("London", None, False)])
+    graded = key.grade([" paree ", "Rome"])
+    assert graded.results == (True, False)
+    assert graded.correct_answers == 1
+    assert graded.score == 50
+
+
+def test_multiple_choice_with_multiple_answers_requires_exact_set():
+    key = make_key(
+        is_multiple_choice=True,
+        allow_multiple_answers=True,
+        answers=[("Paris", None, True), ("London", None, True), ("Berlin", None, False)],
+    )
+    graded = key.grade([["Paris", "London"], [], ["Berlin"]])
+    assert graded.results == (True, False, False)
+
+
+def test_multiple_choice_single_answer():
+    key = make_key(
+        is_multiple_choice=True,
+        answers=[("Paris", None, True), ("Berlin", None, False)],
+    )
+    assert key.grade(["paris", ["Paris", "Berlin"]]).results == (True, False)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = AnswerKeyCache(maxsize=2)
+    for quiz_id in (1, 2):
+        cache.put(make_key(quiz_id=quiz_id))
+    cache.get(1)
+    cache.put(make_key(quiz_id=3))
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+
+def test_fuzzy_matching_folds_unicode_articles_and_typos():
+    key = make_key(answers=[("Paris", None, False), ("The Beatles", None, False), ("Ångström", None, False)])
+    assert key.grade(["Pari", "beatles!", "angstrom"]).results == (True, True, True)
+    assert key.grade(["Pa", "the beetles", "ＡＮＧＳＴＲＯＭ"]).results == (False, True, True)
+
+
+def test_fuzzy_matching_rejects_digits_short_answers_and_other_answers():
+    key = make_key(answers=[("1984", None, False), ("Mali", None, False), ("Bali", None, False), ("Oslo", None, False)])
+    assert key.grade(["1985", "Bali", "Bali", "Olso"]).results == (False, False, True, False)
+    assert key.grade(["1984", "Malo", "bali", "oslo"]).results == (True, True, True, True)
+
+
+def test_exact_matcher_keeps_original_behaviour():
+    quiz = SimpleNamespace(id=1, is_multiple_choice=False, allow_multiple_answers=False)
+    rows = [SimpleNamespace(id=1, position=0, correct_answer="Paris", aliases=None, is_correct=False)]
+    key = AnswerKey.compile(quiz, rows, matcher="exact")
+    assert key.grade(["Pari"]).results == (False,)
+    assert key.grade([" PARIS "]).results == (True,)
+
+
+def test_any_order_quiz_credits_each_answer_once():
+    quiz = SimpleNamespace(id=1, is_multiple_choice=False, allow_multiple_answers=False, match_any_order=True)
+    names = ["Mercury", "Venus", "Earth", "Mars", "Jupiter"]
+    rows = [
+        SimpleNamespace(id=i + 1, position=i, correct_answer=name, aliases=None, is_correct=False)
+        for i, name in enumerate(names)
+    ]
+    key = AnswerKey.compile(quiz, rows)
+
+    graded = key.grade(["jupitr", "earth", "Earth", "pluto", "venus"])
+    assert graded.results == (False, True, True, False, True)
+    assert graded.given == (None, "venus", "earth", None, "jupitr")
+    assert key.accepts_count(3) and not key.accepts_count(6)
+
+
+def test_deletion_index_finds_every_word_within_radius():
+    words = ["mercury", "venus", "earth", "mars", "jupiter", "saturn", "uranus", "neptune"]
+    index = DeletionIndex((word, 2) for word in words)
+    for query in ("mars", "mrs", "neptun", "satrun", "uranis", "xyz", "earthh"):
+        expected = sorted(
+            (bounded_levenshtein(query, word, 2), word) for word in words if bounded_levenshtein(query, word, 2) <= 2
+        )
+        assert sorted(index.search(query, 2)) == expected
+
+
+def test_grading_stays_within_cpu_budget():
+    report = benchmark_grading(answers=200, submissions=5)
+    assert report["max_ms"] < report["budget_ms"]
@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app import ingest, points
+from app.ingest import AttemptIngestor, PendingAttempt
+from app.models import AttemptAnswer, PointsLedgerEntry, Quiz, QuizAttempt, QuizStats, User
+from app.points import PointsAggregator
+from app.response_cache import MemoryBackend, ResponseCache
+
+
+@pytest.fixture(autouse=True)
+def use_test_database(session_factory, monkeypatch):
+    monkeypatch.setattr(ingest, "async_session", session_factory)
+    monkeypatch.setattr(points, "async_session", session_factory)
+
+
+def pending(user_id, points, answer_results=()):
+    return PendingAttempt(
+        quiz_id=1, user_id=user_id, score=points * 10, completion_time=5, answers="[]", points=points,
+        answer_results=list(answer_results),
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_applies_aggregated_increments(session_factory, tmp_path):
+    ingestor = AttemptIngestor(flush_interval_ms=1000, spool_path=str(tmp_path / "spool.ndjson"))
+    await ingestor.start()
+    for user_id, points in [(1, 3), (2, 1), (1, 2)]:
+        await ingestor.submit(pending(user_id, points))
+    await ingestor.stop()
+    await PointsAggregator().fold_all()
+
+    async with session_factory() as session:
+        assert (await session.get(Quiz, 1)).attempt_count == 3
+        assert (await session.get(User, 1)).points == 5
+        assert (await session.get(User, 2)).points == 1
+        attempts = (await session.execute(select(QuizAttempt))).scalars().all()
+        assert len(attempts) == 3
+        ledger = (await session.execute(select(PointsLedgerEntry.kind, PointsLedgerEntry.source_id))).all()
+        assert sorted(ledger) == [("attempt", attempt.id) for attempt in sorted(attempts, key=lambda a: a.id)]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_spooled_and_replayed(session_factory, tmp_path, monkeypatch):
+    spool = tmp_path / "spool.ndjson"
+    ingestor = AttemptIngestor(spool_path=str(spool))
+
+    async def fail(batch):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(ingest, "write_attempts", fail)
+    await ingestor.submit(pending(1, 4))
+    assert spool.exists()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(ingest, "async_session", session_factory)
+    monkeypatch.setattr(points, "async_session", session_factory)
+    await ingestor.replay_spool()
+    await PointsAggregator().fold_all()
+    assert not spool.exists()
+    async with session_factory() as session:
+        assert (await session.get(User, 1)).points == 4
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried_in_process(session_factory, tmp_path, monkeypatch):
+    spool = tmp_path / "spool.ndjson"
+    ingestor = AttemptIngestor(spool_path=str(spool), backoff_ms=1)
+    write = ingest.write_attempts
+    failures = [RuntimeError("database is locked")] * 2
+
+    async def flaky(batch):
+        if failures:
+            raise failures.pop()
+        await write(batch)
+
+    monkeypatch.setattr(ingest, "write_attempts", flaky)
+    await ingestor.submit(pending(1, 4))
+    assert not spool.exists()
+    async with session_factory() as session:
+        assert (await session.get(Quiz, 1)).attempt_count == 1
+
+
+@pytest.mark.asyncio
+async def test_attempts_that_keep_failing_go_to_the_dead_letter_file(session_factory, tmp_path, monkeypatch):
+    spool = tmp_path / "spool.ndjson"
+    ingestor = AttemptIngestor(spool_path=str(spool), retries=1, backoff_ms=1)
+    write = ingest.write_attempts
+
+    async def reject_user_2(batch):
+        if any(a.user_id == 2 for a in batch):
+            raise RuntimeError("constraint failed")
+        await write(batch)
+
+    monkeypatch.setattr(ingest, "write_attempts", reject_user_2)
+    await ingestor.flush([pending(1, 1), pending(2, 1), pending(1, 2)])
+
+    assert not spool.exists()
+    dead = (tmp_path / "spool.ndjson.dead").read_text().splitlines()
+    assert [PendingAttempt.from_json(line).user_id for line in dead] == [2]
+    async with session_factory() as session:
+        assert (await session.get(Quiz, 1)).attempt_count == 2
+
+
+@pytest.mark.asyncio
+async def test_unreadable_spool_lines_are_quarantined(session_factory, tmp_path):
+    spool = tmp_path / "spool.ndjson"
+    spool.write_text(pending(1, 4).to_json() + "\n" + '{"quiz_id": 1, "us')
+    ingestor = AttemptIngestor(spool_path=str(spool))
+    await ingestor.replay_spool()
+
+    assert list(tmp_path.glob("spool.ndjson*")) == [tmp_path / "spool.ndjson.dead"]
+    assert (tmp_path / "spool.ndjson.dead").read_text() == '{"quiz_id": 1, "us\n'
+    async with session_factory() as session:
+        assert (await session.get(Quiz, 1)).attempt_count == 1
+
+
+@pytest.mark.asyncio
+async def test_running_ingestor_replays_the_spool(session_factory, tmp_path):
+    spool = tmp_path / "spool.ndjson"
+    ingestor = AttemptIngestor(spool_path=str(spool), replay_seconds=0.01)
+    await ingestor.start()
+    spool.write_text(pending(1, 4).to_json() + "\n")
+    for _ in range(50):
+        if not spool.exists():
+            break
+        await asyncio.sleep(0.01)
+    await ingestor.stop()
+
+    assert not spool.exists()
+    async with session_factory() as session:
+        assert (await session.get(Quiz, 1)).attempt_count == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_failure_after_commit_does_not_spool_the_batch(session_factory, tmp_path, monkeypatch):
+    class UnreachableBackend(MemoryBackend):
+        async def bump(self, names):
+            raise ConnectionError("redis unavailable")
+
+    monkeypatch.setattr(ingest, "response_cache", ResponseCache(backend=UnreachableBackend(), enabled=True))
+    spool = tmp_path / "spool.ndjson"
+    ingestor = AttemptIngestor(spool_path=str(spool))
+    await ingestor.submit(pending(1, 4))
+
+    assert not spool.exists()
+    async with session_factory() as session:
+        assert len((await session.execute(select(QuizAttempt))).scalars().all()) == 1
+        assert (await session.get(Quiz, 1)).attempt_count == 1
+
+
+@pytest.mark.asyncio
+async def test_batches_upsert_answer_stats(session_factory):
+    ingestor = AttemptIngestor()
+    await ingestor.flush([pending(1, 1, [(1, True), (2, False)]), pending(2, 2, [(1, True), (2, True)])])
+    await ingestor.flush([pending(1, 0, [(1, False), (2, False)])])
+
+    async with session_factory() as session:
+        stats = (await session.execute(select(QuizStats).order_by(QuizStats.answer_id))).scalars().all()
+        assert [(s.answer_id, s.correct_count, s.attempt_count) for s in stats] == [(1, 2, 3), (2, 1, 3)]
+
+
+@pytest.mark.asyncio
+async def test_batches_store_graded_answers_per_attempt(session_factory):
+    attempt = pending(1, 1, [(1, True), (2, False)])
+    attempt.answers = '["paris", "Rome"]'
+    await AttemptIngestor().flush([pending(2, 0), attempt])
+
+    async with session_factory() as session:
+        rows = (await session.execute(
+            select(AttemptAnswer.attempt_id, AttemptAnswer.position, AttemptAnswer.answer_id,
+                   AttemptAnswer.given_text, AttemptAnswer.is_correct)
+            .order_by(AttemptAnswer.position)
+        )).all()
+    assert rows == [(2, 0, 1, "paris", True), (2, 1, 2, "Rome", False)]
@@ -0,0 +1,53 @@
+import pytest
+
+from app.instrumentation import Histogram, QueryMetrics, RequestStats, query_budget, query_metrics
+
+
+@pytest.mark.asyncio
+async def test_sampled_requests_report_server_timing_and_metrics(client):
+    query_metrics.reset()
+    response = await client.get("/api/quizzes/1")
+    assert response.status_code == 200
+    assert 'db;dur=' in response.headers["server-timing"]
+    assert 'desc="1 queries"' in response.headers["server-timing"]
+
+    cached = await client.get("/api/quizzes/1")
+    assert 'desc="0 queries"' in cached.headers["server-timing"]
+
+    metrics = (await client.get("/metrics")).text
+    assert metrics.startswith("# HELP http_request_duration_seconds")
+    assert 'db_queries_per_request_bucket{method="GET",route="/api/quizzes/{quiz_id}",le="1"} 2' in metrics
+    assert 'db_queries_per_request_count{method="GET",route="/api/quizzes/{quiz_id}"} 2' in metrics
+
+
+@pytest.mark.asyncio
+async def test_unsampled_requests_are_left_alone(client, monkeypatch):
+    monkeypatch.setattr(query_metrics, "sample_rate", 0.0)
+    response = await client.get("/api/quizzes/1")
+    assert "server-timing" not in response.headers
+
+
+def test_budget_violations_are_recorded():
+    metrics = QueryMetrics()
+
+    @query_budget(1)
+    async def endpoint():
+        pass
+
+    metrics.check_budget("/r", endpoint, RequestStats(queries=1))
+    metrics.check_budget("/r", endpoint, RequestStats(queries=3))
+    metrics.check_budget("/r", lambda: None, RequestStats(queries=30))
+    assert [(v.route, v.queries, v.budget) for v in metrics.budget_violations] == [("/r", 3, 1)]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 5))
+    for value in (0, 1, 2, 9):
+        histogram.observe(value)
+    assert list(histogram.lines("q", 'route="/r"')) == [
+        'q_bucket{route="/r",le="1"} 2',
+        'q_bucket{route="/r",le="5"} 3',
+        'q_bucket{route="/r",le="+Inf"} 4',
+        'q_sum{route="/r"} 12.0',
+        'q_count{route="/r"} 4',
+    ]
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app import invalidation
+from app.invalidation import InvalidationBus
+from app.models import CacheInvalidation
+
+
+@pytest.fixture
+def buses(session_factory, monkeypatch):
+    monkeypatch.setattr(invalidation, "async_session", session_factory)
+    return InvalidationBus(mode="database"), InvalidationBus(mode="database")
+
+
+@pytest.mark.asyncio
+async def test_messages_reach_other_workers_only(buses):
+    first, second = buses
+    received = {"first": [], "second": []}
+    first.subscribe("points", received["first"].append)
+
+    async def on_points(payload):
+        received["second"].append(payload)
+
+    second.subscribe("points", on_points)
+    await first.poll()
+    await second.poll()
+
+    await first.publish("points", [[1, 5, None]])
+    await second.publish("points", [[2, 1, None]])
+    assert await first.poll() == 1
+    assert await second.poll() == 1
+    assert received == {"first": [[[2, 1, None]]], "second": [[[1, 5, None]]]}
+    assert await second.poll() == 0
+
+
+@pytest.mark.asyncio
+async def test_rows_committed_out_of_id_order_are_applied_once(buses, session_factory):
+    first, second = buses
+    received = []
+    second.subscribe("points", received.append)
+    await second.poll()
+
+    # On Postgres a publisher holding a lower id can commit after a higher one was read
+    async with session_factory() as session:
+        session.add(CacheInvalidation(id=11, origin=first.origin, channel="points", payload="[[1, 5, null]]"))
+        await session.commit()
+    assert await second.poll() == 1
+    async with session_factory() as session:
+        session.add(CacheInvalidation(id=10, origin=first.origin, channel="points", payload="[[2, 1, null]]"))
+        await session.commit()
+    assert await second.poll() == 1
+    assert await second.poll() == 0
+    assert received == [[[1, 5, None]], [[2, 1, None]]]
+
+
+@pytest.mark.asyncio
+async def test_new_workers_skip_history_and_old_rows_are_pruned(buses, session_factory):
+    first, second = buses
+    await first.publish("points", [[1, 5, None]])
+    second.subscribe("points", lambda payload: pytest.fail("replayed history"))
+    assert await second.poll() == 0
+
+    async with session_factory() as session:
+        await session.execute(update(CacheInvalidation).values(created_at=datetime.utcnow() - timedelta(hours=1)))
+        await session.commit()
+    await first.prune()
+    async with session_factory() as session:
+        assert (await session.execute(select(CacheInvalidation))).first() is None
+
+
+@pytest.mark.asyncio
+async def test_local_mode_publishes_nothing(session_factory, monkeypatch):
+    monkeypatch.setattr(invalidation, "async_session", session_factory)
+    await InvalidationBus(mode="local").publish("points", [[1, 5, None]])
+    async with session_factory() as session:
+        assert (await session.execute(select(CacheInvalidation))).first() is None
@@ -0,0 +1,61 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import leaderboard as leaderboard_module
+from app.leaderboard import Leaderboard, RankIndex
+from app.models import QuizAttempt, User
+
+
+def test_rank_index_matches_full_sort():
+    rng = random.Random(7)
+    index = RankIndex()
+    scores = {}
+    for _ in range(2000):
+        user_id = rng.randrange(200)
+        delta = rng.randrange(-5, 20)
+        index.add(user_id, delta)
+        scores[user_id] = scores.get(user_id, 0) + delta
+    expected = sorted(((-p, u) for u, p in scores.items() if p), key=lambda k: k)
+    assert [(u, p) for _, u, p in index.slice(0, len(index))] == [(u, -p) for p, u in expected]
+    for rank, (_, user_id) in enumerate(expected, start=1):
+        assert index.rank(user_id) == rank
+
+
+def test_neighborhood_is_clipped_at_the_top():
+    index = RankIndex({1: 50, 2: 40, 3: 30, 4: 20, 5: 10})
+    assert [u for _, u, _ in index.around(2, radius=2)] == [1, 2, 3, 4]
+    assert index.around(99, radius=2) == []
+
+
+def test_attempt_points_land_in_windows():
+    board = Leaderboard()
+    now = datetime.utcnow()
+    board.record_points(1, 5, attempt_at=now)
+    board.record_points(2, 7, attempt_at=now - timedelta(days=2))
+    board.record_points(3, 9, attempt_at=now - timedelta(days=30))
+    board.record_points(1, 1)  # comment point, all-time only
+    assert board.board("all").scores == {1: 6, 2: 7, 3: 9}
+    assert board.board("weekly").scores == {1: 5, 2: 7}
+    assert board.board("daily").scores == {1: 5}
+
+
+@pytest.mark.asyncio
+async def test_rebuild_reads_points_and_attempt_buckets(session_factory, monkeypatch):
+    monkeypatch.setattr(leaderboard_module, "async_session", session_factory)
+    async with session_factory() as session:
+        (await session.get(User, 1)).points = 12
+        (await session.get(User, 2)).points = 3
+        session.add(QuizAttempt(quiz_id=1, user_id=2, score=100, points_earned=3, created_at=datetime.utcnow()))
+        session.add(QuizAttempt(
+            quiz_id=1, user_id=1, score=100, points_earned=12, created_at=datetime.utcnow() - timedelta(days=3)
+        ))
+        await session.commit()
+
+    board = Leaderboard()
+    await board.rebuild()
+    assert board.board("all").rank(1) == 1
+    assert board.board("weekly").scores == {1: 12, 2: 3}
+    assert board.board("daily").scores == {2: 3}
+    assert board.usernames[2] == "b"
@@ -0,0 +1,120 @@
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+from jose import jwt
+from sqlalchemy import select
+
+from app import auth
+from app.models import User
+from app.oauth_client import OAuthClient, OAuthProviderError
+from app.routers import oauth
+
+
+class StandInProvider:
+    """Local WeChat and Weibo endpoints that can fail their first calls."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = []
+        self.app = FastAPI()
+
+        @self.app.get("/sns/oauth2/access_token")
+        async def wechat_token(code: str):
+            self.calls.append("wechat_token")
+            if code == "bad":
+                return {"errcode": 40029}
+            return {"access_token": f"t-{code}", "openid": "oid1"}
+
+        @self.app.get("/sns/userinfo")
+        async def wechat_user(openid: str, response: Response):
+            self.calls.append("wechat_user")
+            if self.failures:
+                self.failures -= 1
+                response.status_code = 503
+                return {}
+            return {"openid": openid, "nickname": "a"}
+
+        @self.app.post("/oauth2/access_token")
+        async def weibo_token(request: Request):
+            self.calls.append("weibo_token")
+            form = parse_qs((await request.body()).decode())
+            return {"access_token": f"t-{form['code'][0]}", "uid": 42}
+
+        @self.app.get("/2/users/show.json")
+        async def weibo_user(uid: int):
+            self.calls.append("weibo_user")
+            return {"id": uid, "screen_name": "weibo fan"}
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    stand_in = StandInProvider()
+    client = OAuthClient(backoff_ms=0, transport=httpx.ASGITransport(app=stand_in.app))
+    monkeypatch.setattr(oauth, "oauth_client", client)
+    monkeypatch.setattr(oauth, "WECHAT_API_URL", "http://provider")
+    monkeypatch.setattr(oauth, "WEIBO_API_URL", "http://provider")
+    monkeypatch.setattr(oauth, "FRONTEND_URL", "http://front")
+    return stand_in
+
+
+def token_claims(response):
+    token = parse_qs(urlparse(response.headers["location"]).query)["token"][0]
+    return jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+
+
+@pytest.mark.asyncio
+async def test_wechat_login_creates_user_once_and_caches_user_info(client, provider, session_factory):
+    provider.failures = 1
+    first = await client.get("/api/auth/wechat/callback", params={"code": "c1"})
+    second = await client.get("/api/auth/wechat/callback", params={"code": "c2"})
+    assert first.status_code == second.status_code == 307
+
+    # The 503 was retried; the second login reused the cached user info
+    assert provider.calls == ["wechat_token", "wechat_user", "wechat_user", "wechat_token"]
+    async with session_factory() as session:
+        user = (await session.execute(select(User).filter(User.email == "oid1@wechat.com"))).scalar_one()
+    # "a" is taken by the seeded user, so the account gets a suffixed name
+    assert user.username == "a_oid1"
+    claims = token_claims(first)
+    assert (claims["sub"], claims["username"]) == (str(user.id), "a_oid1")
+    assert token_claims(second)["sub"] == str(user.id)
+
+
+@pytest.mark.asyncio
+async def test_weibo_login_and_provider_errors(client, provider):
+    response = await client.get("/api/auth/weibo/callback", params={"code": "c1"})
+    assert response.status_code == 307
+    assert token_claims(response)["username"] == "weibo fan"
+    assert provider.calls == ["weibo_token", "weibo_user"]
+
+    assert (await client.get("/api/auth/wechat/callback", params={"code": "bad"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_unreachable_provider_is_a_bad_gateway(client, provider, monkeypatch):
+    async def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    failing = OAuthClient(retries=2, backoff_ms=0, transport=httpx.MockTransport(refuse))
+    monkeypatch.setattr(oauth, "oauth_client", failing)
+    response = await client.get("/api/auth/wechat/callback", params={"code": "c1"})
+    assert response.status_code == 502
+
+
+@pytest.mark.asyncio
+async def test_single_use_requests_are_not_resent_after_reaching_the_provider():
+    attempts = []
+
+    async def unavailable(request):
+        attempts.append(request.url.path)
+        return httpx.Response(503)
+
+    client = OAuthClient(retries=2, backoff_ms=0, transport=httpx.MockTransport(unavailable))
+    with pytest.raises(OAuthProviderError):
+        await client.request_json("GET", "http://provider/token", idempotent=False)
+    with pytest.raises(OAuthProviderError):
+        await client.request_json("GET", "http://provider/info")
+    assert attempts == ["/token", "/info", "/info", "/info"]
+    await client.aclose()
@@ -0,0 +1,127 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app import ingest
+from app.auth import create_user_token
+from app.grading import AnswerKey, answer_key_cache
+from app.main import app
+from app.models import AttemptAnswer, Quiz, QuizAttempt
+from app.play import PlayError, PlaySession
+
+
+def planets_key(any_order=True, time_limit=None):
+    quiz = SimpleNamespace(
+        id=1, is_multiple_choice=False, allow_multiple_answers=False, match_any_order=any_order, time_limit=time_limit
+    )
+    rows = [
+        SimpleNamespace(id=i + 1, position=i, correct_answer=name, aliases=None, is_correct=False)
+        for i, name in enumerate(["Mercury", "Venus", "Earth"])
+    ]
+    return AnswerKey.compile(quiz, rows)
+
+
+def test_any_order_session_reveals_named_answers_once():
+    session = PlaySession(planets_key())
+
+    assert session.guess("pluto") == {"type": "result", "text": "pluto", "correct": False, "found": 0}
+    hit = session.guess("venis")
+    assert (hit["correct"], hit["position"], hit["answer"], hit["repeat"], hit["found"]) == (True, 1, "Venus", False, 1)
+    assert session.guess("Venus")["repeat"] is True
+    assert session.result().given == (None, "venis", None)
+
+
+def test_positional_session_defaults_to_next_slot():
+    session = PlaySession(planets_key(any_order=False))
+
+    assert session.guess("mercury")["position"] == 0
+    assert session.guess("earth")["correct"] is False  # slot 1 is Venus
+    assert session.guess("earth", position=2)["correct"] is True
+    assert session.result().results == (True, False, True)
+    with pytest.raises(PlayError):
+        session.guess("venus", position=3)
+
+
+def test_session_expires_after_time_limit():
+    now = [0.0]
+    session = PlaySession(planets_key(time_limit=60), clock=lambda: now[0])
+    now[0] = 61
+    assert session.expired
+
+
+async def websocket_play(path, messages):
+    """Drive the app's WebSocket route in-process; returns the server's messages and close code."""
+    incoming = [{"type": "websocket.connect"}]
+    incoming += [{"type": "websocket.receive", "text": json.dumps(message)} for message in messages]
+    incoming.append({"type": "websocket.disconnect", "code": 1000})
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "websocket", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": [], "scheme": "ws", "server": ("test", 80), "client": ("test", 1234), "subprotocols": [],
+        "asgi": {"version": "3.0"}, "root_path": "",
+    }
+    await app(scope, receive, send)
+    texts = [json.loads(m["text"]) for m in sent if m["type"] == "websocket.send"]
+    closes = [m.get("code") for m in sent if m["type"] == "websocket.close"]
+    return texts, closes[0] if closes else None
+
+
+@pytest_asyncio.fixture
+async def playable(client, session_factory, monkeypatch):
+    monkeypatch.setattr(ingest, "async_session", session_factory)
+    answer_key_cache.clear()
+    async with session_factory() as session:
+        await session.execute(update(Quiz).where(Quiz.id == 1).values(match_any_order=True))
+        await session.commit()
+    yield f"?token={create_user_token(SimpleNamespace(id=2, username='b'))}"
+    answer_key_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_websocket_play_checks_guesses_and_saves_once(playable, session_factory):
+    texts, code = await websocket_play(
+        "/api/quizzes/1/play" + playable,
+        [{"type": "guess", "text": "londn"}, {"type": "guess", "text": "rome"}, {"type": "finish"}],
+    )
+
+    assert texts[0] == {"type": "ready", "total_questions": 2, "any_order": True, "time_limit": None}
+    assert [(t["correct"], t.get("answer")) for t in texts[1:3]] == [(True, "London"), (False, None)]
+    assert texts[3] == {
+        "type": "finished", "score": 50, "correct_answers": 1, "total_questions": 2, "points_earned": 1
+    }
+    assert code == 1000
+    async with session_factory() as session:
+        [attempt] = (await session.execute(select(QuizAttempt))).scalars().all()
+        assert (attempt.user_id, attempt.score, json.loads(attempt.answers)) == (2, 50, [None, "londn"])
+        rows = (await session.execute(
+            select(AttemptAnswer.answer_id, AttemptAnswer.is_correct).order_by(AttemptAnswer.position)
+        )).all()
+        assert rows == [(1, False), (2, True)]
+
+
+@pytest.mark.asyncio
+async def test_websocket_play_finishes_when_everything_is_named(playable):
+    texts, _ = await websocket_play(
+        "/api/quizzes/1/play" + playable,
+        [{"type": "guess", "text": "Paris"}, {"type": "guess", "text": "London"}],
+    )
+    assert texts[-1]["type"] == "finished"
+    assert texts[-1]["score"] == 100
+
+
+@pytest.mark.asyncio
+async def test_websocket_play_rejects_bad_tokens_and_unknown_quizzes(playable):
+    assert (await websocket_play("/api/quizzes/1/play?token=nope", []))[1] == 4401
+    assert (await websocket_play("/api/quizzes/99/play" + playable, []))[1] == 4404
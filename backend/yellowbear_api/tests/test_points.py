@@ -0,0 +1,102 @@
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+from app import points
+from app.auth import CurrentUser, get_current_user
+from app.main import app
+from app.models import PointsLedgerEntry, User
+from app.points import PointsAggregator, ledger_entry, period_totals, record_points, unfolded_points
+
+
+@pytest.fixture(autouse=True)
+def use_test_database(session_factory, monkeypatch):
+    monkeypatch.setattr(points, "async_session", session_factory)
+
+
+@pytest.mark.asyncio
+async def test_comments_append_to_the_ledger_in_one_commit(client, session_factory):
+    app.dependency_overrides[get_current_user] = lambda: CurrentUser(id=2, username="b", points=0)
+    comment = (await client.post("/api/quizzes/1/comments", json={"content": "hi"})).json()
+    reply = (await client.post(f"/api/comments/{comment['id']}/replies", json={"content": "yo"})).json()
+
+    async with session_factory() as session:
+        entries = (await session.execute(
+            select(PointsLedgerEntry.kind, PointsLedgerEntry.source_id, PointsLedgerEntry.points)
+            .order_by(PointsLedgerEntry.id)
+        )).all()
+        assert entries == [("comment", comment["id"], 1), ("reply", reply["id"], 1)]
+        # Not folded yet, but already counted by the leaderboard rebuild
+        assert (await session.get(User, 2)).points == 0
+        assert await unfolded_points(session) == {2: 2}
+
+
+@pytest.mark.asyncio
+async def test_aggregator_folds_entries_into_users_and_periods(session_factory):
+    async with session_factory() as session:
+        await record_points(session, [
+            ledger_entry(1, "attempt", 3, source_id=10, created_at=datetime(2026, 3, 2, 9)),  # Monday
+            ledger_entry(1, "comment", 1, created_at=datetime(2026, 3, 4, 9)),
+            ledger_entry(2, "reply", 1, created_at=datetime(2026, 3, 4, 10)),
+            ledger_entry(2, "attempt", 0, created_at=datetime(2026, 3, 4, 10)),  # nothing earned, not recorded
+        ])
+        await session.commit()
+
+    aggregator = PointsAggregator(batch_size=2)
+    assert await aggregator.fold_all() == 3
+    assert await aggregator.fold_all() == 0
+
+    async with session_factory() as session:
+        assert [(await session.get(User, user_id)).points for user_id in (1, 2)] == [4, 1]
+        assert await unfolded_points(session) == {}
+        assert await period_totals(session, "week", date(2026, 3, 2)) == [(1, 4), (2, 1)]
+        assert await period_totals(session, "day", date(2026, 3, 4)) == [(1, 1), (2, 1)]
+
+
+@pytest.mark.asyncio
+async def test_entries_committed_out_of_id_order_are_still_folded(session_factory):
+    # On Postgres a transaction holding a lower id can commit after a higher one was folded
+    async with session_factory() as session:
+        await record_points(session, [dict(ledger_entry(1, "comment", 1), id=11)])
+        await session.commit()
+    aggregator = PointsAggregator()
+    assert await aggregator.fold() == 1
+
+    async with session_factory() as session:
+        await record_points(session, [dict(ledger_entry(1, "attempt", 5), id=10)])
+        await session.commit()
+        assert await unfolded_points(session) == {1: 5}
+    assert await aggregator.fold() == 1
+    assert await aggregator.fold() == 0
+
+    async with session_factory() as session:
+        assert (await session.get(User, 1)).points == 6
+        assert await unfolded_points(session) == {}
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_the_running_fold_before_the_last_one():
+    aggregator = PointsAggregator(interval_ms=0)
+    running, overlaps = [], []
+
+    async def fold_all():
+        overlaps.append(len(running))
+        running.append(True)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            running.pop()
+        return 0
+
+    aggregator.fold_all = fold_all
+    await aggregator.start()
+    await asyncio.sleep(0.005)  # the background task is mid-fold
+    await aggregator.stop()
+    assert overlaps and max(overlaps) == 0
+
+
+def test_unknown_event_kinds_are_rejected():
+    with pytest.raises(ValueError):
+        ledger_entry(1, "bonus", 5)
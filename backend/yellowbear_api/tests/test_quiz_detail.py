@@ -0,0 +1,52 @@
+import pytest
+import pytest_asyncio
+
+from app.models import Comment, Quiz, QuizAnswer
+
+
+@pytest_asyncio.fixture
+async def detail(session_factory):
+    async with session_factory() as session:
+        quiz = await session.get(Quiz, 1)
+        quiz.attempt_count, quiz.score_total = 4, 300
+        session.add(Quiz(id=2, creator_id=2, title="Pick one", quiz_type="multiple_choice", is_multiple_choice=True))
+        session.add(QuizAnswer(id=3, quiz_id=2, correct_answer="Blue", position=1, is_correct=True))
+        session.add(QuizAnswer(id=4, quiz_id=2, correct_answer="Red", position=0))
+        session.add(Comment(id=1, quiz_id=1, author_id=2, content="nice"))
+        session.add(Comment(id=2, quiz_id=1, author_id=1, content="thanks", parent_id=1, thread_id=1))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_default_detail_has_creator_and_stats(client, detail):
+    response = await client.get("/api/quizzes/1")
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["title"], body["creator"], body["stats"]) == (
+        "Capitals", {"id": 1, "username": "a"}, {"attempt_count": 4, "average_score": 75.0}
+    )
+    assert "answers" not in body and "comments" not in body
+
+
+@pytest.mark.asyncio
+async def test_all_sections_load_in_four_queries(client, detail):
+    response = await client.get("/api/quizzes/1", params={"fields": "creator,stats,answers,comments"})
+    body = response.json()
+    # List quiz answers stay on the server until played
+    assert (body["answer_count"], body["answers"]) == (2, [])
+    [comment] = body["comments"]["comments"]
+    assert (comment["author_username"], [r["content"] for r in comment["replies"]]) == ("b", ["thanks"])
+    assert 'desc="4 queries"' in response.headers["server-timing"]
+
+
+@pytest.mark.asyncio
+async def test_multiple_choice_options_hide_correct_flags(client, detail):
+    body = (await client.get("/api/quizzes/2", params={"fields": "answers"})).json()
+    assert body["answers"] == [{"id": 4, "position": 0, "text": "Red"}, {"id": 3, "position": 1, "text": "Blue"}]
+    assert "creator" not in body
+
+
+@pytest.mark.asyncio
+async def test_unknown_fields_are_rejected(client):
+    response = await client.get("/api/quizzes/1", params={"fields": "creator,secrets"})
+    assert response.status_code == 400
@@ -0,0 +1,114 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.auth import create_user_token
+from app.grading import AnswerKeyCache
+from app.models import Quiz, QuizAnswer
+from app.routers import quiz as quiz_router
+
+
+def quiz_line(title, answers=("Nile", "Amazon")):
+    return json.dumps({
+        "title": title,
+        "quiz_type": "list",
+        "answers": [{"correct_answer": a, "aliases": [a.lower()], "position": i} for i, a in enumerate(answers)],
+    })
+
+
+@pytest.fixture
+def user_auth():
+    return {"Authorization": f"Bearer {create_user_token(SimpleNamespace(id=2, username='b'))}"}
+
+
+@pytest.fixture
+def auth(user_auth, monkeypatch):
+    monkeypatch.setattr(quiz_router, "IMPORT_API_TOKEN", "secret")
+    return dict(user_auth, **{"X-Import-Token": "secret"})
+
+
+@pytest.mark.asyncio
+async def test_import_writes_valid_lines_in_chunks_and_reports_bad_ones(client, session_factory, auth):
+    lines = [quiz_line(f"Rivers {i}") for i in range(5)]
+    lines.insert(2, '{"title": "missing quiz_type"}')
+    lines.insert(4, "")
+    lines.append("not json")
+    body = ("\n".join(lines)).encode()
+
+    response = await client.post(
+        "/api/quizzes/import", params={"chunk_size": 2}, content=body,
+        headers=dict(auth, **{"Content-Type": "application/x-ndjson"}),
+    )
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 5
+    assert report["failed"] == 2
+    assert [error["line"] for error in report["errors"]] == [3, 8]
+
+    async with session_factory() as session:
+        quizzes = (await session.execute(
+            select(Quiz.id, Quiz.title, Quiz.creator_id).filter(Quiz.id > 1).order_by(Quiz.id)
+        )).all()
+        assert [q.title for q in quizzes] == [f"Rivers {i}" for i in range(5)]
+        assert {q.creator_id for q in quizzes} == {2}
+        answers = (await session.execute(
+            select(QuizAnswer.quiz_id, QuizAnswer.correct_answer, QuizAnswer.aliases)
+            .filter(QuizAnswer.quiz_id == quizzes[-1].id).order_by(QuizAnswer.position)
+        )).all()
+        assert [(a.correct_answer, a.aliases) for a in answers] == [("Nile", '["nile"]'), ("Amazon", '["amazon"]')]
+
+
+@pytest.mark.asyncio
+async def test_import_needs_the_import_token_and_a_bounded_body(client, user_auth, auth, monkeypatch):
+    body = quiz_line("Rivers").encode()
+    assert (await client.post("/api/quizzes/import", content=body, headers=user_auth)).status_code == 403
+    wrong = dict(user_auth, **{"X-Import-Token": "guess"})
+    assert (await client.post("/api/quizzes/import", content=body, headers=wrong)).status_code == 403
+
+    monkeypatch.setattr(quiz_router, "MAX_IMPORT_BYTES", len(body) - 1)
+    assert (await client.post("/api/quizzes/import", content=body, headers=auth)).status_code == 413
+
+    monkeypatch.setattr(quiz_router, "IMPORT_API_TOKEN", None)
+    assert (await client.post("/api/quizzes/import", content=body, headers=auth)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_invalid_utf8_lines_are_reported_not_fatal(client, auth):
+    body = b"\n".join([quiz_line("Rivers").encode(), b'{"title": "Caf\xe9"}', quiz_line("Lakes").encode()])
+
+    response = await client.post("/api/quizzes/import", params={"chunk_size": 1}, content=body, headers=auth)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["line"] == 2
+    assert "utf-8" in report["errors"][0]["error"]
+
+
+@pytest.mark.asyncio
+async def test_imported_quizzes_are_searchable_and_gradable(client, session_factory, auth):
+    await client.post("/api/quizzes/import", content=quiz_line("Longest rivers").encode(), headers=auth)
+
+    page = (await client.get("/api/quizzes", params={"search": "longest"})).json()
+    [quiz] = page["quizzes"]
+    async with session_factory() as session:
+        key = await AnswerKeyCache().load(session, quiz["id"])
+    assert key.grade(["nile", "Amazon"]).correct_answers == 2
+
+
+@pytest.mark.asyncio
+async def test_create_quiz_returns_new_quiz(client, session_factory, auth):
+    response = await client.post("/api/quizzes", content=quiz_line("Rivers", ("Nile",)), headers=auth)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["title"] == "Rivers"
+    assert data["attempt_count"] == 0
+    assert data["creator_id"] == 2
+    async with session_factory() as session:
+        count = await session.scalar(select(func.count()).select_from(QuizAnswer).filter(QuizAnswer.quiz_id == data["id"]))
+    assert count == 1
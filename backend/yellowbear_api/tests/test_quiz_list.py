@@ -0,0 +1,48 @@
+import pytest
+import pytest_asyncio
+
+from app.models import Quiz
+
+
+@pytest_asyncio.fixture
+async def catalog(session_factory):
+    async with session_factory() as session:
+        for i in range(2, 8):
+            session.add(Quiz(
+                id=i, creator_id=1, title=f"World capitals {i}" if i % 2 else f"Rivers {i}",
+                description="首都测验" if i == 7 else None, quiz_type="list", attempt_count=i % 3,
+            ))
+        await session.commit()
+
+
+async def collect(client, **params):
+    ids, cursor = [], None
+    while True:
+        query = dict(params, limit=2, **({"cursor": cursor} if cursor else {}))
+        response = await client.get("/api/quizzes", params=query)
+        assert response.status_code == 200
+        page = response.json()
+        ids += [q["id"] for q in page["quizzes"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_catalog_once(client, catalog):
+    assert await collect(client) == [7, 6, 5, 4, 3, 2, 1]
+    # popular: attempt_count desc, then id desc
+    assert await collect(client, sort="popular") == [5, 2, 7, 4, 6, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_search_matches_substrings_in_title_and_description(client, catalog):
+    assert await collect(client, search="CAPITAL") == [7, 5, 3, 1]
+    assert await collect(client, search="首都") == [7]
+    assert await collect(client, search="iver") == [6, 4, 2]
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(client):
+    response = await client.get("/api/quizzes", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app import rankings
+from app.models import Comment, Quiz, QuizAttempt, QuizRanking
+from app.rankings import QuizRankings, decayed
+from app.routers import rankings as rankings_router
+
+
+@pytest_asyncio.fixture
+async def activity(session_factory, monkeypatch):
+    monkeypatch.setattr(rankings, "async_session", session_factory)
+    now = datetime.utcnow()
+    async with session_factory() as session:
+        (await session.get(Quiz, 1)).attempt_count = 50
+        session.add(Quiz(id=2, creator_id=2, title="Colors", quiz_type="multiple_choice", attempt_count=5))
+        session.add(Quiz(id=3, creator_id=2, title="Rivers", quiz_type="list", attempt_count=9))
+        # Quiz 1 was busy two days ago, quiz 3 is busy now, quiz 2 has a fresh comment
+        for i in range(6):
+            session.add(QuizAttempt(quiz_id=1, user_id=1, score=50, created_at=now - timedelta(hours=48, minutes=i)))
+        for i in range(3):
+            session.add(QuizAttempt(quiz_id=3, user_id=2, score=50, created_at=now - timedelta(minutes=i)))
+        session.add(QuizAttempt(quiz_id=2, user_id=2, score=50, created_at=now - timedelta(days=10)))
+        session.add(Comment(quiz_id=2, author_id=1, content="fun", created_at=now - timedelta(hours=1)))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_refresh_materializes_decayed_scores_and_top_lists(activity, session_factory):
+    ranking = QuizRankings(refresh_seconds=60)
+    assert await ranking.refresh() is True
+    # A second worker within half an interval reuses the table
+    assert await ranking.refresh() is False
+
+    async with session_factory() as session:
+        rows = (await session.execute(
+            select(QuizRanking.quiz_id, QuizRanking.recent_attempts, QuizRanking.recent_comments)
+            .order_by(QuizRanking.trending_score.desc())
+        )).all()
+    assert rows == [(3, 3, 0), (2, 0, 1), (1, 6, 0)]
+
+    assert [q["id"] for q in ranking.top("trending")] == [3, 2, 1]
+    assert [q["id"] for q in ranking.top("trending", "list")] == [3, 1]
+    assert [(q["id"], q["score"]) for q in ranking.top("popular", "list")] == [(1, 50.0), (3, 9.0)]
+    assert [q["id"] for q in ranking.top("popular", limit=1)] == [1]
+
+
+def test_counts_halve_every_half_life():
+    now = datetime(2026, 3, 1, 12, 30)
+    assert decayed(4, datetime(2026, 3, 1, 12), now, half_life_hours=24) == 4
+    assert decayed(4, datetime(2026, 2, 28, 12), now, half_life_hours=24) == pytest.approx(2)
+
+
+@pytest.mark.asyncio
+async def test_ranking_routes_serve_from_memory(client, activity, monkeypatch):
+    ranking = QuizRankings()
+    await ranking.refresh()
+    monkeypatch.setattr(rankings_router, "quiz_rankings", ranking)
+
+    response = await client.get("/api/quizzes/trending", params={"quiz_type": "list", "limit": 1})
+    assert response.status_code == 200
+    assert 'desc="0 queries"' in response.headers["server-timing"]
+    [quiz] = response.json()["quizzes"]
+    assert (quiz["id"], quiz["title"], quiz["attempt_count"]) == (3, "Rivers", 9)
+
+    popular = (await client.get("/api/quizzes/popular")).json()["quizzes"]
+    assert [(q["id"], q["score"]) for q in popular] == [(1, 50.0), (3, 9.0), (2, 5.0)]
+    assert (await client.get("/api/quizzes/popular", params={"limit": 0})).status_code == 400
+    # Quiz ids still reach the detail route
+    assert (await client.get("/api/quizzes/2")).json()["title"] == "Colors"
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.auth import create_user_token
+from app.response_cache import MemoryBackend
+
+
+@pytest.mark.asyncio
+async def test_quiz_detail_is_cached_with_a_strong_etag(client):
+    first = await client.get("/api/quizzes/1")
+    assert first.status_code == 200
+    assert first.headers["x-cache"] == "MISS"
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith('W/')
+    assert "s-maxage=10" in first.headers["cache-control"]
+
+    second = await client.get("/api/quizzes/1")
+    assert (second.headers["x-cache"], second.headers["etag"]) == ("HIT", etag)
+    assert second.json() == first.json()
+
+    revalidated = await client.get("/api/quizzes/1", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+
+@pytest.mark.asyncio
+async def test_comment_writes_invalidate_the_comment_page(client):
+    headers = {"Authorization": f"Bearer {create_user_token(SimpleNamespace(id=2, username='b'))}"}
+    before = await client.get("/api/quizzes/1/comments")
+    assert before.json()["comments"] == []
+    assert before.headers["cache-control"] == "public, max-age=0, must-revalidate"
+
+    response = await client.post("/api/quizzes/1/comments", json={"content": "hi"}, headers=headers)
+    assert response.status_code == 201
+
+    after = await client.get("/api/quizzes/1/comments", headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["x-cache"] == "MISS"
+    assert [c["content"] for c in after.json()["comments"]] == ["hi"]
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached(client):
+    response = await client.get("/api/quizzes/99")
+    assert response.status_code == 404
+    assert "x-cache" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(maxsize=2)
+    await backend.set("a", b"1", ttl=60)
+    await backend.set("b", b"2", ttl=60)
+    await backend.get("a")
+    await backend.set("c", b"3", ttl=60)
+    assert [await backend.get(key) for key in "abc"] == [b"1", None, b"3"]
+
+    await backend.set("d", b"4", ttl=0)
+    assert await backend.get("d") is None
+
+    await backend.bump(["quizzes", "quizzes"])
+    assert await backend.versions(["quizzes", "quiz:1"]) == [2, 0]
@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import search
+from app.database import SchemaDriftError, ensure_schema
+from app.main import app
+from app.routers import export as export_router
+from app.startup import parse_importtime
+
+
+@pytest.mark.asyncio
+async def test_schema_is_created_once_then_only_checked(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    monkeypatch.setattr(search, "_backend", None)
+    try:
+        assert await ensure_schema(engine) is True
+        statements.clear()
+        monkeypatch.setattr(search, "_backend", None)
+
+        assert await ensure_schema(engine) is False
+        assert not any(statement.lstrip().upper().startswith("CREATE") for statement in statements)
+        assert search._backend == "fts5"
+        assert await ensure_schema(engine, force=True) is True
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_changed_models_add_columns_and_indexes_or_fail(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'drift.db'}")
+    try:
+        await ensure_schema(engine)
+        # A database created before points_ledger.folded and idx_quiz_type_popular existed
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP INDEX idx_points_unfolded"))
+            await conn.execute(text("DROP INDEX idx_quiz_type_popular"))
+            await conn.execute(text("ALTER TABLE points_ledger DROP COLUMN folded"))
+            await conn.execute(text("UPDATE schema_version SET fingerprint = 'old'"))
+        assert await ensure_schema(engine) is True
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(lambda c: [col["name"] for col in c.dialect.get_columns(c, "points_ledger")])
+            indexes = await conn.run_sync(lambda c: [index["name"] for index in c.dialect.get_indexes(c, "quizzes")])
+        assert "folded" in columns and "idx_quiz_type_popular" in indexes
+
+        # A required column without a default cannot be added in place
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE points_ledger DROP COLUMN kind"))
+            await conn.execute(text("UPDATE schema_version SET fingerprint = 'old'"))
+        with pytest.raises(SchemaDriftError, match="points_ledger.kind"):
+            await ensure_schema(engine)
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("SELECT fingerprint FROM schema_version"))).scalar() == "old"
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_workers_that_may_not_migrate_leave_the_schema_alone(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}")
+    try:
+        assert await ensure_schema(engine, create=False) is False
+        async with engine.connect() as conn:
+            assert await conn.run_sync(lambda sync_conn: sync_conn.dialect.get_table_names(sync_conn)) == []
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_lazy_routers_load_on_first_request(client, monkeypatch):
+    monkeypatch.setattr(export_router, "EXPORT_API_TOKEN", None)
+    assert (await client.get("/api/attempts/export")).status_code == 404
+    response = await client.get("/api/auth/wechat")
+    assert response.status_code == 307
+    assert response.headers["location"].startswith("https://open.weixin.qq.com/connect/qrconnect")
+    # Neighbouring eager routes are not shadowed by the lazy prefixes
+    assert (await client.get("/api/login")).status_code == 405
+    assert "/api/auth/wechat" not in app.openapi()["paths"]
+
+
+def test_importtime_output_is_parsed():
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     jose.jwk",
+        "import time:      2500 |       2620 |   app.auth",
+        "import time:      1000 |       3620 | app.main",
+    ])
+    timings = parse_importtime(output)
+    assert [(t.module, t.self_ms, t.cumulative_ms, t.depth) for t in timings] == [
+        ("jose.jwk", 0.12, 0.12, 2), ("app.auth", 2.5, 2.62, 1), ("app.main", 1.0, 3.62, 0)
+    ]
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.stats_cache import QuizSnapshot, StatsSnapshotCache
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, quiz_id):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if quiz_id == 404:
+            return None
+        return QuizSnapshot(quiz_id=quiz_id, total_attempts=self.calls, score_total=50 * self.calls)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    loader = CountingLoader()
+    cache = StatsSnapshotCache(loader=loader, ttl=60, stale_ttl=60)
+    snapshots = await asyncio.gather(*(cache.get(1) for _ in range(20)))
+    assert loader.calls == 1
+    assert all(s is snapshots[0] for s in snapshots)
+    assert await cache.get(404) is None
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_is_served_while_refreshing():
+    loader = CountingLoader()
+    cache = StatsSnapshotCache(loader=loader, ttl=0, stale_ttl=60)
+    first = await cache.get(1)
+    stale = await cache.get(1)
+    assert stale is first
+    await asyncio.sleep(0.05)
+    refreshed = await cache.get(1)
+    assert loader.calls == 2
+    assert refreshed.total_attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_recorded_attempts_update_running_average():
+    cache = StatsSnapshotCache(loader=CountingLoader(), ttl=60, stale_ttl=60)
+    snapshot = await cache.get(1)
+    cache.record_attempts(1, count=1, score_sum=100)
+    assert snapshot.total_attempts == 2
+    assert snapshot.average_score == 75
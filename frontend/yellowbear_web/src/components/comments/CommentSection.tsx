@@ -90,6 +90,20 @@ const CommentItem: React.FC<CommentProps> = ({ comment, onReply, onDelete, onUpd
             </div>
           </div>
         )}
+
+        {comment.replies && comment.replies.length > 0 && (
+          <div className="mt-4 pl-4 border-l">
+            {comment.replies.map((reply) => (
+              <CommentItem
+                key={reply.id}
+                comment={reply}
+                onReply={onReply}
+                onDelete={onDelete}
+                onUpdate={onUpdate}
+              />
+            ))}
+          </div>
+        )}
       </CardContent>
     </Card>
   );
@@ -101,13 +115,15 @@ interface CommentSectionProps {
 
 export function CommentSection({ quizId }: CommentSectionProps) {
   const [commentsList, setCommentsList] = useState<Comment[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [newComment, setNewComment] = useState("");
   const [isLoading, setIsLoading] = useState(false);
 
-  const fetchComments = async () => {
+  const fetchComments = async (cursor?: string | null) => {
     try {
-      const data = await quizzes.getComments(quizId);
-      setCommentsList(data);
+      const data = await quizzes.getComments(quizId, cursor);
+      setCommentsList((prev) => (cursor ? [...prev, ...data.comments] : data.comments));
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error("Failed to fetch comments:", error);
     }
@@ -183,6 +199,12 @@ export function CommentSection({ quizId }: CommentSectionProps) {
           />
         ))}
       </div>
+
+      {nextCursor && (
+        <Button variant="outline" onClick={() => fetchComments(nextCursor)}>
+          Load more comments
+        </Button>
+      )}
     </div>
   );
 }
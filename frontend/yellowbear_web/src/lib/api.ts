@@ -35,6 +35,12 @@ export interface Comment {
   updated_at: string;
   likes_count: number;
   author_username: string;
+  replies?: Comment[];
+}
+
+export interface CommentPage {
+  comments: Comment[];
+  next_cursor: string | null;
 }
 
 export interface Quiz {
@@ -53,11 +59,95 @@ export interface Quiz {
   comments?: Comment[];
 }
 
+export type QuizDetailField = 'creator' | 'stats' | 'answers' | 'comments';
+
+// GET /api/quizzes/{id}; optional sections are present only when requested
+export interface QuizDetail extends Omit<Quiz, 'answers' | 'comments'> {
+  created_at?: string;
+  is_multiple_choice: boolean;
+  allow_multiple_answers: boolean;
+  match_any_order: boolean;
+  creator?: { id: number; username: string } | null;
+  stats?: { attempt_count: number; average_score: number };
+  answer_count?: number;
+  // Multiple choice options without correct flags; empty for list quizzes
+  answers?: Array<{ id: number; position: number; text: string }>;
+  comments?: CommentPage;
+}
+
+// GET /api/quizzes/trending and /popular, precomputed on the server
+export type QuizRanking = 'trending' | 'popular';
+
+export interface RankedQuiz extends Omit<Quiz, 'answers' | 'comments'> {
+  score: number;
+}
+
+export interface QuizPage {
+  quizzes: Quiz[];
+  next_cursor: string | null;
+}
+
 export interface QuizAttempt {
   answers: string[];
   completion_time: number;
 }
 
+export interface AttemptResult {
+  score: number;
+  correct_answers: number;
+  total_questions: number;
+  points_earned: number;
+}
+
+export interface GuessResult {
+  text: string;
+  correct: boolean;
+  position?: number;
+  answer?: string;
+  repeat?: boolean;
+  found: number;
+}
+
+export interface PlayHandlers {
+  onReady?: (info: { total_questions: number; any_order: boolean; time_limit: number | null }) => void;
+  onResult: (result: GuessResult) => void;
+  onFinished: (result: AttemptResult) => void;
+  onError?: (detail: string) => void;
+}
+
+// Live play of a list quiz: guesses are checked by the server as they are typed
+// and the attempt is saved once when the session finishes.
+export function openPlaySession(quizId: number, handlers: PlayHandlers) {
+  const token = localStorage.getItem('token') || '';
+  const url = new URL(`/api/quizzes/${quizId}/play`, API_URL);
+  url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+  url.searchParams.set('token', token);
+  const socket = new WebSocket(url);
+  let finished = false;
+
+  socket.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.type === 'ready') handlers.onReady?.(message);
+    else if (message.type === 'result') handlers.onResult(message);
+    else if (message.type === 'finished') {
+      finished = true;
+      handlers.onFinished(message);
+    } else if (message.type === 'error') handlers.onError?.(message.detail);
+  };
+  socket.onclose = (event) => {
+    if (!finished && event.code !== 1000) handlers.onError?.(event.reason || 'Connection lost');
+  };
+
+  const send = (message: object) => {
+    if (socket.readyState === WebSocket.OPEN) socket.send(JSON.stringify(message));
+  };
+  return {
+    guess: (text: string, position?: number) => send({ type: 'guess', text, position }),
+    finish: () => send({ type: 'finish' }),
+    close: () => socket.close(),
+  };
+}
+
 export const auth = {
   register: async (username: string, email: string, password: string) => {
     const response = await api.post('/api/register', { username, email, password });
@@ -77,18 +167,25 @@ export const auth = {
 };
 
 export const quizzes = {
-  list: async (page = 1, limit = 10, search?: string) => {
+  list: async (cursor?: string | null, limit = 10, search?: string): Promise<QuizPage> => {
     const params = new URLSearchParams({
-      skip: ((page - 1) * limit).toString(),
       limit: limit.toString(),
+      ...(cursor && { cursor }),
       ...(search && { search }),
     });
     const response = await api.get(`/api/quizzes?${params}`);
     return response.data;
   },
 
-  get: async (id: number) => {
-    const response = await api.get(`/api/quizzes/${id}`);
+  ranked: async (ranking: QuizRanking, quizType?: string, limit = 20): Promise<RankedQuiz[]> => {
+    const params = new URLSearchParams({ limit: limit.toString(), ...(quizType && { quiz_type: quizType }) });
+    const response = await api.get(`/api/quizzes/${ranking}?${params}`);
+    return response.data.quizzes;
+  },
+
+  get: async (id: number, fields?: QuizDetailField[]): Promise<QuizDetail> => {
+    const params = new URLSearchParams(fields ? { fields: fields.join(',') } : {});
+    const response = await api.get(`/api/quizzes/${id}?${params}`);
     return response.data;
   },
 
@@ -97,13 +194,14 @@ export const quizzes = {
     return response.data;
   },
 
-  submitAttempt: async (quizId: number, attempt: QuizAttempt) => {
+  submitAttempt: async (quizId: number, attempt: QuizAttempt): Promise<AttemptResult> => {
     const response = await api.post(`/api/quizzes/${quizId}/attempts`, attempt);
     return response.data;
   },
 
-  getComments: async (quizId: number) => {
-    const response = await api.get(`/api/quizzes/${quizId}/comments`);
+  getComments: async (quizId: number, cursor?: string | null): Promise<CommentPage> => {
+    const params = new URLSearchParams(cursor ? { cursor } : {});
+    const response = await api.get(`/api/quizzes/${quizId}/comments?${params}`);
     return response.data;
   },
 
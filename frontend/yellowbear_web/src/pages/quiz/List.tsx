@@ -9,20 +9,22 @@ import type { Quiz } from "@/lib/api";
 export function QuizListPage() {
   const navigate = useNavigate();
   const [quizList, setQuizList] = useState<Quiz[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
 
-  useEffect(() => {
-    const fetchQuizzes = async () => {
-      try {
-        const data = await quizzes.list();
-        setQuizList(data);
-      } catch (error) {
-        console.error("Failed to fetch quizzes:", error);
-      } finally {
-        setLoading(false);
-      }
-    };
+  const fetchQuizzes = async (cursor?: string | null) => {
+    try {
+      const data = await quizzes.list(cursor);
+      setQuizList((prev) => (cursor ? [...prev, ...data.quizzes] : data.quizzes));
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error("Failed to fetch quizzes:", error);
+    } finally {
+      setLoading(false);
+    }
+  };
 
+  useEffect(() => {
     fetchQuizzes();
   }, []);
 
@@ -59,6 +61,14 @@ export function QuizListPage() {
           ))}
         </div>
       )}
+
+      {nextCursor && (
+        <div className="flex justify-center mt-6">
+          <Button variant="outline" onClick={() => fetchQuizzes(nextCursor)}>
+            Load more
+          </Button>
+        </div>
+      )}
     </div>
   );
 }
@@ -1,27 +1,26 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Alert } from "@/components/ui/alert";
-import { quizzes } from "@/lib/api";
-import type { Quiz } from "@/lib/api";
+import { quizzes, openPlaySession } from "@/lib/api";
+import type { AttemptResult, GuessResult, QuizDetail } from "@/lib/api";
 import { CommentSection } from "@/components/comments/CommentSection";
 
 export function PlayQuizPage() {
   const { id } = useParams();
   const navigate = useNavigate();
-  const [quiz, setQuiz] = useState<Quiz | null>(null);
+  const [quiz, setQuiz] = useState<QuizDetail | null>(null);
   const [answers, setAnswers] = useState<string[]>([]);
   const [currentAnswer, setCurrentAnswer] = useState("");
   const [timeLeft, setTimeLeft] = useState<number | null>(null);
   const [error, setError] = useState("");
-  const [result, setResult] = useState<{
-    score: number;
-    correct_answers: number;
-    total_questions: number;
-    points_earned: number;
-  } | null>(null);
+  const [result, setResult] = useState<AttemptResult | null>(null);
+  // Live sessions check each guess on the server; quizzes it can't serve fall back to one final submit
+  const [live, setLive] = useState(false);
+  const [guesses, setGuesses] = useState<GuessResult[]>([]);
+  const session = useRef<ReturnType<typeof openPlaySession> | null>(null);
 
   useEffect(() => {
     const loadQuiz = async () => {
@@ -39,6 +38,25 @@ export function PlayQuizPage() {
     loadQuiz();
   }, [id]);
 
+  useEffect(() => {
+    if (!quiz) return;
+    let ready = false;
+    const playSession = openPlaySession(quiz.id, {
+      onReady: () => {
+        ready = true;
+        setLive(true);
+      },
+      onResult: (guess) => setGuesses((previous) => [...previous, guess]),
+      onFinished: setResult,
+      onError: (detail) => {
+        if (ready) setError(detail);
+        else setLive(false);
+      },
+    });
+    session.current = playSession;
+    return () => playSession.close();
+  }, [quiz]);
+
   useEffect(() => {
     if (timeLeft === null || timeLeft <= 0) return;
 
@@ -51,12 +69,17 @@ export function PlayQuizPage() {
 
   const handleSubmitAnswer = () => {
     if (!currentAnswer.trim()) return;
-    setAnswers([...answers, currentAnswer.trim()]);
+    if (live) session.current?.guess(currentAnswer.trim());
+    else setAnswers([...answers, currentAnswer.trim()]);
     setCurrentAnswer("");
   };
 
   const handleFinishQuiz = async () => {
     if (!quiz || !id) return;
+    if (live) {
+      session.current?.finish();
+      return;
+    }
     try {
       const result = await quizzes.submitAttempt(parseInt(id), {
         answers,
@@ -121,13 +144,23 @@ export function PlayQuizPage() {
               <Button onClick={handleSubmitAnswer}>Submit Answer</Button>
             </div>
             <div className="space-y-2">
-              {answers.map((answer, index) => (
-                <div key={index} className="p-2 bg-muted rounded">
-                  Answer {index + 1}: {answer}
-                </div>
-              ))}
+              {live
+                ? guesses.map((guess, index) => (
+                    <div
+                      key={index}
+                      className={`p-2 rounded ${guess.correct ? "bg-green-100" : "bg-muted"}`}
+                    >
+                      {guess.text}
+                      {guess.correct && ` ✓ ${guess.answer}${guess.repeat ? " (already named)" : ""}`}
+                    </div>
+                  ))
+                : answers.map((answer, index) => (
+                    <div key={index} className="p-2 bg-muted rounded">
+                      Answer {index + 1}: {answer}
+                    </div>
+                  ))}
             </div>
-            {answers.length > 0 && (
+            {(live ? guesses.length : answers.length) > 0 && (
               <Button onClick={handleFinishQuiz}>Finish Quiz</Button>
             )}
           </div>